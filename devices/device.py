@@ -7,7 +7,25 @@ Contents of this modules are not for instantiation.
 """
 
 
+import json
+import time
 import logging
+import datetime
+
+
+WAIT_POLL_INTERVAL_S = 5        # First poll interval of wait_for_* calls
+WAIT_MAX_POLL_INTERVAL_S = 60   # Poll interval limit while nothing new arrives
+WAIT_BACKOFF = 2                # Poll interval growth per empty poll
+WAIT_OVERLAP = datetime.timedelta(minutes=2)    # Polled windows overlap, the backend may list items late
+
+
+def _seconds_until(deadline):
+    """Get the seconds left until a deadline given as seconds from now or as datetime (naive = UTC)."""
+    if isinstance(deadline, datetime.datetime):
+        if deadline.tzinfo is None:
+            deadline = deadline.replace(tzinfo=datetime.timezone.utc)
+        return (deadline - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+    return float(deadline)
 
 
 class Device:
@@ -38,3 +56,55 @@ class Device:
             bool: True for being connected, False otherwise.
         """
         return self.interface.connected
+
+    def _wait_for(self, fetch, predicate, deadline, poll_interval=WAIT_POLL_INTERVAL_S, max_poll_interval=WAIT_MAX_POLL_INTERVAL_S, since=None):
+        """Poll a source until one of its items matches a predicate.
+
+        Every poll only asks for the items since the previous poll (with
+        WAIT_OVERLAP), items seen before are not checked again. The poll
+        interval starts at poll_interval and grows by WAIT_BACKOFF up to
+        max_poll_interval while nothing new arrives, new items reset it. A
+        last poll is made at the deadline.
+
+        :param fetch: Gets the items since an aware UTC datetime
+        :type fetch: callable
+        :param predicate: Check on a single item
+        :type predicate: callable
+        :param deadline: Seconds from now, or a datetime (naive = UTC)
+        :type deadline: float or datetime.datetime
+        :param poll_interval: First poll interval in seconds, defaults to WAIT_POLL_INTERVAL_S
+        :type poll_interval: float, optional
+        :param max_poll_interval: Max. poll interval in seconds, defaults to WAIT_MAX_POLL_INTERVAL_S
+        :type max_poll_interval: float, optional
+        :param since: Aware UTC datetime of the oldest items to check, defaults to now
+        :type since: datetime.datetime, optional
+
+        :return: First matching item, None if the deadline passed
+        :rtype: dict or None
+        """
+        end = time.monotonic() + _seconds_until(deadline)
+        start = since if since is not None else datetime.datetime.now(datetime.timezone.utc)
+        window_start = start
+        interval = None
+        seen = set()
+        while True:
+            poll_time = datetime.datetime.now(datetime.timezone.utc)
+            new_items = []
+            for item in fetch(window_start):
+                key = json.dumps(item, sort_keys=True, default=str)
+                if key not in seen:
+                    seen.add(key)
+                    new_items.append(item)
+            for item in new_items:
+                if predicate(item):
+                    return item
+            window_start = max(start, poll_time - WAIT_OVERLAP)
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return None
+            if new_items or interval is None:
+                interval = poll_interval
+            else:
+                interval = min(interval * WAIT_BACKOFF, max_poll_interval)
+            self.logger.debug("No matching item yet, next poll in %.1f s", min(interval, remaining))
+            time.sleep(min(interval, remaining))
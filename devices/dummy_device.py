@@ -3,6 +3,7 @@
 
 from NSTAX.devices.device import Device
 from NSTAX.interface.dummy_interface import DummyInterface
+from NSTAX.logger.event_journal import emit_event, DUT_COMMAND
 
 
 class DummyDevice(Device):
@@ -27,6 +28,7 @@ class DummyDevice(Device):
         """Dummy command send"""
         self.logger.info("Sending command to the device: %s", self.name)
         self.interface.write_data(data)
+        emit_event(DUT_COMMAND, device=self.name, command="debug_command", data=data)
 
     def receive_debug_readout(self):
         """Dummy device readout"""
@@ -8,9 +8,26 @@ Default interface is the SensolusWebInterface.
 
 
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-from NSTAX.devices.device import Device
+from NSTAX.devices.device import Device, WAIT_POLL_INTERVAL_S, WAIT_MAX_POLL_INTERVAL_S
 from NSTAX.interface.sensolus_web_interface import SensolusWebInterface
+from NSTAX.logger.event_journal import emit_event, DUT_COMMAND
+from NSTAX.logger.message_store import MessageStore, frame_key
+from NSTAX.logger.time_index import to_ns
+from NSTAX.logger.timebase import ns_to_datetime
+
+
+FRAMES_PAGE_SIZE = 100     # Frames per sigfoxMessages request
+FRAMES_MAX_WORKERS = 4     # Pages requested concurrently
+UTC_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def _utc_to_datetime(timestamp_utc):
+    """Convert an ISO 8601 UTC timestamp to an aware datetime, None stays None."""
+    if timestamp_utc is None:
+        return None
+    return datetime.datetime.strptime(timestamp_utc, UTC_TIME_FORMAT).replace(tzinfo=datetime.timezone.utc)
 
 
 class PlatformDevice(Device):
@@ -20,12 +37,17 @@ class PlatformDevice(Device):
     :type name: str
     :param device_id: Sensolus Device ID, defaults to ""
     :type device_id: str, optional
+    :param message_store: Local store consulted before the backend for data frames (see message_store), or its path, defaults to None
+    :type message_store: MessageStore or str, optional
     """
-    def __init__(self, name, device_id=""):
+    def __init__(self, name, device_id="", message_store=None):
         super().__init__("PlatformDevice", version = 0.1)
         self.device_id = device_id
         self.name = name
         self.interface = None
+        if isinstance(message_store, str):
+            message_store = MessageStore(message_store)
+        self.message_store = message_store
 
     def connect(self):
         """Connect to the device interface."""
@@ -38,68 +60,126 @@ class PlatformDevice(Device):
         self.logger.info("Disconnecting the device: %s", self.name)
         self.interface.disconnect()
 
-    def get_frames(self, start_time_utc=None, end_time_utc=None, max_n_frames=10):
+    def get_frames(self, start_time_utc=None, end_time_utc=None, max_n_frames=10, page_size=FRAMES_PAGE_SIZE, max_workers=FRAMES_MAX_WORKERS):
         """Get NB-IoT data frames with given conditions.
         A frame can contain 1 or more device messages.
 
-        :param start_time_utc: Returns frames only from this ISO 8601 UTC timestamp onwards, defaults to a day before current UTC time
+        The frames are requested in pages of page_size, up to max_workers
+        pages at a time. Pages are merged in backend order, frames showing up
+        on two pages (e.g. shifted by new arrivals) are kept once. A short page
+        does not end the window, the backend may cap the page size: the next
+        page starts after the frames received, the download ends on an empty
+        page or once the total of frames reported by the backend is reached.
+
+        With a message store, only the part of the window that is not synced
+        yet is downloaded (completely, regardless of max_n_frames), the frames
+        are then taken from the store.
+
+        :param start_time_utc: Returns frames only from this ISO 8601 UTC timestamp onwards, defaults to a day before end_time_utc
         :type start_time_utc: str, optional
         :param end_time_utc: Returns frames upto this ISO 8601 UTC timestamp, defaults to current UTC timestamp captured from the system
         :type end_time_utc: str, optional
-        :param max_n_frames: Max. number of messages returned, defaults to 50
+        :param max_n_frames: Max. number of frames returned, defaults to 10, None for all frames of the window
         :type max_n_frames: int, optional
+        :param page_size: Number of frames per request, defaults to FRAMES_PAGE_SIZE
+        :type page_size: int, optional
+        :param max_workers: Number of pages requested concurrently, defaults to FRAMES_MAX_WORKERS
+        :type max_workers: int, optional
 
         :return: List of data frames
         :rtype: list
         """
-        current_utc_time_dt = datetime.datetime.utcnow()
-        if end_time_utc:
-            end_time_utc_url = end_time_utc + "+00:00"
-        else:
+        if page_size < 1 or max_workers < 1:
+            raise ValueError("Error in get frames !", f"page_size: {page_size}, max_workers: {max_workers}")
+        if not end_time_utc:
             # now utc
-            end_time_utc_url = current_utc_time_dt.strftime("%Y-%m-%dT%H:%M:%S+00:00")
-        if start_time_utc:
-            start_time_utc_url = start_time_utc + "+00:00"
-        else:
+            end_time_utc = datetime.datetime.utcnow().strftime(UTC_TIME_FORMAT)
+        if not start_time_utc:
             # a day before end time utc
-            start_time_utc_dt = datetime.datetime.strptime(end_time_utc,  "%Y-%m-%dT%H:%M:%S") - datetime.timedelta(days=1)
-            start_time_utc_url = start_time_utc_dt.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+            start_time_utc = (datetime.datetime.strptime(end_time_utc, UTC_TIME_FORMAT) - datetime.timedelta(days=1)).strftime(UTC_TIME_FORMAT)
         self.logger.info("Get dataframes for device: %s", self.device_id)
-        resp = self.interface.get(f"/rest/sigfoxdevices/{self.device_id}/sigfoxMessages", parameters={"start": 0, 'limit': max_n_frames, 'from_date': start_time_utc_url, 'to_date': end_time_utc_url, 'not_filter': False})
-        if resp.get("message", "") == "no_data_in_time_filter_key":
+        if self.message_store is None:
+            frames = self._download_frames(start_time_utc, end_time_utc, max_n_frames, page_size, max_workers)
+        else:
+            start_ns = to_ns(start_time_utc)
+            end_ns = to_ns(end_time_utc)
+            for range_start_ns, range_end_ns in self.message_store.missing_ranges(self.device_id, start_ns, end_ns):
+                # Whole seconds, the range is widened to the enclosing seconds
+                range_end_ns = -(-range_end_ns // 10**9) * 10**9
+                downloaded = self._download_frames(ns_to_datetime(range_start_ns).strftime(UTC_TIME_FORMAT),
+                                                   ns_to_datetime(range_end_ns).strftime(UTC_TIME_FORMAT),
+                                                   None, page_size, max_workers)
+                self.message_store.add_frames(self.device_id, downloaded)
+                self.message_store.mark_synced(self.device_id, range_start_ns, range_end_ns)
+            frames = self.message_store.get_frames(self.device_id, start_ns, end_ns, max_n_frames)
+        if not frames:
             self.logger.error("No data frames within given time window !")
-        return resp.get("data", [])
+        return frames
 
-    def get_messages(self, start_time_utc=None, end_time_utc=None, max_n_messages=50):
+    def _download_frames(self, start_time_utc, end_time_utc, max_n_frames, page_size, max_workers):
+        """Download the data frames of a time window from the backend (see get_frames)."""
+        start_time_utc_url = start_time_utc + "+00:00"
+        end_time_utc_url = end_time_utc + "+00:00"
+
+        def get_page(page):
+            offset, limit = page
+            return self.interface.get(f"/rest/sigfoxdevices/{self.device_id}/sigfoxMessages", parameters={"start": offset, 'limit': limit, 'from_date': start_time_utc_url, 'to_date': end_time_utc_url, 'not_filter': False})
+
+        frames = []
+        frame_keys = set()
+        offset = 0
+        total = None
+        last_page = False
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while not last_page and (max_n_frames is None or offset < max_n_frames):
+                # Next batch of pages, one per worker
+                pages = []
+                page_offset = offset
+                while len(pages) < max_workers and (max_n_frames is None or page_offset < max_n_frames) and (total is None or page_offset < total):
+                    limit = page_size if max_n_frames is None else min(page_size, max_n_frames - page_offset)
+                    pages.append((page_offset, limit))
+                    page_offset += limit
+                for (page_offset, limit), resp in zip(pages, executor.map(get_page, pages)):
+                    page_frames = resp.get("data", []) if isinstance(resp, dict) else []
+                    if isinstance(resp, dict) and resp.get("total") is not None:
+                        total = resp["total"]
+                    for frame in page_frames:
+                        key = frame_key(frame)
+                        if key not in frame_keys:
+                            frame_keys.add(key)
+                            frames.append(frame)
+                    offset = page_offset + len(page_frames)
+                    if not page_frames or (total is not None and offset >= total):
+                        # End of the time window
+                        last_page = True
+                        break
+                    if len(page_frames) < limit:
+                        # The backend caps the page size, the later pages of
+                        # the batch start too far, continue with the cap
+                        page_size = len(page_frames)
+                        break
+        return frames[:max_n_frames]
+
+    def get_messages(self, start_time_utc=None, end_time_utc=None, max_n_messages=50, max_workers=FRAMES_MAX_WORKERS):
         """Get raw FW maeesages with given conditions.
 
-        :param start_time_utc: Returns messages only from this ISO 8601 UTC timestamp onwards, defaults to a day before current UTC time
+        :param start_time_utc: Returns messages only from this ISO 8601 UTC timestamp onwards, defaults to a day before end_time_utc
         :type start_time_utc: str, optional
         :param end_time_utc: Returns messages upto this ISO 8601 UTC timestamp, defaults to current UTC timestamp captured from the system
         :type end_time_utc: str, optional
         :param max_n_messages: Max. number of messages returned, defaults to 50
         :type max_n_messages: int, optional
+        :param max_workers: Number of frame pages requested concurrently, defaults to FRAMES_MAX_WORKERS
+        :type max_workers: int, optional
 
         :return: List of messages
         :rtype: list
         """
         messages_received = []
-        current_utc_time_dt = datetime.datetime.utcnow()
-        if end_time_utc:
-            end_time_utc_url = end_time_utc
-        else:
-            # now utc
-            end_time_utc_url = current_utc_time_dt.strftime("%Y-%m-%dT%H:%M:%S+00:00")
-        if start_time_utc:
-            start_time_utc_url = start_time_utc
-        else:
-            # a day before end time utc
-            start_time_utc_dt = datetime.datetime.strptime(end_time_utc,  "%Y-%m-%dT%H:%M:%S") - datetime.timedelta(days=1)
-            start_time_utc_url = start_time_utc_dt.strftime("%Y-%m-%dT%H:%M:%S+00:00")
         self.logger.info("Get messages for device: %s", self.device_id)
         # resp = self.interface.get(f"/rest/sigfoxdevices/{self.device_id}/sigfoxMessages", parameters={"start": 0, 'limit': max_n_messages, 'from_date': start_time_utc_url, 'to_date': end_time_utc_url, 'not_filter': False})
         # dataframes = resp.get("data", [])
-        dataframes = self.get_frames(start_time_utc, end_time_utc, max_n_messages)
+        dataframes = self.get_frames(start_time_utc, end_time_utc, max_n_messages, max_workers=max_workers)
         for dataframe in dataframes:
             # Frame level
             for message_ in dataframe.get("data", []):
@@ -114,6 +194,72 @@ class PlatformDevice(Device):
                 messages_received.append(message_template)
         return messages_received
 
+    def get_cellular_provider(self, start_time_utc=None, end_time_utc=None, max_n_frames=10):
+        """Get the cellular provider the device reported last within a time window.
+
+        Taken from the operator info of the network diagnostics of the newest
+        data frame that has one (brand, e.g. "Vodafone", or else the operator name).
+
+        :param start_time_utc: Only frames from this ISO 8601 UTC timestamp onwards, defaults to a day before end_time_utc
+        :type start_time_utc: str, optional
+        :param end_time_utc: Only frames upto this ISO 8601 UTC timestamp, defaults to current UTC timestamp captured from the system
+        :type end_time_utc: str, optional
+        :param max_n_frames: Max. number of frames checked, defaults to 10
+        :type max_n_frames: int, optional
+
+        :return: Provider, None if no frame has operator info
+        :rtype: str or None
+        """
+        for dataframe in self.get_frames(start_time_utc, end_time_utc, max_n_frames):
+            for network_ in dataframe.get("networks", []):
+                try:
+                    operator_info = network_["decodedMsg"]["operatorInfo"]
+                except (KeyError, TypeError) as e_:
+                    continue
+                provider = operator_info.get("brand") or operator_info.get("operator")
+                if provider:
+                    return provider
+        return None
+
+    def wait_for_message(self, predicate, deadline, start_time_utc=None, poll_interval=WAIT_POLL_INTERVAL_S, max_poll_interval=WAIT_MAX_POLL_INTERVAL_S, max_n_messages=50):
+        """Wait until a message matching a predicate arrives in the backend.
+
+        Polls get_messages with adaptive backoff and returns as soon as a
+        matching message is listed, instead of sleeping for the worst case.
+
+        :param predicate: Check on a single message (as returned by get_messages)
+        :type predicate: callable
+        :param deadline: Max. wait in seconds from now, or a datetime (naive = UTC)
+        :type deadline: float or datetime.datetime
+        :param start_time_utc: Only check messages from this ISO 8601 UTC timestamp onwards, defaults to now
+        :type start_time_utc: str, optional
+        :param poll_interval: First poll interval in seconds, defaults to WAIT_POLL_INTERVAL_S
+        :type poll_interval: float, optional
+        :param max_poll_interval: Max. poll interval in seconds, defaults to WAIT_MAX_POLL_INTERVAL_S
+        :type max_poll_interval: float, optional
+        :param max_n_messages: Max. number of messages per poll, defaults to 50
+        :type max_n_messages: int, optional
+
+        :return: First matching message, None if the deadline passed
+        :rtype: dict or None
+        """
+        def fetch(since):
+            return self.get_messages(start_time_utc=since.strftime(UTC_TIME_FORMAT), end_time_utc=datetime.datetime.utcnow().strftime(UTC_TIME_FORMAT), max_n_messages=max_n_messages)
+        return self._wait_for(fetch, predicate, deadline, poll_interval, max_poll_interval, since=_utc_to_datetime(start_time_utc))
+
+    def wait_for_frame(self, predicate, deadline, start_time_utc=None, poll_interval=WAIT_POLL_INTERVAL_S, max_poll_interval=WAIT_MAX_POLL_INTERVAL_S, max_n_frames=50):
+        """Wait until a data frame matching a predicate arrives in the backend (see wait_for_message).
+
+        :param predicate: Check on a single data frame (as returned by get_frames)
+        :type predicate: callable
+
+        :return: First matching data frame, None if the deadline passed
+        :rtype: dict or None
+        """
+        def fetch(since):
+            return self.get_frames(start_time_utc=since.strftime(UTC_TIME_FORMAT), end_time_utc=datetime.datetime.utcnow().strftime(UTC_TIME_FORMAT), max_n_frames=max_n_frames)
+        return self._wait_for(fetch, predicate, deadline, poll_interval, max_poll_interval, since=_utc_to_datetime(start_time_utc))
+
     def push_downlink_payload(self, payload, description):
         """Set a HEX downlink payload to a device.
 
@@ -134,6 +280,8 @@ class PlatformDevice(Device):
             post_status = self.interface.post("/rest/device_setting_queue", data = DL_DATA)
         except ValueError as e_:
             post_status = False
+        emit_event(DUT_COMMAND, device=self.name, command="push_downlink_payload", payload=payload,
+                   description=description, success=bool(post_status))
         return post_status
 
     def clear_downlink_payloads(self):
@@ -157,6 +305,8 @@ class PlatformDevice(Device):
                 del_status = self.interface.delete(f"/rest/device_setting_queue/{pending_setting_id}")
             except ValueError as e_:
                 del_status = False
+        emit_event(DUT_COMMAND, device=self.name, command="clear_downlink_payloads", cleared=len(pending_settings),
+                   success=bool(del_status))
         return del_status
 
     def queue_firmware(self, fw_package):
@@ -175,6 +325,7 @@ class PlatformDevice(Device):
                 "clearPendingFirmwareUpgrade":False}
             }
         post_status = self.interface.post("/rest/bulk_device_operations/TRACKER", data = FOTA_DATA)
+        emit_event(DUT_COMMAND, device=self.name, command="queue_firmware", fw_package=fw_package)
         return post_status
 
     def clear_queue_firmware_upgrade(self):
@@ -185,6 +336,7 @@ class PlatformDevice(Device):
             "devices":[f"{self.device_id}"],
             }
         post_status = self.interface.post("/rest/bulk_device_operations/TRACKER", data = FOTA_DATA)
+        emit_event(DUT_COMMAND, device=self.name, command="clear_queue_firmware_upgrade")
         return post_status
 
 
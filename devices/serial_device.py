@@ -15,8 +15,10 @@ class SerialDevice(Device):
     :type name: str
     :param device_id: Sensolus Device ID, defaults to ""
     :type device_id: str, optional
+    :param stream_memory_limit: Max. bytes of serial data kept in memory while reading, older data is spilled to disk, defaults to None (keep all in memory)
+    :type stream_memory_limit: int, optional
     """
-    def __init__(self, name, port, device_id="", serial_timeout_s=10, baudrate=115200, timeout=600):
+    def __init__(self, name, port, device_id="", serial_timeout_s=10, baudrate=115200, timeout=600, stream_memory_limit=None):
         super().__init__("SerialDevice", version = 0.1)
         self.device_id = device_id
         self.name = name
@@ -24,13 +26,14 @@ class SerialDevice(Device):
         self.timeout = timeout
         self.baudrate = baudrate
         self.serial_timeout_s = serial_timeout_s
+        self.stream_memory_limit = stream_memory_limit
         self.interface = None
         self.data = None
 
     def connect(self):
         """Connect to the device interface."""
         self.logger.info("Establish connection for the device: %s", self.name)
-        self.interface = RS232Interface(port=self.port, interface_wait_time=self.serial_timeout_s, timeout=self.timeout, baudrate=self.baudrate)
+        self.interface = RS232Interface(port=self.port, interface_wait_time=self.serial_timeout_s, timeout=self.timeout, baudrate=self.baudrate, stream_memory_limit=self.stream_memory_limit)
         self.interface.connect()
 
     def disconnect(self):
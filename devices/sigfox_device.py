@@ -6,14 +6,18 @@ interfaces such as: Sigfox backend, PPK2 interface.
 
 
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
-from NSTAX.devices.device import Device
+from NSTAX.devices.device import Device, WAIT_POLL_INTERVAL_S, WAIT_MAX_POLL_INTERVAL_S
 from NSTAX.interface.sigfox_interface import SigfoxInterface
 from NSTAX.equipment.PPKII import current_measure_ppk2
 from NSTAX.testscripts.lykaner5_current_detect import CurrentDetector, CurrentGraphPlotter
 
 
+SIGFOX_PAGE_SIZE = 100      # Max. messages per request of the Sigfox API
+
+
 class SigfoxDevice(Device):
     """Sigfox device class.
 
@@ -89,6 +93,8 @@ class SigfoxDevice(Device):
     def get_messages(self, limit=None, since=None, before=None):
         """ Get raw Sigfox messages with given conditions.
 
+        Limits above one page are read page by page (see iter_messages).
+
         :param limit: Maximum number of messages to be read, default: None (which returns last 100 messages)
         :type limit: int, optional
         :param since: Returns messages only from this timestamp onwards. Format: "YYYY-MM-SS HH:MM:SS"
@@ -99,7 +105,41 @@ class SigfoxDevice(Device):
         :return: List of messages
         :rtype: list
         """
-        command = f"devices/{self.sigfox_id}/messages"
+        if limit is None:
+            # First page only, in the backend's default size
+            return next(self._iter_pages(self._message_parameters(None, since, before), prefetch=False), [])
+        return list(self.iter_messages(limit=limit, since=since, before=before, prefetch=False))
+
+    def iter_messages(self, limit=None, since=None, before=None, prefetch=True):
+        """ Iterate over raw Sigfox messages, newest first, following the paging cursors of the backend.
+
+        Pages are requested lazily: only while messages are consumed, at most
+        one page ahead of the caller (with prefetch, while the caller
+        processes the current page).
+
+        :param limit: Maximum number of messages to be read, default: None (all messages of the window)
+        :type limit: int, optional
+        :param since: Returns messages only from this timestamp onwards. Format: "YYYY-MM-SS HH:MM:SS"
+        :type since: str, optional
+        :param before: Returns messages only upto this timestamp. Format: "YYYY-MM-SS HH:MM:SS"
+        :type before: str, optional
+        :param prefetch: Request the next page in the background, defaults to True
+        :type prefetch: bool, optional
+
+        :return: Generator of messages
+        :rtype: generator
+        """
+        page_size = SIGFOX_PAGE_SIZE if limit is None else min(limit, SIGFOX_PAGE_SIZE)
+        n_messages = 0
+        for messages in self._iter_pages(self._message_parameters(page_size, since, before), prefetch,
+                                         stop=lambda n_read: limit is not None and n_read >= limit):
+            for message in messages:
+                if limit is not None and n_messages >= limit:
+                    return
+                n_messages += 1
+                yield message
+
+    def _message_parameters(self, limit, since, before):
         parameters = {}
         if limit is not None:
             parameters["limit"] = limit
@@ -107,9 +147,64 @@ class SigfoxDevice(Device):
             parameters["since"] = self._get_epoach_time(since)
         if before is not None:
             parameters["before"] = self._get_epoach_time(before)
+        return parameters
+
+    def _iter_pages(self, parameters, prefetch, stop=None):
+        """ Request message pages, following paging.next until the last page or stop(number of messages read).
+
+        :return: Generator of message lists
+        :rtype: generator
+        """
+        def get_page(command, parameters):
+            r_data = self.interface.get(command, parameters=parameters)
+            return r_data.get("data", []), (r_data.get("paging") or {}).get("next")
+
         self.logger.info("Get messages for device: %s" % self.sigfox_id)
-        r_data = self.interface.get(command, parameters=parameters)
-        return r_data.get("data", [])
+        request = (f"devices/{self.sigfox_id}/messages", parameters)
+        n_read = 0
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            page = None
+            while request is not None:
+                page = page or executor.submit(get_page, *request)
+                messages, next_url = page.result()
+                page = request = None
+                n_read += len(messages)
+                if next_url and messages and not (stop and stop(n_read)):
+                    # The cursor URL carries all parameters
+                    request = (next_url, None)
+                    if prefetch:
+                        page = executor.submit(get_page, *request)
+                yield messages
+
+    def wait_for_message(self, predicate, deadline, since=None, poll_interval=WAIT_POLL_INTERVAL_S, max_poll_interval=WAIT_MAX_POLL_INTERVAL_S, limit=None):
+        """ Wait until a Sigfox message matching a predicate arrives.
+
+        Polls get_messages with adaptive backoff and returns as soon as a
+        matching message is listed, instead of sleeping for the worst case.
+
+        :param predicate: Check on a single message (as returned by get_messages)
+        :type predicate: callable
+        :param deadline: Max. wait in seconds from now, or a datetime (naive = UTC)
+        :type deadline: float or datetime.datetime
+        :param since: Only check messages from this timestamp onwards. Format: "YYYY-MM-SS HH:MM:SS", defaults to now
+        :type since: str, optional
+        :param poll_interval: First poll interval in seconds, defaults to WAIT_POLL_INTERVAL_S
+        :type poll_interval: float, optional
+        :param max_poll_interval: Max. poll interval in seconds, defaults to WAIT_MAX_POLL_INTERVAL_S
+        :type max_poll_interval: float, optional
+        :param limit: Maximum number of messages per poll, default: None (backend default)
+        :type limit: int, optional
+
+        :return: First matching message, None if the deadline passed
+        :rtype: dict or None
+        """
+        if since is not None:
+            since = datetime.datetime.strptime(since, "%Y-%m-%d %H:%M:%S").astimezone(datetime.timezone.utc)
+
+        def fetch(since_dt):
+            # get_messages takes local time strings
+            return self.get_messages(limit=limit, since=since_dt.astimezone().strftime("%Y-%m-%d %H:%M:%S"))
+        return self._wait_for(fetch, predicate, deadline, poll_interval, max_poll_interval, since=since)
 
     def is_connected(self):
         """ Checks if the connection to the Sigfox device still on
@@ -9,6 +9,7 @@ from ctypes import *
 import csv
 
 from NSTAX.equipment.equipment import Equipment
+from NSTAX.logger.timebase import now_ns
 
 # Config Params
 NUM_CHANNELS = 4  # Max 4 channels for DT9837
@@ -45,6 +46,7 @@ class DT9837(Equipment):
         # self.dt_lib = CDLL(f"{NSTA_PATH}\static\signal_analysis\dt9837_lib.so")
         dll_path = path + "static/signal_analysis/dt9837_lib.so"
         self.dt_lib = CDLL(f"{dll_path}")
+        self.measurement_start_ns = None    # Timebase timestamp of the last measurement start
 
     def connect(self):
         """Connect to the device."""
@@ -103,6 +105,7 @@ class DT9837(Equipment):
         self.logger.info(
             f"[Signal Analyzer]: Measurement Started for {duration} seconds")
         print(f"[Signal Analyzer]: Measurement Started for {duration} seconds")
+        self.measurement_start_ns = now_ns()
         err_code = self.measure(True, NUM_CHANNELS,
                                 CLOCK_FREQUENCY, ALL_CHANNEL_GAIN, CHANNEL_GAIN_0, CHANNEL_GAIN_1, CHANNEL_GAIN_2, CHANNEL_GAIN_3, True, duration)
         self._error_check(err_code)
@@ -149,6 +152,7 @@ class DT9837(Equipment):
         # Measurement Excecution
         self.logger.info(
             f"[Signal Analyzer]: Measurement Started for {duration} seconds")
+        self.measurement_start_ns = now_ns()
         err_code = self.measure(use_default_vals, NUM_CHANNELS,
                                 CLOCK_FREQUENCY, ALL_CHANNEL_GAIN, CHANNEL_GAIN_0, CHANNEL_GAIN_1, CHANNEL_GAIN_2, CHANNEL_GAIN_3, timer_enabled, duration)
         self._error_check(err_code)
@@ -227,6 +231,7 @@ class DT9837(Equipment):
         else:
             self.logger.info(
                 f"[Signal Analyzer]: Squarewave Output till keypress. Read_Input {read_input}")
+        self.measurement_start_ns = now_ns()
         err_code = self.generate(use_default_vals, read_input, CLOCK_FREQUENCY, ALL_CHANNEL_GAIN,
                                  WAVEFORM_AMPLITUDE, WAVEFORM_FREQUENCY, timer_enabled, duration)
         self._error_check(err_code)
@@ -248,7 +253,22 @@ class DT9837(Equipment):
         else:
             return ERR_CFG_SUCCESS, ERR_CFG_SUCCESS
 
-    def save_measurement_to_csv(self, time_vals, sensor_vals, filename="", suffix=""):
+    def get_timestamps_ns(self, time_vals):
+        """Converts measurement times to shared timebase timestamps.
+
+        The board reports times relative to the measurement start, which is
+        taken from the timebase when the measurement is triggered.
+
+        :param time_vals: List of time values in milliseconds.
+        :type time_vals: list
+        :return: Timestamps in ns since epoch UTC.
+        :rtype: list
+        """
+        if self.measurement_start_ns is None:
+            raise ValueError("Error in timestamps !", "No measurement started")
+        return [self.measurement_start_ns + int(round(t * 1e6)) for t in time_vals]
+
+    def save_measurement_to_csv(self, time_vals, sensor_vals, filename="", suffix="", timestamps_ns=None):
         """Saves the measurement data to a CSV file.
         
         :param time_vals: List of time values in milliseconds.
@@ -259,6 +279,8 @@ class DT9837(Equipment):
         :type filename: str, optional
         :param suffix: Suffix to append to the filename, defaults to "".
         :type suffix: str, optional
+        :param timestamps_ns: Timebase timestamps of the values (see get_timestamps_ns), added as last column, defaults to None.
+        :type timestamps_ns: list, optional
         """
         csv_file = f"{filename}AXL_sensor_data{suffix}.csv"
         # Write to CSV
@@ -266,11 +288,17 @@ class DT9837(Equipment):
             writer = csv.writer(file)
 
             # Write headers
-            writer.writerow(["time(s)", "accel_x(g)", "accel_y(g)", "accel_z(g)", "DAC(V)"])
+            header = ["time(s)", "accel_x(g)", "accel_y(g)", "accel_z(g)", "DAC(V)"]
+            if timestamps_ns is not None:
+                header.append("timestamp_ns")
+            writer.writerow(header)
 
             # Write data
             for i in range(len(time_vals)):
-                writer.writerow([time_vals[i], sensor_vals[0][i], sensor_vals[1][i], sensor_vals[2][i], sensor_vals[3][i]])
+                row = [time_vals[i], sensor_vals[0][i], sensor_vals[1][i], sensor_vals[2][i], sensor_vals[3][i]]
+                if timestamps_ns is not None:
+                    row.append(timestamps_ns[i])
+                writer.writerow(row)
 
     def _error_check(self, err_code):
         """Represents the different error codes that occur from the shared .so library
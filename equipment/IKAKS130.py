@@ -8,6 +8,7 @@ from time import sleep
 
 from NSTAX.equipment.equipment import Equipment
 from NSTAX.interface.rs232_interface import RS232Interface
+from NSTAX.logger.event_journal import emit_event, EQUIPMENT_ACTION
 
 # Error Codes
 error_codes = {
@@ -71,11 +72,13 @@ class IKAKS130(Equipment):
         """Start shaking over a given RPM"""
         cmd = "OUT_SP_4 {}".format(rpm)
         self.interface.write_data(cmd)
+        emit_event(EQUIPMENT_ACTION, equipment=self.name, action="shake_start", rpm=rpm)
 
     def stop(self):
         """Stop shaking"""
         cmd = "OUT_SP_4 0"
         self.interface.write_data(cmd)
+        emit_event(EQUIPMENT_ACTION, equipment=self.name, action="shake_stop")
 
     def read_real_value(self):
         """Read real value from device"""
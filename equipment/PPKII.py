@@ -21,6 +21,7 @@ import numpy as np
 
 from NSTAX.equipment.equipment import Equipment
 from NSTAX.interface.rs232_interface import RS232Interface
+from NSTAX.logger.timebase import now_ns, SampleTimestampWriter
 
 class PPK2_Command():
     """Serial command opcodes"""
@@ -553,6 +554,8 @@ class PPK2Logger:
         self.total_samples_after_post = 0
         self.logger_filename = ""
         self.csvfile = None
+        self.sample_timestamps = None    # Timebase timestamp of the first row of every read batch
+        self.total_rows = 0
 
         self.total_reads = 0
         self.total_n_samples = 0
@@ -581,7 +584,12 @@ class PPK2Logger:
         # self.PPK2.toggle_DUT_power("OFF")
         del self.PPK2
         print (f"Closing log: {self.logger_filename}")
+        if self.csvfile is None:
+            # Capture never initialized, no log to finish
+            return
         self.csvfile.close()
+        if self.sample_timestamps is not None:
+            self.sample_timestamps.close()
         self._add_time_to_log()
         self._compress_log()
 
@@ -611,6 +619,7 @@ class PPK2Logger:
         # if not self.logger_filename:
         #     self.logger_filename = "./ppk2_out.csv"
         self.csvfile = open(self.logger_filename, "w")
+        self.sample_timestamps = SampleTimestampWriter(self.logger_filename)
         self.PPK2.toggle_DUT_power("ON")
 
     def _measurement_activity_raw(self):
@@ -619,9 +628,11 @@ class PPK2Logger:
             read_data = self.PPK2.get_data()
             if read_data != b'':
                 self.total_reads += 1
+                self.sample_timestamps.add(self.total_rows, now_ns())
                 samples, raw_digital = self.PPK2.get_samples(read_data)
                 for data in samples:
                     self.csvfile.write(f"{data}\n")
+                self.total_rows += len(samples)
             time.sleep(0.001)  # lower time between sampling -> less samples read in one sampling period
 
     def _measurement_activity(self):
@@ -630,7 +641,7 @@ class PPK2Logger:
             read_data = self.PPK2.get_data()
             if read_data != b'':
                 self.total_reads += 1
-                current_time_utc = datetime.datetime.utcnow().strftime('%d-%m-%Y_%H:%M:%S.%f')
+                self.sample_timestamps.add(self.total_rows, now_ns())
                 samples, raw_digital = self.PPK2.get_samples(read_data)
                 data_ = self._slice_buffer(samples)
                 n_samples = len(samples)
@@ -638,8 +649,8 @@ class PPK2Logger:
                 sum_samples = sum(samples)
                 avg_samples = n_samples / sum_samples
                 for data in data_:
-                    # self.csvfile.write(f"{current_time_utc},{data}\n")
                     self.csvfile.write(f"{data}\n")
+                self.total_rows += len(data_)
             time.sleep(0.001)  # lower time between sampling -> less samples read in one sampling period
 
     def _slice_buffer(self, buffer):
@@ -678,8 +689,12 @@ class PPK2Logger:
             print (f"Compressing log to: {comperessed_logger_filename}")
             with zipfile.ZipFile(comperessed_logger_filename, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zf_:
                 zf_.write(self.logger_filename)
+                if self.sample_timestamps is not None:
+                    zf_.write(self.sample_timestamps.path)
                 print (f"Removing original log: {self.logger_filename}")
                 os.remove(self.logger_filename)
+                if self.sample_timestamps is not None:
+                    os.remove(self.sample_timestamps.path)
             # DEBUG: Added to reduce space consumption
             # os.remove(comperessed_logger_filename)
 
@@ -10,6 +10,7 @@ from threading import Thread
 
 from NSTAX.equipment.equipment import Equipment
 from NSTAX.equipment.EDU33211A import EDU33211A
+from NSTAX.logger.event_journal import emit_event, EQUIPMENT_ACTION
 
 
 class SHKR2075E(Equipment):
@@ -83,8 +84,10 @@ class SHKR2075E(Equipment):
 
         self.signalgenerator.generate_sinwave(freq, voltage, 0, 0)
         self.signalgenerator.enable_output()
+        emit_event(EQUIPMENT_ACTION, equipment=self.name, action="shake_start", frequency_hz=freq, voltage_vpp=voltage, duration_s=duration)
         sleep(duration)
         self.signalgenerator.disable_output()
+        emit_event(EQUIPMENT_ACTION, equipment=self.name, action="shake_stop")
         
     def send_output_threaded(self, freq, voltage, duration, delay_start=False):
         """Send a sine wave output at the specified frequency, voltage and duration
@@ -0,0 +1,146 @@
+"""Asyncio client layer over the blocking backend interfaces.
+
+Purpose of this module is to keep many backend requests in flight for
+multi-device operations. The interfaces (SensolusWebInterface,
+RESTAPIInterface, SigfoxInterface) stay blocking: their calls run on a thread
+pool and are awaited from asyncio. The number of calls in flight is bounded
+overall (max_concurrency) and per backend host (per_host_limit), the latter
+matching the connections kept alive per host by the session pool.
+
+Synchronous callers use the batch helpers through run(), e.g.:
+
+    with AsyncClient() as client:
+        frames = client.run(client.fetch_frames(devices, start_time_utc, end_time_utc))
+"""
+
+
+import asyncio
+from functools import partial
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+from NSTAX.interface.session_pool import POOL_SIZE
+
+
+MAX_CONCURRENCY = 64            # Calls in flight over all hosts
+PER_HOST_LIMIT = POOL_SIZE      # Calls in flight per backend host
+
+
+def _host_of(interface):
+    """Get the backend host of an interface, "" if it has no base URL."""
+    base_url = getattr(interface, "base_url", "") or getattr(interface, "baseurl", "")
+    return urlparse(base_url).netloc
+
+
+class AsyncClient:
+    """Bounded-concurrency asyncio access to blocking interfaces.
+
+    :param interface: Interface used by get/post/delete, defaults to None
+    :type interface: Interface, optional
+    :param max_concurrency: Max. number of calls in flight, defaults to MAX_CONCURRENCY
+    :type max_concurrency: int, optional
+    :param per_host_limit: Max. number of calls in flight per backend host, defaults to PER_HOST_LIMIT
+    :type per_host_limit: int, optional
+    """
+    def __init__(self, interface=None, max_concurrency=MAX_CONCURRENCY, per_host_limit=PER_HOST_LIMIT):
+        if max_concurrency < 1 or per_host_limit < 1:
+            raise ValueError("Error in async client !", f"max_concurrency: {max_concurrency}, per_host_limit: {per_host_limit}")
+        self.interface = interface
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        # Semaphores belong to an event loop, they are created per loop
+        self._loop = None
+        self._semaphore = None
+        self._host_semaphores = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Shut the thread pool down."""
+        self._executor.shutdown(wait=True)
+
+    def run(self, awaitable):
+        """Run a coroutine of this client from synchronous code and return its result."""
+        return asyncio.run(awaitable)
+
+    def _semaphores(self, host):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._host_semaphores = {}
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._semaphore, self._host_semaphores[host]
+
+    async def call(self, function, *args, host="", **kwargs):
+        """Run a blocking call on the thread pool within the concurrency limits.
+
+        :param function: Blocking function, e.g. an interface or device method
+        :type function: callable
+        :param host: Backend host the call talks to, counted against per_host_limit, defaults to ""
+        :type host: str, optional
+
+        :return: Return value of the call
+        """
+        semaphore, host_semaphore = self._semaphores(host)
+        async with semaphore, host_semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, partial(function, *args, **kwargs))
+
+    async def get(self, *args, **kwargs):
+        """Awaitable interface.get, same arguments."""
+        return await self.call(self.interface.get, *args, host=_host_of(self.interface), **kwargs)
+
+    async def post(self, *args, **kwargs):
+        """Awaitable interface.post, same arguments."""
+        return await self.call(self.interface.post, *args, host=_host_of(self.interface), **kwargs)
+
+    async def delete(self, *args, **kwargs):
+        """Awaitable interface.delete, same arguments."""
+        return await self.call(self.interface.delete, *args, host=_host_of(self.interface), **kwargs)
+
+    async def map_devices(self, function, devices, return_exceptions=False):
+        """Call a blocking function for each device concurrently.
+
+        :param function: Called with a connected device, e.g. lambda device: device.get_messages()
+        :type function: callable
+        :param devices: Connected devices, their interface host is counted against per_host_limit
+        :type devices: list
+        :param return_exceptions: Return the exception of a failed device instead of raising it, defaults to False
+        :type return_exceptions: bool, optional
+
+        :return: Results in device order
+        :rtype: list
+        """
+        return await asyncio.gather(*(self.call(function, device, host=_host_of(device.interface)) for device in devices),
+                                    return_exceptions=return_exceptions)
+
+    async def fetch_frames(self, devices, start_time_utc=None, end_time_utc=None, max_n_frames=None, return_exceptions=False):
+        """Fetch the data frames of platform devices over one time window (see PlatformDevice.get_frames).
+
+        Each device requests its pages one by one, the devices run
+        concurrently, so the calls in flight stay within the limits.
+
+        :return: List of data frames per device ID
+        :rtype: dict
+        """
+        results = await self.map_devices(
+            lambda device: device.get_frames(start_time_utc, end_time_utc, max_n_frames=max_n_frames, max_workers=1),
+            devices, return_exceptions)
+        return {device.device_id: frames for device, frames in zip(devices, results)}
+
+    async def fetch_messages(self, devices, start_time_utc=None, end_time_utc=None, max_n_messages=None, return_exceptions=False):
+        """Fetch the messages of platform devices over one time window (see PlatformDevice.get_messages).
+
+        :return: List of messages per device ID
+        :rtype: dict
+        """
+        results = await self.map_devices(
+            lambda device: device.get_messages(start_time_utc, end_time_utc, max_n_messages=max_n_messages, max_workers=1),
+            devices, return_exceptions)
+        return {device.device_id: messages for device, messages in zip(devices, results)}
@@ -0,0 +1,102 @@
+"""JSON handling of backend responses.
+
+Purpose of this module is to parse each backend response body exactly once,
+with orjson when it is installed (json otherwise), and to log a one-line
+summary of a response (status, size, latency, number of items) instead of
+its body.
+
+Large list responses can be streamed: with ijson installed, the items are
+parsed one by one while the body is downloaded, so the whole document is
+never held in memory. Without ijson the body is parsed in one go.
+
+orjson and ijson are optional, see requirements.txt.
+"""
+
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def loads(body):
+    """Parse a JSON document.
+
+    :param body: JSON document
+    :type body: bytes or str
+
+    :return: Pythonic representation of the document
+    :rtype: dict, list, str, int, float, True, False, None
+    :raises ValueError: If the document is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def parse_response(response, default=None):
+    """Parse the body of a response once.
+
+    :param response: Response, read completely
+    :type response: requests.Response
+    :param default: Returned if the body is empty or not valid JSON, defaults to None
+    :type default: optional
+
+    :return: Pythonic representation of the body
+    :rtype: dict, list, str, int, float, True, False, None
+    """
+    try:
+        return loads(response.content)
+    except ValueError:
+        return default
+
+
+def response_summary(response, data=None):
+    """Summarize a response for logging: request, status, body size, latency and number of items.
+
+    :param response: Response, read completely
+    :type response: requests.Response
+    :param data: Parsed body, its number of items (or of items of its "data" list) is included, defaults to None
+    :type data: optional
+
+    :rtype: str
+    """
+    summary = f"{response.request.method} {response.url} -> {response.status_code}, {len(response.content)} B, {response.elapsed.total_seconds() * 1000:.0f} ms"
+    if isinstance(data, dict) and isinstance(data.get("data"), list):
+        data = data["data"]
+    if isinstance(data, list):
+        summary += f", {len(data)} items"
+    return summary
+
+
+def iter_items(response, prefix="item"):
+    """Iterate over the items of a list within a JSON response body.
+
+    :param response: Response requested with stream=True, it is read while iterating
+    :type response: requests.Response
+    :param prefix: Path of the list in ijson notation: "item" for a top-level list, "data.item" for the list under key "data", defaults to "item"
+    :type prefix: str, optional
+
+    :return: Generator of items
+    :rtype: generator
+    """
+    if ijson is not None:
+        # Let urllib3 undo the content encoding (gzip) while ijson reads
+        response.raw.decode_content = True
+        # Floats like loads, not decimal.Decimal
+        yield from ijson.items(response.raw, prefix, use_float=True)
+        return
+    *keys, last = prefix.split(".")
+    if last != "item":
+        raise ValueError("Error in JSON prefix !", f"prefix: {prefix}")
+    data = loads(response.content)
+    for key in keys:
+        data = data.get(key, []) if isinstance(data, dict) else []
+    yield from data
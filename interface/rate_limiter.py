@@ -0,0 +1,145 @@
+"""Rate limiting of backend API calls.
+
+Purpose of this module is to keep API calls within the quota of a backend
+without waiting when there is budget left. A token bucket per quota is shared
+by all threads and interface instances of a process: a call takes a token and
+only waits if the bucket is empty. When the backend still answers 429 (Too
+Many Requests), the call is repeated after the Retry-After time of the
+response (or an exponential backoff without it) plus a random jitter, and the
+bucket is paused for the other callers as well.
+"""
+
+
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+
+
+TOO_MANY_REQUESTS = 429
+MAX_RETRIES = 5
+BACKOFF_BASE_S = 1          # Backoff after the first 429 without Retry-After, doubled per retry
+MAX_BACKOFF_S = 60
+JITTER_S = 0.5              # Max. random delay added to each backoff
+
+logger = logging.getLogger('NSTA.{}'.format(__name__))
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    :param rate: Tokens added per second, i.e. the sustained number of calls per second
+    :type rate: float
+    :param capacity: Max. number of tokens, i.e. the number of calls allowed in a burst, defaults to 1
+    :type capacity: float, optional
+    """
+    def __init__(self, rate, capacity=1):
+        if rate <= 0 or capacity < 1:
+            raise ValueError("Error in token bucket !", f"rate: {rate}, capacity: {capacity}")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, waiting until one is available.
+
+        :return: Time waited in seconds
+        :rtype: float
+        """
+        waited = 0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds):
+        """Hand out no tokens for a time, e.g. after the backend reported the quota as exceeded."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_token_bucket(key, rate, capacity=1):
+    """Get the process-wide token bucket of a quota, created on first use.
+
+    :param key: Identity of the quota, e.g. (API host, login)
+    :type key: tuple
+
+    :return: The token bucket
+    :rtype: TokenBucket
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rate, capacity)
+            _buckets[key] = bucket
+        return bucket
+
+
+def retry_after_seconds(response, attempt):
+    """Get the wait before repeating a call answered with 429.
+
+    :param response: The 429 response
+    :type response: requests.Response
+    :param attempt: Number of retries so far
+    :type attempt: int
+
+    :return: Wait in seconds, Retry-After (in seconds or as HTTP date) or exponential backoff, plus jitter
+    :rtype: float
+    """
+    retry_after = response.headers.get("Retry-After")
+    wait = None
+    if retry_after:
+        try:
+            wait = float(retry_after)
+        except ValueError:
+            try:
+                wait = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                wait = None
+    if wait is None:
+        wait = BACKOFF_BASE_S * 2 ** attempt
+    return min(max(wait, 0), MAX_BACKOFF_S) + random.uniform(0, JITTER_S)
+
+
+def send_limited(bucket, send, max_retries=MAX_RETRIES):
+    """Issue a call within the quota of a token bucket, repeating it while answered with 429.
+
+    :param bucket: Token bucket of the quota
+    :type bucket: TokenBucket
+    :param send: Issues the call and returns the requests.Response
+    :type send: callable
+    :param max_retries: Max. number of repetitions, defaults to MAX_RETRIES
+    :type max_retries: int, optional
+
+    :return: Response of the last attempt
+    :rtype: requests.Response
+    """
+    attempt = 0
+    while True:
+        bucket.acquire()
+        response = send()
+        if response.status_code != TOO_MANY_REQUESTS or attempt >= max_retries:
+            return response
+        wait = retry_after_seconds(response, attempt)
+        logger.info("Rate limited (429), retrying in %.1f s: %s", wait, response.url)
+        bucket.pause(wait)
+        attempt += 1
@@ -6,12 +6,12 @@ and equipment.
 
 
 from time import sleep
-import json
 from urllib.parse import urljoin, urlparse
 import requests
 
 
 from NSTAX.interface.interface import Interface
+from NSTAX.interface.json_response import loads, response_summary
 
 
 class RESTAPIInterface(Interface):
@@ -58,8 +58,9 @@ class RESTAPIInterface(Interface):
         response.close()
         if not response.ok:
             raise ValueError("Error in Get command !", response.status_code, response.reason, response.content)
-        self.logger.info("Response: %s, via interface: %s", json.loads(response.text), type(self).__name__)
-        return json.loads(response.text)
+        response_data = loads(response.content)
+        self.logger.info("Response: %s, via interface: %s", response_summary(response, response_data), type(self).__name__)
+        return response_data
 
     def post(self):
         """API HTTP POST message.
@@ -13,10 +13,11 @@ import serial
 import threading
 import csv
 import time
-from datetime import datetime
 import logging
 
 from NSTAX.interface.interface import Interface
+from NSTAX.interface.stream_buffer import StreamBuffer
+from NSTAX.logger.timebase import now_ns, ns_to_datetime
 
 
 class RS232Interface(Interface):
@@ -34,8 +35,10 @@ class RS232Interface(Interface):
     :type bin_cmd: bool, optional
     :param interface_wait_time: Waiting time between interface calls, default: 0.1s
     :type interface_wait_time: float, optional
+    :param stream_memory_limit: Max. bytes of a data stream kept in memory, older data is spilled to disk. None keeps the whole stream in memory, default: None
+    :type stream_memory_limit: int, optional
     """
-    def __init__(self, port, baudrate=115200, prompt="", EOL="\r", bin_cmd=False, interface_wait_time=0.1, bytesize=8, stopbits=1.0, parity="N", rtscts=False, timeout=None):
+    def __init__(self, port, baudrate=115200, prompt="", EOL="\r", bin_cmd=False, interface_wait_time=0.1, bytesize=8, stopbits=1.0, parity="N", rtscts=False, timeout=None, stream_memory_limit=None):
         super().__init__("RS232", version = 0.1)
         # General Serial Interface parameters
         self.interface_wait_time = interface_wait_time
@@ -59,6 +62,7 @@ class RS232Interface(Interface):
         self.serial_thread = None
         self.lock = threading.Lock()
         self.data_queue = queue.Queue()
+        self.stream_memory_limit = stream_memory_limit
 
     def _str_to_bin(self, arg_list=None):
         ret_arg_list = []
@@ -201,7 +205,11 @@ class RS232Interface(Interface):
         self.serial_thread.start()
 
     def read_data_stream_stop(self):
-        """Await running logger thread and end measurement"""
+        """Await running logger thread and end measurement.
+
+        :return: Recorded data stream, a StreamBuffer if stream_memory_limit is set
+        :rtype: str, bytes or StreamBuffer
+        """
         with self.lock:
             self.in_measurement = False
         if self.serial_thread:
@@ -219,13 +227,21 @@ class RS232Interface(Interface):
         :param file_path: Path to the CSV file
         :type file_path: str
         :param data_stream: Data stream payload to save
-        :type data_stream: str or bytes
+        :type data_stream: str, bytes or StreamBuffer
         """
         if not data_stream:
             self.logger.warning("No data stream payload provided. Nothing to save.")
             return
 
         with open(file_path, mode='w', encoding='utf-8') as file:
+            if isinstance(data_stream, StreamBuffer):
+                # Stream line by line, the buffer may hold far more than fits in memory
+                for line in data_stream.iter_lines():
+                    if isinstance(line, bytes):
+                        line = line.decode("utf-8", errors="replace")
+                    file.write(f"{line}\n")
+                self.logger.info(f"Data stream saved to file: {file_path}")
+                return
             if isinstance(data_stream, bytes):
                 data_stream = data_stream.decode("utf-8", errors="replace")
             for line in data_stream.split('\n'):
@@ -240,9 +256,14 @@ class RS232Interface(Interface):
         :param timestamp_en: If True, prepend each line with a timestamp
         :type timestamp_en: bool, optional
         :return: Data chunk read from the device over serial port
-        :rtype: str or bytes
+        :rtype: str, bytes or StreamBuffer
         """
         blank_char = b"" if self.bin_cmd else ""
+        printable = lambda s: blank_char.join(c for c in s if c in string.printable)
+        if self.stream_memory_limit:
+            stream_buffer = StreamBuffer(memory_limit=self.stream_memory_limit, binary=self.bin_cmd)
+        else:
+            stream_buffer = None
         data = []
         errors = 0
         while self.in_measurement:
@@ -255,7 +276,7 @@ class RS232Interface(Interface):
                     break
                 self.logger.debug(f"|LOGGER_DEBUG|:{line}")
                 if timestamp_en:
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+                    timestamp = ns_to_datetime(now_ns(), local=True).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
                 if not self.bin_cmd:
                     line = line.decode("utf-8").strip()
                     if timestamp_en:
@@ -267,7 +288,12 @@ class RS232Interface(Interface):
                         line_with_ts = timestamp.encode("utf-8") + b" " + line.rstrip(b"\r\n") + b"\n"
                     else:
                         line_with_ts = line.rstrip(b"\r\n") + b"\n"
-                data.append(line_with_ts)
+                if stream_buffer is None:
+                    data.append(line_with_ts)
+                elif self.bin_cmd:
+                    stream_buffer.append(line_with_ts)
+                else:
+                    stream_buffer.append(printable(line_with_ts))
                 errors = 0
                 sleep(self.interface_wait_time)
             else:
@@ -277,11 +303,12 @@ class RS232Interface(Interface):
                     break
                 sleep(self.interface_wait_time)
         self.logger.info("Serial data stream thread exiting.")
-        if self.bin_cmd:
+        if stream_buffer is not None:
+            self.data_queue.put(stream_buffer)
+        elif self.bin_cmd:
             self.data_queue.put(b"".join(data))
         else:
             data = "".join(data)
-            printable = lambda s: blank_char.join(c for c in s if c in string.printable)
             self.data_queue.put(printable(data).strip())
             
 
@@ -9,13 +9,27 @@ API based web session replication.
 
 
 from time import sleep
-import json
+from functools import partial
 from urllib.parse import urljoin, urlparse
 import requests
 import yaml
 
 
 from NSTAX.interface.interface import Interface
+from NSTAX.interface.session_pool import get_session_pool
+from NSTAX.interface.json_response import loads, parse_response, response_summary, iter_items
+
+
+DEFAULT_HEADERS = {'X-Csrf-Token':'123'}
+
+
+def _csrf_login(auth_url, username, password, session):
+    """Logs a session in to stickntrack and returns its CSRF token header."""
+    response = session.post(f"{auth_url}{username}?_csrf=undefined", data=password)
+    if not response.ok:
+        raise ValueError("Error in Authentication !", response.status_code, response.reason)
+    response_data = loads(response.content)
+    return {'X-Csrf-Token':response_data['csrfToken']}
 
 
 class SensolusWebInterface(Interface):
@@ -26,25 +40,29 @@ class SensolusWebInterface(Interface):
         self.base_url = self.auth_path = self.auth_username = self.auth_password = ""
         self.teststation_config_file = "../NSTA/config/teststation_config.yaml"
         self._get_configuration()
-        self.session = requests.Session()
+        self.session_pool = None
         self.interface_wait_time = 1
-        self.headers = {'X-Csrf-Token':'123'}
 
     def connect(self):
         """Connects to the Web Interface.
+
+        Interfaces with the same credentials share one pool of logged-in
+        sessions, only the first connect of a process logs in.
         """
         self.logger.info("Connecting to the interface: %s", type(self).__name__)
         if self.auth_path:
             # Authenticate
             auth_url = self._urljoin(url_segments=(self.base_url, self.auth_path)).rstrip("/") + "/"
-            response = self.session.post(f"{auth_url}{self.auth_username}?_csrf=undefined", data=self.auth_password)
-            if response.ok:
+            self.session_pool = get_session_pool(
+                (self.base_url, auth_url, self.auth_username, self.auth_password),
+                login=partial(_csrf_login, auth_url, self.auth_username, self.auth_password),
+                headers=DEFAULT_HEADERS)
+            try:
+                with self.session_pool.checkout() as pooled:
+                    if not pooled.logged_in:
+                        pooled.login()
                 self.connected = True
-                # saving token 
-                response_data = json.loads(response.content)
-                x_csrf_token_value = response_data['csrfToken']
-                self.headers = {'X-Csrf-Token':x_csrf_token_value}                             
-            else:
+            except (ValueError, KeyError, requests.exceptions.RequestException) as e_:
                 self.connected = False
                 self.logger.info("Error Authentication, check url and login credentials")
         else:
@@ -54,6 +72,7 @@ class SensolusWebInterface(Interface):
             try:
                 requests.head(url_root)
                 sleep(self.interface_wait_time)
+                self.session_pool = get_session_pool((self.base_url,), headers=DEFAULT_HEADERS)
                 self.connected = True
             except requests.exceptions.ConnectionError as e_:
                 self.connected = False
@@ -72,31 +91,68 @@ class SensolusWebInterface(Interface):
         """
         base_url_t = self.base_url.rstrip("/") + "/"
         requests_url = urljoin(base_url_t, path)
-        response = self.session.get(requests_url, params=parameters)
-        response.close()
+        response = self._request("GET", requests_url, params=parameters)
         if not response.ok:
             raise ValueError("Error in Get command !", response.status_code, response.reason, response.content)
-        response_text = self._load_json_response_text(response.text)
-        #self.logger.info("Response: %s, via interface: %s", response_text, type(self).__name__)
+        response_text = parse_response(response, default="")
+        self.logger.debug("Response: %s, via interface: %s", response_summary(response, response_text), type(self).__name__)
         return response_text
 
-    def post(self, path, data):
+    def iter_items(self, path, parameters=None, prefix="item"):
+        """Issues an HTTP GET message and iterates over a list in the response while it is downloaded.
+
+        Meant for large list responses (see json_response.iter_items). The
+        pooled session is held until the iteration ends.
+
+        :param path: URL string following the baseurl
+        :type path: str
+        :param parameters: Dictionary of url parameters, defaults to None
+        :type parameters: dict, optional
+        :param prefix: Path of the list, "item" for a top-level list, "data.item" for the list under key "data", defaults to "item"
+        :type prefix: str, optional
+
+        :return: Generator of list items
+        :rtype: generator
+        """
+        if self.session_pool is None:
+            raise ValueError("Error in Request !", "Interface not connected", path)
+        base_url_t = self.base_url.rstrip("/") + "/"
+        requests_url = urljoin(base_url_t, path)
+        with self.session_pool.checkout() as pooled:
+            response = pooled.request("GET", requests_url, params=parameters, stream=True)
+            with response:
+                if not response.ok:
+                    raise ValueError("Error in Get command !", response.status_code, response.reason, response.content)
+                n_items = 0
+                for item in iter_items(response, prefix):
+                    n_items += 1
+                    yield item
+                self.logger.debug("Response: GET %s -> %s, %s items streamed, via interface: %s", response.url, response.status_code, n_items, type(self).__name__)
+
+    def post(self, path, data, return_response=False):
         """Issues an HTTP POST message.
 
         :param path: URL string following the baseurl
         :type path: str
         :param data: json data to send in the body of the request dictionary of url parameters
         :type data: dict
+        :param return_response: Return the parsed response body instead of the success flag, defaults to False
+        :type return_response: bool, optional
+
+        :return: True on success, or the Pythonic representation of the Json response if return_response
+        :rtype: bool, dict, list, str, int, float, None
         """
         # adding  csrfToken
         base_url_t = self.base_url.rstrip("/") + "/"
         requests_url = urljoin(base_url_t, path)
-        response = self.session.post(requests_url, headers=self.headers, json=data)
-        response.close()
+        response = self._request("POST", requests_url, json=data)
         if not response.ok:
             raise ValueError("Error in Post command !", response.status_code, response.reason, response.content)
-        response_text = self._load_json_response_text(response.text)
-        self.logger.info("Response: %s, via interface: %s", response_text, type(self).__name__)
+        if return_response:
+            response_text = parse_response(response, default="")
+            self.logger.info("Response: %s, via interface: %s", response_summary(response, response_text), type(self).__name__)
+            return response_text
+        self.logger.info("Response: %s, via interface: %s", response_summary(response), type(self).__name__)
         return response.ok
 
     def delete(self, path, parameters=None):
@@ -112,21 +168,20 @@ class SensolusWebInterface(Interface):
         """
         base_url_t = self.base_url.rstrip("/") + "/"
         requests_url = urljoin(base_url_t, path)
-        response = self.session.delete(requests_url, headers=self.headers, params=parameters)
-        response.close()
+        response = self._request("DELETE", requests_url, params=parameters)
         if not response.ok:
             raise ValueError("Error in Delete command !", response.status_code, response.reason, response.content)
-        response_text = self._load_json_response_text(response.text)
-        self.logger.info("Response: %s, via interface: %s", response_text, type(self).__name__)
+        response_text = parse_response(response, default="")
+        self.logger.info("Response: %s, via interface: %s", response_summary(response, response_text), type(self).__name__)
         return response_text
-        
 
-    def _load_json_response_text(self, response_json_str):
-        try:
-            resp_str = json.loads(response_json_str)
-        except json.decoder.JSONDecodeError as e_:
-            resp_str = ""
-        return resp_str
+    def _request(self, method, url, **kwargs):
+        if self.session_pool is None:
+            raise ValueError("Error in Request !", "Interface not connected", url)
+        with self.session_pool.checkout() as pooled:
+            response = pooled.request(method, url, **kwargs)
+        response.close()
+        return response
 
     def _urljoin(self, url_segments=None):
         try:
@@ -162,9 +217,12 @@ class SensolusWebInterface(Interface):
 
     def disconnect(self):
         """Close web interfaces session.
+
+        The pooled sessions stay open for the other interfaces of the process,
+        see session_pool.close_session_pools.
         """
         self.logger.info("Disconnecting from the interface: %s", type(self).__name__)
-        self.session.close()
+        self.session_pool = None
         self.connected = False
 
 
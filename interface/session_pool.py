@@ -0,0 +1,166 @@
+"""Process-wide pools of authenticated HTTP sessions.
+
+Purpose of this module is to share logged-in requests sessions between all
+interface instances of a process that use the same credentials, instead of
+logging in again for every device. Each pool holds up to POOL_SIZE sessions
+with keep-alive connection pools (HTTPAdapter). A session is used by one
+thread at a time: it is checked out for a request and returned afterwards.
+Sessions log in on first use and log in again when the backend reports the
+login as expired.
+"""
+
+
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+POOL_SIZE = 16              # Sessions per credentials, created on demand
+POOL_MAXSIZE = 10           # Keep-alive connections per host and session
+EXPIRED_STATUS_CODES = (401, 403)
+
+logger = logging.getLogger('NSTA.{}'.format(__name__))
+
+
+class PooledSession:
+    """A requests session of a pool, with its login state.
+
+    :param login: Logs a session in and returns the headers to send with every request,
+        raises ValueError if the login fails, None if no login is needed
+    :type login: callable, optional
+    :param headers: Headers sent with every request until the first login, defaults to None
+    :type headers: dict, optional
+    :param pool_maxsize: Keep-alive connections per host, defaults to POOL_MAXSIZE
+    :type pool_maxsize: int, optional
+    """
+    def __init__(self, login=None, headers=None, pool_maxsize=POOL_MAXSIZE):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.headers = dict(headers or {})
+        self.logged_in = login is None
+        self._login = login
+
+    def login(self):
+        """Log in, whether or not the session is logged in already."""
+        self.headers.update(self._login(self.session) or {})
+        self.logged_in = True
+
+    def request(self, method, url, **kwargs):
+        """Issue a request, logging in first if needed and again once if the login expired.
+
+        :return: Response
+        :rtype: requests.Response
+        """
+        if not self.logged_in:
+            self.login()
+        headers = dict(self.headers, **kwargs.pop("headers", {}))
+        response = self.session.request(method, url, headers=headers, **kwargs)
+        if response.status_code in EXPIRED_STATUS_CODES and self._login is not None:
+            logger.info("Login expired, logging in again: %s", url)
+            response.close()
+            self.login()
+            headers.update(self.headers)
+            response = self.session.request(method, url, headers=headers, **kwargs)
+        return response
+
+    def close(self):
+        """Close the session and its connections."""
+        self.session.close()
+
+
+class SessionPool:
+    """Thread-safe pool of sessions sharing one set of credentials.
+
+    :param login: Login of new sessions (see PooledSession), defaults to None
+    :type login: callable, optional
+    :param headers: Headers of new sessions (see PooledSession), defaults to None
+    :type headers: dict, optional
+    :param size: Max. number of sessions, defaults to POOL_SIZE
+    :type size: int, optional
+    :param pool_maxsize: Keep-alive connections per host and session, defaults to POOL_MAXSIZE
+    :type pool_maxsize: int, optional
+    """
+    def __init__(self, login=None, headers=None, size=POOL_SIZE, pool_maxsize=POOL_MAXSIZE):
+        if size < 1:
+            raise ValueError("Error in session pool !", f"size: {size}")
+        self.login = login
+        self.headers = headers
+        self.size = size
+        self.pool_maxsize = pool_maxsize
+        # Last returned session first, its connections are the most likely to be alive
+        self._idle = queue.LifoQueue()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Get a session for exclusive use, a new one if all are busy and the pool is not full.
+
+        :param timeout: Max. wait in seconds for a free session, defaults to None (no limit)
+        :type timeout: float, optional
+
+        :return: Context manager yielding the session
+        :rtype: PooledSession
+        """
+        try:
+            pooled = self._idle.get_nowait()
+        except queue.Empty:
+            pooled = None
+            with self._lock:
+                if len(self._sessions) < self.size:
+                    pooled = PooledSession(self.login, self.headers, self.pool_maxsize)
+                    self._sessions.append(pooled)
+            if pooled is None:
+                try:
+                    pooled = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No free session within {timeout} s") from None
+        try:
+            yield pooled
+        finally:
+            self._idle.put(pooled)
+
+    def close(self):
+        """Close all sessions of the pool."""
+        with self._lock:
+            for pooled in self._sessions:
+                pooled.close()
+            self._sessions = []
+            self._idle = queue.LifoQueue()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_session_pool(key, login=None, headers=None, size=POOL_SIZE, pool_maxsize=POOL_MAXSIZE):
+    """Get the process-wide session pool of a set of credentials, created on first use.
+
+    :param key: Identity of the credentials, e.g. (base URL, user name, password)
+    :type key: tuple
+    :param login: Login of new sessions (see PooledSession), defaults to None
+    :type login: callable, optional
+
+    :return: The session pool
+    :rtype: SessionPool
+    """
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SessionPool(login, headers, size, pool_maxsize)
+            _pools[key] = pool
+        return pool
+
+
+def close_session_pools():
+    """Close all process-wide session pools, e.g. at the end of a run."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
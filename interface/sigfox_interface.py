@@ -5,24 +5,39 @@ DUTs.
 """
 
 
-from time import sleep
-import json
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
 import requests
 import yaml
 
 from NSTAX.interface.interface import Interface
+from NSTAX.interface.rate_limiter import get_token_bucket, send_limited
+from NSTAX.interface.json_response import loads, response_summary
+
+
+SIGFOX_RATE_LIMIT = 1       # Requests per second, Error 429: "Sorry this api access is limited to : 1r / 1s"
+SIGFOX_BURST = 1            # Requests allowed back to back
+SIGFOX_API_URL = "https://api.sigfox.com/v2"
 
 
 class SigfoxInterface(Interface):
     """Sigfox API interface class.
+
+    Requests of all instances with the same login share one token bucket
+    configured with the API quota, optionally set in the teststation config
+    (sigfox: rate_limit [requests/s], burst). A request only waits if the
+    quota is used up.
+
+    The API URL defaults to SIGFOX_API_URL and can be changed with sigfox: url
+    in the teststation config, e.g. to a local backend stand-in.
     """
     def __init__(self):
         super().__init__("Sigfox", version = 0.1)
         self.teststation_config_file = "../NSTA/config/teststation_config.yaml"
+        self.rate_limit = SIGFOX_RATE_LIMIT
+        self.burst = SIGFOX_BURST
+        self.baseurl = SIGFOX_API_URL
         self.auth = self._get_credentials()
-        self.baseurl = "https://api.sigfox.com/v2"
-        self.interface_wait_time = 1    # Avoid Error 429: "Sorry this api access is limited to : 1r / 1s"
+        self.rate_limiter = get_token_bucket((urlparse(self.baseurl).netloc, self.auth[0]), self.rate_limit, self.burst)
 
     def get(self, message_string, parameters=None):
         """Issue an Sigfox API HTTP GET message and returns the content.
@@ -40,13 +55,13 @@ class SigfoxInterface(Interface):
         requestsurl = self._urljoin(url_segments=(self.baseurl, message_string))
         logger_data = f"GET url: {requestsurl}, with parameters: {parameters}, via interface: {type(self).__name__}"
         self.logger.info(logger_data)
-        response = requests.get(requestsurl, auth=self.auth, params=parameters)
+        response = send_limited(self.rate_limiter, lambda: requests.get(requestsurl, auth=self.auth, params=parameters))
         response.close()    # Free the active port
         if not response.ok:
             raise ValueError("Error in Get command !", response.status_code, response.reason, response.content)
-        sleep(self.interface_wait_time)
-        self.logger.info("Response via interface %s: %s", type(self).__name__, response.text)        
-        return json.loads(response.text)
+        response_data = loads(response.content)
+        self.logger.info("Response via interface %s: %s", type(self).__name__, response_summary(response, response_data))
+        return response_data
 
     def post(self):
         """API HTTP POST message.
@@ -61,7 +76,6 @@ class SigfoxInterface(Interface):
         therefore simply checking the connection out."""
         self.logger.info("Connecting to the interface: %s", type(self).__name__)
         r_data = self.get("coverages/global/predictions", parameters={"lat": 48.28727848006257, "lng": 11.569482913704437})
-        sleep(self.interface_wait_time)
         self.connected = True
 
     def disconnect(self):
@@ -93,6 +107,9 @@ class SigfoxInterface(Interface):
                 ts_config = yaml.safe_load(data_stream)
                 try:
                     login_id, password = ts_config["sigfox"]["login_id"], ts_config["sigfox"]["password"]
+                    self.rate_limit = ts_config["sigfox"].get("rate_limit", self.rate_limit)
+                    self.burst = ts_config["sigfox"].get("burst", self.burst)
+                    self.baseurl = ts_config["sigfox"].get("url", self.baseurl)
                 except KeyError as error_:
                     print (error_)
             except yaml.YAMLError as error_:
@@ -0,0 +1,190 @@
+"""Memory-bounded buffer for long running data streams.
+
+Purpose of this module is to collect arbitrarily long serial sessions without
+growing the process memory. Only a bounded tail of the stream is kept in RAM,
+older content is spilled to a temporary file and read back through mmap.
+"""
+
+
+import os
+import mmap
+import tempfile
+import threading
+import logging
+
+
+class StreamBuffer:
+    """Append-only stream buffer with a bounded in-memory tail.
+
+    The full history stays accessible through slicing (byte offsets) and line
+    iteration, regardless of which part of it lives on disk.
+
+    :param memory_limit: Max. number of bytes kept in memory before spilling to disk, default: 4 MiB
+    :type memory_limit: int, optional
+    :param binary: Yield bytes instead of decoded strings when iterating lines, default: False
+    :type binary: bool, optional
+    :param spill_dir: Directory for the spill file, default: system temp directory
+    :type spill_dir: str, optional
+    :param encoding: Encoding for str payloads and decoded lines, default: utf-8
+    :type encoding: str, optional
+    """
+    def __init__(self, memory_limit=4 * 1024 * 1024, binary=False, spill_dir=None, encoding="utf-8"):
+        self.memory_limit = memory_limit
+        self.binary = binary
+        self.spill_dir = spill_dir
+        self.encoding = encoding
+        self.logger = logging.getLogger('NSTA.{}'.format(__name__))
+        self._tail = bytearray()
+        self._spilled = 0               # Number of bytes moved to the spill file
+        self._spill_file = None
+        self._spill_path = None
+        self._mmap = None
+        self._mmap_size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._spilled + len(self._tail)
+
+    def __getitem__(self, index):
+        """Read from the full history by byte offset or slice (step is not supported)."""
+        with self._lock:
+            size = self._spilled + len(self._tail)
+            if isinstance(index, slice):
+                start, stop, step = index.indices(size)
+                if step != 1:
+                    raise ValueError("StreamBuffer slicing does not support steps")
+                return self._read(start, max(start, stop))
+            if index < 0:
+                index += size
+            if not 0 <= index < size:
+                raise IndexError("StreamBuffer index out of range")
+            return self._read(index, index + 1)[0]
+
+    def __iter__(self):
+        return self.iter_lines()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def append(self, data):
+        """Append a data chunk to the end of the stream.
+
+        :param data: Data chunk, strings are encoded with the buffer encoding
+        :type data: str or bytes
+        """
+        if isinstance(data, str):
+            data = data.encode(self.encoding)
+        with self._lock:
+            self._tail += data
+            if len(self._tail) > self.memory_limit:
+                self._spill()
+
+    def iter_lines(self, chunk_size=1024 * 1024):
+        """Iterate over the lines of the stream recorded so far.
+
+        Lines are returned without the line terminator. Data is read chunk by
+        chunk, so memory usage does not depend on the stream length.
+
+        :param chunk_size: Number of bytes read per step, default: 1 MiB
+        :type chunk_size: int, optional
+
+        :return: Generator of lines
+        :rtype: generator of str or bytes
+        """
+        end = len(self)
+        pos = 0
+        carry = b""
+        while pos < end:
+            with self._lock:
+                chunk = self._read(pos, min(pos + chunk_size, end))
+            pos += len(chunk)
+            lines = (carry + chunk).split(b"\n")
+            carry = lines.pop()
+            for line in lines:
+                yield self._format_line(line)
+        if carry:
+            yield self._format_line(carry)
+
+    def getvalue(self):
+        """Materialize the whole stream.
+
+        :return: Full stream content, decoded unless the buffer is binary
+        :rtype: str or bytes
+        """
+        data = self[:]
+        if self.binary:
+            return data
+        return data.decode(self.encoding, errors="replace")
+
+    def write_to(self, file_obj, chunk_size=1024 * 1024):
+        """Copy the raw stream content into a binary file object chunk by chunk.
+
+        :param file_obj: Target file object opened in binary mode
+        :type file_obj: file
+        :param chunk_size: Number of bytes copied per step, default: 1 MiB
+        :type chunk_size: int, optional
+        """
+        end = len(self)
+        for pos in range(0, end, chunk_size):
+            file_obj.write(self[pos:min(pos + chunk_size, end)])
+
+    def close(self):
+        """Release the spill file and the in-memory tail."""
+        lock = getattr(self, "_lock", None)
+        if lock is None:
+            return
+        with lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+                try:
+                    os.remove(self._spill_path)
+                except OSError as e_:
+                    self.logger.warning("Could not remove stream spill file %s: %s", self._spill_path, e_)
+            self._tail = bytearray()
+            self._spilled = 0
+
+    def _format_line(self, line):
+        line = line.rstrip(b"\r")
+        if self.binary:
+            return line
+        return line.decode(self.encoding, errors="replace")
+
+    def _spill(self):
+        """Move the oldest part of the tail to disk, keeping half the memory limit."""
+        n_spill = len(self._tail) - self.memory_limit // 2
+        if self._spill_file is None:
+            fd, self._spill_path = tempfile.mkstemp(prefix="nsta_stream_", suffix=".bin", dir=self.spill_dir)
+            self._spill_file = os.fdopen(fd, "w+b")
+            self.logger.debug("Spilling data stream to: %s", self._spill_path)
+        self._spill_file.write(memoryview(self._tail)[:n_spill])
+        self._spill_file.flush()
+        del self._tail[:n_spill]
+        self._spilled += n_spill
+
+    def _spill_view(self):
+        """Map the spilled part of the stream, remapping after it has grown."""
+        if self._mmap_size != self._spilled:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = mmap.mmap(self._spill_file.fileno(), self._spilled, access=mmap.ACCESS_READ)
+            self._mmap_size = self._spilled
+        return self._mmap
+
+    def _read(self, start, stop):
+        """Read a byte range over spill file and tail, caller holds the lock."""
+        parts = []
+        if start < self._spilled:
+            parts.append(self._spill_view()[start:min(stop, self._spilled)])
+        if stop > self._spilled:
+            parts.append(bytes(self._tail[max(start - self._spilled, 0):stop - self._spilled]))
+        return b"".join(parts)
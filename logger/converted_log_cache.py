@@ -0,0 +1,144 @@
+"""Cache of converted device logs.
+
+Purpose of this module is to convert every raw log only once. Converted
+tables are stored in a columnar file keyed by the identity of the source log
+(name, size and modification time, or optionally a hash of its content) and
+the version of the parser that produced them. Repeated analyses of the same
+test campaign load the cached tables instead of converting again.
+
+Tables are stored as uncompressed Feather (memory-mapped on read) if pyarrow
+is available, otherwise as HDF5 tables through PyTables.
+"""
+
+
+import os
+import hashlib
+import logging
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+
+CACHE_DIRNAME = ".converted_cache"
+HDF_KEY = "data"
+
+logger = logging.getLogger('NSTA.{}'.format(__name__))
+
+
+class ConvertedLogCache:
+    """Store of converted logs keyed by source identity and parser version.
+
+    :param cache_dir: Directory of the cached tables, created on first write
+    :type cache_dir: str
+    :param hash_content: Key on a SHA-256 of the log content instead of name, size and mtime, defaults to False
+    :type hash_content: bool, optional
+    """
+    def __init__(self, cache_dir, hash_content=False):
+        self.cache_dir = cache_dir
+        self.hash_content = hash_content
+        self.extension = ".feather" if feather is not None else ".h5"
+
+    def key(self, source_path, parser_version):
+        """Get the cache key of a source log.
+
+        :param source_path: Path of the raw log
+        :type source_path: str
+        :param parser_version: Version of the conversion, bump it whenever the converted layout changes
+        :type parser_version: str or int
+
+        :return: Cache key
+        :rtype: str
+        """
+        digest = hashlib.sha256()
+        if self.hash_content:
+            with open(source_path, "rb") as file:
+                for block in iter(lambda: file.read(1024 * 1024), b""):
+                    digest.update(block)
+        else:
+            stat = os.stat(source_path)
+            digest.update(f"{os.path.basename(source_path)}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+        digest.update(f"|{parser_version}".encode())
+        return digest.hexdigest()[:32]
+
+    def path(self, source_path, parser_version):
+        """Get the path of the cached table of a source log, whether it exists or not."""
+        return os.path.join(self.cache_dir, self.key(source_path, parser_version) + self.extension)
+
+    def contains(self, source_path, parser_version):
+        """Check if a source log has a valid cached conversion."""
+        return os.path.exists(self.path(source_path, parser_version))
+
+    def load(self, source_path, parser_version):
+        """Load the cached conversion of a source log.
+
+        :param source_path: Path of the raw log
+        :type source_path: str
+        :param parser_version: Version of the conversion
+        :type parser_version: str or int
+
+        :return: Converted table, None on a cache miss
+        :rtype: pandas.DataFrame or None
+        """
+        cache_path = self.path(source_path, parser_version)
+        if not os.path.exists(cache_path):
+            return None
+        if feather is not None:
+            return feather.read_table(cache_path, memory_map=True).to_pandas()
+        return pd.read_hdf(cache_path, HDF_KEY)
+
+    def store(self, source_path, parser_version, frame):
+        """Store the conversion of a source log.
+
+        The table is written to a temporary file first, so readers never see
+        incomplete entries.
+
+        :param source_path: Path of the raw log
+        :type source_path: str
+        :param parser_version: Version of the conversion
+        :type parser_version: str or int
+        :param frame: Converted table, the index is not stored
+        :type frame: pandas.DataFrame
+
+        :return: Path of the cached table
+        :rtype: str
+        """
+        cache_path = self.path(source_path, parser_version)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=self.extension + ".tmp")
+        os.close(fd)
+        try:
+            frame = frame.reset_index(drop=True)
+            if feather is not None:
+                feather.write_feather(frame, tmp_path, compression="uncompressed")
+            else:
+                frame.to_hdf(tmp_path, key=HDF_KEY, mode="w", format="table")
+            os.replace(tmp_path, cache_path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        logger.debug("Cached conversion of %s: %s", source_path, cache_path)
+        return cache_path
+
+    def load_or_convert(self, source_path, parser_version, convert):
+        """Load a cached conversion, converting and caching the source log on a miss.
+
+        :param source_path: Path of the raw log
+        :type source_path: str
+        :param parser_version: Version of the conversion
+        :type parser_version: str or int
+        :param convert: Called with source_path on a miss, returns the converted table
+        :type convert: callable
+
+        :return: Converted table
+        :rtype: pandas.DataFrame
+        """
+        frame = self.load(source_path, parser_version)
+        if frame is None:
+            frame = convert(source_path)
+            self.store(source_path, parser_version, frame)
+        return frame
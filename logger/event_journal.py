@@ -0,0 +1,264 @@
+"""Structured event journal of a test run.
+
+Purpose of this module is to record what the framework does during a run
+(test and step boundaries, equipment actions, DUT commands) as typed events
+with integer timestamps of the shared timebase (see timebase). Analyses query
+the journal by event type and time range instead of scraping free-text log
+lines.
+
+The journal is an append-only JSON Lines file, one event per line:
+{"ts_ns": 1721136038123456789, "type": "equipment_action", "action": "shake_start", ...}
+
+A side index is written next to it with INDEX_SUFFIX. Index file layout:
+consecutive triples of native int64 values (timestamp in ns, line start
+offset in bytes, event type code).
+"""
+
+
+import os
+import json
+import zlib
+import logging
+import threading
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from NSTAX.logger.time_index import to_ns
+from NSTAX.logger.timebase import now_ns, ns_to_datetime
+
+
+JOURNAL_FILENAME = "events.jsonl"
+INDEX_SUFFIX = ".idx"
+
+# Event types
+RUN_START = "run_start"
+RUN_END = "run_end"
+TEST_START = "test_start"
+TEST_END = "test_end"
+STEP_START = "step_start"
+STEP_END = "step_end"
+EQUIPMENT_ACTION = "equipment_action"
+DUT_COMMAND = "dut_command"
+
+logger = logging.getLogger('NSTA.{}'.format(__name__))
+
+
+def event_type_code(event_type):
+    """Get the index code of an event type, stable across runs and processes."""
+    return zlib.crc32(event_type.encode())
+
+
+class EventJournal:
+    """Writer of an event journal, safe to share between threads.
+
+    :param path: Path of the journal, events are appended if it exists
+    :type path: str
+    """
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self._file = open(path, "ab")
+        self._index_file = open(self.index_path, "ab")
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def emit(self, event_type, **fields):
+        """Append an event.
+
+        :param event_type: Event type, e.g. EQUIPMENT_ACTION
+        :type event_type: str
+        :param fields: Event data, values that are not JSON types are stored as strings
+
+        :return: The written event
+        :rtype: dict
+        """
+        with self._lock:
+            # Timestamp taken under the lock, so the journal is always in time order
+            event = {"ts_ns": now_ns(), "type": event_type}
+            event.update(fields)
+            offset = self._file.tell()
+            self._file.write((json.dumps(event, default=str) + "\n").encode())
+            self._file.flush()
+            array("q", (event["ts_ns"], offset, event_type_code(event_type))).tofile(self._index_file)
+            self._index_file.flush()
+        return event
+
+    def close(self):
+        """Close the journal."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+                self._index_file.close()
+
+
+_journal = None
+
+
+def open_journal(folder):
+    """Open the process-wide journal in a results folder, replacing any open one.
+
+    :param folder: Results folder, the journal is stored as JOURNAL_FILENAME in it
+    :type folder: str
+
+    :return: The journal
+    :rtype: EventJournal
+    """
+    global _journal
+    close_journal()
+    _journal = EventJournal(os.path.join(folder, JOURNAL_FILENAME))
+    return _journal
+
+
+def close_journal():
+    """Close the process-wide journal, later events are dropped."""
+    global _journal
+    if _journal is not None:
+        _journal.close()
+        _journal = None
+
+
+def get_journal():
+    """Get the process-wide journal, None if none is open."""
+    return _journal
+
+
+def emit_event(event_type, **fields):
+    """Append an event to the process-wide journal.
+
+    Does nothing if no journal is open (e.g. scripts run outside of a test run).
+
+    :param event_type: Event type, e.g. EQUIPMENT_ACTION
+    :type event_type: str
+    :param fields: Event data
+
+    :return: The written event, None if no journal is open
+    :rtype: dict or None
+    """
+    journal = _journal
+    if journal is None:
+        return None
+    return journal.emit(event_type, **fields)
+
+
+def build_journal_index(path):
+    """(Re)build the index of a journal, e.g. after the writer was interrupted.
+
+    :param path: Path of the journal
+    :type path: str
+
+    :return: Path of the index file
+    :rtype: str
+    """
+    index_path = path + INDEX_SUFFIX
+    index = array("q")
+    offset = 0
+    with open(path, "rb") as journal_file:
+        for line in journal_file:
+            try:
+                event = json.loads(line)
+                index.extend((int(event["ts_ns"]), offset, event_type_code(event["type"])))
+            except (ValueError, KeyError, TypeError):
+                # Incomplete last line of an interrupted writer
+                logger.warning("Skipping invalid journal line at offset %d: %s", offset, path)
+            offset += len(line)
+    with open(index_path, "wb") as index_file:
+        index.tofile(index_file)
+    return index_path
+
+
+class EventJournalReader:
+    """Indexed reader of an event journal.
+
+    Queries are answered from the index, only the matching events are read
+    and decoded. The index is rebuilt if it is missing or does not cover the
+    whole journal.
+
+    :param path: Path of the journal, or of the results folder holding it
+    :type path: str
+    """
+    def __init__(self, path):
+        if os.path.isdir(path):
+            path = os.path.join(path, JOURNAL_FILENAME)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Event journal not found: {path}")
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        if not os.path.exists(self.index_path) or not self._index_complete():
+            build_journal_index(path)
+        index = np.fromfile(self.index_path, dtype=np.int64).reshape(-1, 3)
+        # Journals are written in time order, sort anyway for appended runs
+        index = index[np.argsort(index[:, 0], kind="stable")]
+        self.timestamps_ns = index[:, 0]
+        self.offsets = index[:, 1]
+        self.type_codes = index[:, 2]
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _index_complete(self):
+        """Check if the index ends with the last line of the journal."""
+        index = np.fromfile(self.index_path, dtype=np.int64)
+        journal_size = os.path.getsize(self.path)
+        if len(index) % 3:
+            return False
+        if not len(index):
+            return journal_size == 0
+        last_offset = int(index.reshape(-1, 3)[:, 1].max())
+        with open(self.path, "rb") as journal_file:
+            journal_file.seek(last_offset)
+            return last_offset + len(journal_file.readline()) == journal_size
+
+    def _positions(self, event_types=None, start=None, end=None):
+        """Get the index positions of the events matching a query."""
+        lo = 0
+        hi = len(self.timestamps_ns)
+        if start is not None:
+            lo = int(np.searchsorted(self.timestamps_ns, to_ns(start), side="left"))
+        if end is not None:
+            hi = int(np.searchsorted(self.timestamps_ns, to_ns(end), side="right"))
+        positions = np.arange(lo, max(lo, hi))
+        if event_types is not None:
+            if isinstance(event_types, str):
+                event_types = [event_types]
+            codes = [event_type_code(event_type) for event_type in event_types]
+            positions = positions[np.isin(self.type_codes[positions], codes)]
+        return positions
+
+    def query(self, event_types=None, start=None, end=None):
+        """Get the events of some types within [start, end].
+
+        :param event_types: Event type or list of types, defaults to None (all types)
+        :type event_types: str or list of str, optional
+        :param start: Range start, defaults to the first event
+        :type start: int (ns), datetime.datetime or str, optional
+        :param end: Range end (inclusive), defaults to the last event
+        :type end: int (ns), datetime.datetime or str, optional
+
+        :return: Events in time order
+        :rtype: list of dict
+        """
+        events = []
+        with open(self.path, "rb") as journal_file:
+            for position in self._positions(event_types, start, end):
+                journal_file.seek(int(self.offsets[position]))
+                events.append(json.loads(journal_file.readline()))
+        return events
+
+    def to_frame(self, event_types=None, start=None, end=None):
+        """Get the events of some types within [start, end] as a table (see query).
+
+        :return: One row per event with the event fields and 'Time' (naive UTC, like the device logs)
+        :rtype: pandas.DataFrame
+        """
+        events = pd.DataFrame(self.query(event_types, start, end))
+        if events.empty:
+            return pd.DataFrame(columns=["Time", "ts_ns", "type"])
+        events.insert(0, "Time", pd.to_datetime([ns_to_datetime(ts_ns) for ts_ns in events["ts_ns"]], utc=True).tz_localize(None))
+        return events
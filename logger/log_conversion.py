@@ -0,0 +1,211 @@
+"""Chunked, constant-memory conversion of device logs.
+
+Purpose of this module is to convert serial logs of any length into tabular
+form without loading them into memory. The log is read in fixed-size byte
+chunks, lines are filtered per chunk, parsed with the pandas C engine and the
+converted rows are appended to the output file chunk by chunk. Peak memory
+depends on the chunk size only.
+
+Output formats are chosen by file extension: CSV, HDF5 (".h5", columnar
+table through PyTables) or Parquet (".parquet", requires pyarrow).
+"""
+
+
+import os
+import logging
+from io import StringIO
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+DEFAULT_CHUNK_BYTES = 16 * 1024 * 1024
+HDF_KEY = "data"
+HDF_MIN_STRING_SIZE = 64    # Reserved width of string columns in HDF5 tables
+
+logger = logging.getLogger('NSTA.{}'.format(__name__))
+
+
+def iter_line_chunks(log_path, chunk_bytes=DEFAULT_CHUNK_BYTES, line_filter=None):
+    """Read a text log in chunks of complete lines.
+
+    :param log_path: Path of the log
+    :type log_path: str
+    :param chunk_bytes: Number of bytes read per chunk, defaults to DEFAULT_CHUNK_BYTES
+    :type chunk_bytes: int, optional
+    :param line_filter: Predicate on decoded lines, lines it rejects are dropped, defaults to None (keep all)
+    :type line_filter: callable, optional
+
+    :return: Generator of line lists, lines keep their line terminator
+    :rtype: generator
+    """
+    carry = b""
+    with open(log_path, "rb") as log_file:
+        while True:
+            block = log_file.read(chunk_bytes)
+            if not block:
+                break
+            block = carry + block
+            end = block.rfind(b"\n") + 1
+            if not end:
+                # No complete line yet, keep reading
+                carry = block
+                continue
+            carry = block[end:]
+            lines = block[:end].decode("utf-8", errors="ignore").splitlines(keepends=True)
+            if line_filter is not None:
+                lines = [line for line in lines if line_filter(line)]
+            if lines:
+                yield lines
+    if carry:
+        lines = carry.decode("utf-8", errors="ignore").splitlines(keepends=True)
+        if line_filter is not None:
+            lines = [line for line in lines if line_filter(line)]
+        if lines:
+            yield lines
+
+
+def iter_log_frames(log_path, chunk_bytes=DEFAULT_CHUNK_BYTES, line_filter=None, text_columns=None):
+    """Read a comma separated log as a sequence of DataFrames with a fixed layout.
+
+    The number of columns is taken from the first kept line, like read_csv
+    does for a whole file: longer lines are skipped, incomplete rows dropped.
+
+    :param log_path: Path of the log
+    :type log_path: str
+    :param chunk_bytes: Number of bytes read per chunk, defaults to DEFAULT_CHUNK_BYTES
+    :type chunk_bytes: int, optional
+    :param line_filter: Predicate on decoded lines, lines it rejects are dropped, defaults to None (keep all)
+    :type line_filter: callable, optional
+    :param text_columns: Columns always read as strings (e.g. hex fields), so every chunk gets the same dtypes, defaults to None
+    :type text_columns: list of int, optional
+
+    :return: Generator of DataFrames with integer column labels, rows numbered through the whole log
+    :rtype: generator
+    """
+    names = None
+    n_rows = 0
+    for lines in iter_line_chunks(log_path, chunk_bytes, line_filter):
+        if names is None:
+            names = list(range(lines[0].count(",") + 1))
+        dtype = {column: str for column in text_columns or () if column in names}
+        frame = pd.read_csv(StringIO("".join(lines)), header=None, names=names, delimiter=',',
+                            index_col=False, on_bad_lines='skip', engine='c', dtype=dtype)
+        # Number rows across chunks, as if the whole log was read at once
+        frame.index += n_rows
+        n_rows += len(frame)
+        frame.dropna(inplace=True)
+        if not frame.empty:
+            yield frame
+
+
+class ChunkedTableWriter:
+    """Append DataFrames to a CSV, HDF5 or Parquet file.
+
+    :param output_path: Target file, ".h5" writes an HDF5 table (key HDF_KEY), ".parquet" Parquet, anything else CSV
+    :type output_path: str
+    """
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.parquet = output_path.endswith(".parquet")
+        self.hdf = output_path.endswith(".h5")
+        if self.parquet and pq is None:
+            raise ImportError("pyarrow is required to write Parquet files")
+        self.n_rows = 0
+        self._writer = None
+        self._csv_file = None
+        self._store = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, frame):
+        """Append the rows of a DataFrame, the index is not written.
+
+        :param frame: Rows to append, all chunks must have the same columns
+        :type frame: pandas.DataFrame
+        """
+        if self.parquet:
+            if self._writer is None:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.output_path, table.schema)
+            else:
+                table = pa.Table.from_pandas(frame, schema=self._writer.schema, preserve_index=False)
+            self._writer.write_table(table)
+        elif self.hdf:
+            if self._store is None:
+                self._store = pd.HDFStore(self.output_path, mode="w")
+            string_columns = frame.columns[frame.dtypes == object]
+            self._store.append(HDF_KEY, frame.reset_index(drop=True), format="table", index=False,
+                               min_itemsize={column: HDF_MIN_STRING_SIZE for column in string_columns})
+        else:
+            if self._csv_file is None:
+                self._csv_file = open(self.output_path, "w", newline="")
+                frame.to_csv(self._csv_file, index=False)
+            else:
+                frame.to_csv(self._csv_file, index=False, header=False)
+        self.n_rows += len(frame)
+
+    def close(self):
+        """Finish the output file."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = None
+
+
+def convert_log(input_path, output_path, parse_chunk, chunk_bytes=DEFAULT_CHUNK_BYTES, line_filter=None,
+                text_columns=None, start_time=None, time_column='Time'):
+    """Convert a log chunk by chunk into a table file.
+
+    :param input_path: Path of the raw log
+    :type input_path: str
+    :param output_path: Path of the converted file (.csv, .h5 or .parquet)
+    :type output_path: str
+    :param parse_chunk: Converts a raw chunk (see iter_log_frames) into the output rows
+    :type parse_chunk: callable
+    :param chunk_bytes: Number of bytes read per chunk, defaults to DEFAULT_CHUNK_BYTES
+    :type chunk_bytes: int, optional
+    :param line_filter: Predicate on decoded lines, lines it rejects are dropped, defaults to None (keep all)
+    :type line_filter: callable, optional
+    :param text_columns: Raw columns always read as strings, defaults to None
+    :type text_columns: list of int, optional
+    :param start_time: Shift all times so the first row starts at this time, defaults to None
+    :type start_time: datetime.datetime or pandas.Timestamp, optional
+    :param time_column: Column shifted by start_time, defaults to 'Time'
+    :type time_column: str, optional
+
+    :return: Number of converted rows
+    :rtype: int
+    """
+    time_offset = None
+    with ChunkedTableWriter(output_path) as writer:
+        for frame in iter_log_frames(input_path, chunk_bytes, line_filter, text_columns):
+            converted = parse_chunk(frame)
+            if converted.empty:
+                continue
+            if start_time is not None:
+                if time_offset is None:
+                    # Offset of the first row of the whole log, applied to all chunks
+                    time_offset = start_time - converted[time_column].iloc[0]
+                converted[time_column] += time_offset
+            writer.write(converted)
+    if not writer.n_rows:
+        logger.warning("No rows converted from log: %s", input_path)
+        if not os.path.exists(output_path):
+            open(output_path, "w").close()
+    return writer.n_rows
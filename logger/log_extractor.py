@@ -0,0 +1,183 @@
+"""Single-pass extraction of events from text logs.
+
+Purpose of this module is to find the lines of a log that match any of a set
+of named patterns with one pass over the data. The log is read once in large
+chunks and all compiled patterns are run over each chunk while it is in
+memory. Patterns are not joined into one alternation: Python's re engine only
+uses its fast literal prefix search for single patterns, an alternation of
+them scans several times slower than all patterns one after the other.
+
+Large logs can be split into byte ranges (aligned on line starts) that are
+scanned in parallel by a process pool.
+
+Patterns are byte regular expressions, compiled with re.MULTILINE so "^" and
+"$" match at line boundaries. A line is reported once per pattern that
+matches it. Matches must not span lines. Named groups become columns of the
+result.
+"""
+
+
+import os
+import re
+import logging
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from NSTAX.logger.log_conversion import DEFAULT_CHUNK_BYTES
+from NSTAX.logger.time_index import datetime_to_ns, parse_line_timestamp
+
+
+AUTOLOG_TIME_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+MIN_RANGE_BYTES = 4 * 1024 * 1024   # Smaller logs are not split over processes
+
+logger = logging.getLogger('NSTA.{}'.format(__name__))
+
+
+def parse_autolog_timestamp(line):
+    """Get the timestamp of an autolog line in the format "%Y-%m-%d %H:%M:%S,%f|NSTA...".
+
+    :param line: Raw log line
+    :type line: bytes
+
+    :return: Timestamp in ns (naive time taken as UTC, like parse_line_timestamp), None if the line carries no timestamp
+    :rtype: int or None
+    """
+    try:
+        return datetime_to_ns(datetime.strptime(line[:23].decode("ascii"), AUTOLOG_TIME_FORMAT))
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _to_bytes(pattern):
+    return pattern.encode() if isinstance(pattern, str) else pattern
+
+
+def _iter_chunks(log_path, start, end, chunk_bytes):
+    """Read the complete lines starting within [start, end) in chunks.
+
+    :return: Generator of (offset of the chunk, chunk bytes)
+    :rtype: generator
+    """
+    with open(log_path, "rb") as log_file:
+        log_file.seek(start)
+        offset = start
+        carry = b""
+        while offset + len(carry) < end:
+            block = log_file.read(min(chunk_bytes, end - offset - len(carry)))
+            if not block:
+                break
+            block = carry + block
+            cut = block.rfind(b"\n") + 1
+            if not cut:
+                carry = block
+                continue
+            yield offset, block[:cut]
+            offset += cut
+            carry = block[cut:]
+        # The last line may run past the range end
+        if carry:
+            yield offset, carry + log_file.readline()
+
+
+def _line_starts(log_path, n_ranges):
+    """Split a log into byte ranges that start at line starts."""
+    size = os.path.getsize(log_path)
+    bounds = [0]
+    with open(log_path, "rb") as log_file:
+        for i in range(1, n_ranges):
+            log_file.seek(size * i // n_ranges)
+            log_file.readline()
+            position = log_file.tell()
+            if bounds[-1] < position < size:
+                bounds.append(position)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+class LogExtractor:
+    """Extracts the lines of a log matching any of a set of named patterns.
+
+    :param patterns: Regular expression per pattern name, e.g. {"shake_start": rb"Start Shaking at (?P<setting>.*)"}
+    :type patterns: dict of str or bytes
+    :param timestamp_parser: Gets the timestamp in ns of a raw line (or None), defaults to parse_line_timestamp
+    :type timestamp_parser: callable, optional
+    """
+    def __init__(self, patterns, timestamp_parser=parse_line_timestamp):
+        if not patterns:
+            raise ValueError("Error in log extractor !", "No patterns given")
+        self.patterns = {name: re.compile(_to_bytes(pattern), re.MULTILINE) for name, pattern in patterns.items()}
+        self.timestamp_parser = timestamp_parser
+
+    def __getstate__(self):
+        # Compiled expressions are rebuilt in worker processes
+        return {"patterns": {name: pattern.pattern for name, pattern in self.patterns.items()},
+                "timestamp_parser": self.timestamp_parser}
+
+    def __setstate__(self, state):
+        self.__init__(state["patterns"], state["timestamp_parser"])
+
+    def extract_range(self, log_path, start=0, end=None, chunk_bytes=DEFAULT_CHUNK_BYTES):
+        """Scan the lines starting within a byte range of a log.
+
+        :return: Hits per pattern name: lists of (offset, timestamp_ns, line, groups) in log order
+        :rtype: dict
+        """
+        if end is None:
+            end = os.path.getsize(log_path)
+        hits = {name: [] for name in self.patterns}
+        for chunk_offset, chunk in _iter_chunks(log_path, start, end, chunk_bytes):
+            # Lines hit by several patterns are cut out and timestamped once
+            lines = {}
+            for name, pattern in self.patterns.items():
+                last_line_start = -1
+                for match in pattern.finditer(chunk):
+                    line_start = chunk.rfind(b"\n", 0, match.start()) + 1
+                    if line_start == last_line_start:
+                        continue
+                    last_line_start = line_start
+                    if line_start not in lines:
+                        line_end = chunk.find(b"\n", line_start)
+                        line = chunk[line_start:line_end if line_end >= 0 else len(chunk)].rstrip(b"\r")
+                        lines[line_start] = (line, self.timestamp_parser(line))
+                    line, timestamp_ns = lines[line_start]
+                    hits[name].append((chunk_offset + line_start, timestamp_ns, line, match.groupdict()))
+        return hits
+
+    def extract(self, log_path, max_workers=1, chunk_bytes=DEFAULT_CHUNK_BYTES):
+        """Scan a log once for all patterns.
+
+        :param log_path: Path of the log
+        :type log_path: str
+        :param max_workers: Number of processes scanning byte ranges of the log in parallel, defaults to 1 (in-process)
+        :type max_workers: int, optional
+        :param chunk_bytes: Number of bytes read per chunk, defaults to DEFAULT_CHUNK_BYTES
+        :type chunk_bytes: int, optional
+
+        :return: Hits per pattern name, one row per matching line: offset (of the line start in bytes),
+            timestamp_ns (None if the line has no timestamp), line and one column per named group
+        :rtype: dict of pandas.DataFrame
+        """
+        n_ranges = min(max_workers or 1, max(os.path.getsize(log_path) // MIN_RANGE_BYTES, 1))
+        if n_ranges <= 1:
+            results = [self.extract_range(log_path, chunk_bytes=chunk_bytes)]
+        else:
+            ranges = _line_starts(log_path, n_ranges)
+            with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+                futures = [executor.submit(self.extract_range, log_path, start, end, chunk_bytes) for start, end in ranges]
+                # Ranges are merged in file order
+                results = [future.result() for future in futures]
+        frames = {}
+        for name, pattern in self.patterns.items():
+            rows = [hit for result in results for hit in result[name]]
+            frame = pd.DataFrame({
+                "offset": pd.array([row[0] for row in rows], dtype="int64"),
+                "timestamp_ns": pd.array([row[1] for row in rows], dtype="Int64"),
+                "line": [row[2].decode("utf-8", errors="replace") for row in rows],
+            })
+            for group in pattern.groupindex:
+                frame[group] = [None if row[3][group] is None else row[3][group].decode("utf-8", errors="replace")
+                                for row in rows]
+            frames[name] = frame
+        return frames
@@ -0,0 +1,297 @@
+"""Declarative column schema of the N5/TRUMI device logs.
+
+Purpose of this module is to describe the comma separated device log format
+once, as a list of fields, and to decode raw log tables with it. A schema is
+compiled per column count into a plan: every hex column is decoded once
+into a digit matrix that all its fields slice, all integer columns are
+converted as one block and the norms of all 3D vectors are taken in one
+pass. There are no per-row Python calls.
+
+The ParsingUtils of parsing_utilities, the TRUMI log parser and the serial
+logger scripts all parse through these schemas.
+
+Raw log line example (extended output):
+[2024-07-16 13:20:38.123456],A1B2C3,!,010203,66966A26,12,345,-54,-982,14,-54,-982,14,0,0,0
+"""
+
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+LOG_TIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+# Field kinds
+TEXT = "text"           # Raw string value
+HEX = "hex"             # Hex value, or a slice of its digits
+INT = "int"             # Decimal integer
+VECTOR = "vector"       # Three consecutive decimal integers <name>_x/_y/_z and their norm <name>_abs
+RTC_TIME = "rtc_time"   # Hex RTC epoch seconds as naive local time
+
+# Hex digit value per ASCII code, padding (NUL) and blanks are skipped, other characters are invalid
+_HEX_SKIP = 16
+_HEX_INVALID = 255
+_HEX_LOOKUP = np.full(256, _HEX_INVALID, dtype=np.uint8)
+for _digit, _char in enumerate(b"0123456789abcdef"):
+    _HEX_LOOKUP[_char] = _digit
+    _HEX_LOOKUP[ord(chr(_char).upper())] = _digit
+_HEX_LOOKUP[[0, ord(' '), ord('\t')]] = _HEX_SKIP
+
+
+def _local_utc_offset(timestamp):
+    """Get the local UTC offset in seconds at an epoch timestamp."""
+    return int((datetime.fromtimestamp(timestamp) - datetime(1970, 1, 1)).total_seconds()) - timestamp
+
+
+def _byte_matrix(column):
+    """Get a column as (rows, chars) uint8 matrix of its string values, shorter values are NUL padded.
+
+    :return: Fixed-width byte strings and their uint8 matrix view, None if the column is not ASCII
+    :rtype: tuple
+    """
+    try:
+        raw = column.to_numpy().astype(bytes)
+    except UnicodeEncodeError:
+        return None, None
+    width = raw.dtype.itemsize
+    if width == 0:
+        return None, None
+    return raw, raw.view(np.uint8).reshape(len(raw), width)
+
+
+def _hex_digit_matrix(column):
+    """Get the hex digit values of a column as (rows, chars) matrix.
+
+    Values are taken as strings, like astype(str) does. Shorter values are
+    padded with _HEX_SKIP.
+    """
+    _, matrix = _byte_matrix(column)
+    if matrix is None:
+        raise ValueError("Invalid hex value in column", column.name)
+    return _HEX_LOOKUP[matrix]
+
+
+def _hex_matrix_to_int(digits):
+    """Combine hex digit matrix rows (see _hex_digit_matrix) to integers."""
+    if (digits == _HEX_INVALID).any():
+        raise ValueError("Invalid hex value")
+    valid = digits != _HEX_SKIP
+    if not valid.any(axis=1).all():
+        raise ValueError("Empty hex value")
+    result = np.zeros(len(digits), dtype=np.int64)
+    for i in range(digits.shape[1]):
+        result = np.where(valid[:, i], (result << 4) | digits[:, i], result)
+    return result
+
+
+def hex_to_int(column):
+    """Decode a column of hex strings to int64 without per-row Python calls.
+
+    :param column: Hex values (without 0x prefix), non-string values are taken as their string representation
+    :type column: pandas.Series
+
+    :return: Decoded values
+    :rtype: numpy.ndarray
+    """
+    return _hex_matrix_to_int(_hex_digit_matrix(column))
+
+
+def parse_log_times(column):
+    """Parse the "[timestamp]" prefix of logger lines.
+
+    :param column: Column holding the logger timestamp in brackets
+    :type column: pandas.Series
+
+    :return: Parsed timestamps
+    :rtype: pandas.Series
+    """
+    raw, matrix = _byte_matrix(column)
+    times = None
+    if matrix is not None and matrix.shape[1] > 1:
+        # Fast path: all lines start with the timestamp and it has a fixed width
+        closing = matrix == ord(']')
+        end = closing.argmax(axis=1)
+        if (matrix[:, 0] == ord('[')).all() and closing[np.arange(len(end)), end].all() and (end == end[0]).all():
+            times = pd.Series(np.ascontiguousarray(matrix[:, 1:end[0]]).view(f'S{end[0] - 1}').ravel().astype(str), index=column.index)
+    if times is None:
+        times = column.astype(str).str.extract(r'\[([^\]]*)\]', expand=False)
+    try:
+        return pd.to_datetime(times, format=LOG_TIME_FORMAT)
+    except (ValueError, TypeError):
+        # Other timestamp layouts, let pandas infer the format
+        return pd.to_datetime(times)
+
+
+def rtc_to_local_time(rtc_stamp):
+    """Convert RTC epoch seconds to naive local time, as datetime.fromtimestamp does.
+
+    :param rtc_stamp: Seconds since epoch
+    :type rtc_stamp: pandas.Series
+
+    :return: Local timestamps
+    :rtype: pandas.Series
+    """
+    stamps = np.asarray(rtc_stamp, dtype=np.int64)
+    # UTC offsets only change on quarter hours, look them up once per quarter hour present
+    quarters, inverse = np.unique(stamps // 900, return_inverse=True)
+    offsets = np.array([_local_utc_offset(int(quarter) * 900) for quarter in quarters], dtype=np.int64)
+    return pd.Series(pd.to_datetime(stamps + offsets[inverse.ravel()], unit='s'), index=rtc_stamp.index)
+
+
+class LogField():
+    """One field of a device log schema.
+
+    :param name: Output column name, the prefix of the output columns for VECTOR fields
+    :type name: str
+    :param kind: One of TEXT, HEX, INT, VECTOR, RTC_TIME
+    :type kind: str
+    :param column: Raw column index, the first of the three for VECTOR fields
+    :type column: int
+    :param digits: (start, end) slice of the hex digits for HEX fields, defaults to None (all digits)
+    :type digits: tuple, optional
+    :param normalized: Add the unit vector <name>_norm_x/_y/_z for VECTOR fields, defaults to False
+    :type normalized: bool, optional
+    :param min_columns: Number of raw columns from which the field is present, defaults to 0 (always)
+    :type min_columns: int, optional
+    """
+    def __init__(self, name, kind, column, digits=None, normalized=False, min_columns=0):
+        if kind not in (TEXT, HEX, INT, VECTOR, RTC_TIME):
+            raise ValueError("Error in log field !", name, kind)
+        self.name = name
+        self.kind = kind
+        self.column = column
+        self.digits = slice(*digits) if digits is not None else slice(None)
+        self.normalized = normalized
+        self.min_columns = min_columns
+
+    def int_columns(self):
+        """Get the raw columns the field reads as decimal integers."""
+        if self.kind == INT:
+            return [self.column]
+        if self.kind == VECTOR:
+            return [self.column, self.column + 1, self.column + 2]
+        return []
+
+
+class LogSchema():
+    """Compiled decoder of raw device log tables.
+
+    :param fields: Fields in output column order
+    :type fields: list of LogField
+    :param text_columns: Raw columns to read as strings (see log_conversion.iter_log_frames)
+    :type text_columns: list of int
+    """
+    def __init__(self, fields, text_columns):
+        self.fields = list(fields)
+        self.text_columns = list(text_columns)
+        self._plans = {}
+
+    def _plan(self, n_columns):
+        """Get the decoding plan of a raw table with n_columns columns, compiled on first use."""
+        plan = self._plans.get(n_columns)
+        if plan is None:
+            fields = [field for field in self.fields if field.min_columns <= n_columns]
+            hex_columns = list(dict.fromkeys(field.column for field in fields if field.kind in (HEX, RTC_TIME)))
+            int_columns = list(dict.fromkeys(column for field in fields for column in field.int_columns()))
+            int_positions = {column: i for i, column in enumerate(int_columns)}
+            vectors = [field for field in fields if field.kind == VECTOR]
+            vector_positions = [[int_positions[column] for column in field.int_columns()] for field in vectors]
+            plan = (fields, hex_columns, int_columns, int_positions, vectors, vector_positions)
+            self._plans[n_columns] = plan
+        return plan
+
+    def parse(self, ds1, time_column=0, start_time=None):
+        """Decode a raw log table.
+
+        :param ds1: Raw log table, e.g. from log_conversion.iter_log_frames
+        :type ds1: pandas.DataFrame
+        :param time_column: Column holding the logger timestamp, defaults to 0,
+            None to take the time from the first RTC_TIME field
+        :type time_column: int, optional
+        :param start_time: Shift all times so the log starts at this time, defaults to None
+        :type start_time: datetime.datetime, optional
+
+        :return: Decoded log indexed by 'Time'
+        :rtype: pandas.DataFrame
+        """
+        if ds1.empty:
+            return pd.DataFrame()
+
+        fields, hex_columns, int_columns, int_positions, vectors, vector_positions = self._plan(len(ds1.columns))
+        digits = {column: _hex_digit_matrix(ds1.loc[:, column]) for column in hex_columns}
+        values = ds1.loc[:, int_columns].astype(int).to_numpy() if int_columns else None
+        # Norms of all 3D vectors in one pass
+        norms = {}
+        if vectors:
+            vector_values = values[:, np.array(vector_positions)].astype(float)
+            vector_norms = np.sqrt(np.einsum('ijk,ijk->ij', vector_values, vector_values))
+            norms = {field.name: vector_norms[:, i] for i, field in enumerate(vectors)}
+
+        ret = pd.DataFrame(index=ds1.index)
+        if time_column is not None:
+            ret['Time'] = parse_log_times(ds1.loc[:, time_column])
+
+        for field in fields:
+            if field.kind == TEXT:
+                ret[field.name] = ds1.loc[:, field.column].astype(str)
+            elif field.kind == HEX:
+                ret[field.name] = _hex_matrix_to_int(digits[field.column][:, field.digits])
+            elif field.kind == INT:
+                ret[field.name] = values[:, int_positions[field.column]]
+            elif field.kind == RTC_TIME:
+                stamps = pd.Series(_hex_matrix_to_int(digits[field.column]), index=ds1.index)
+                ret[field.name] = rtc_to_local_time(stamps)
+                if 'Time' not in ret.columns:
+                    ret['Time'] = ret[field.name]
+            else:
+                vector = values[:, [int_positions[column] for column in field.int_columns()]]
+                for i, axis in enumerate('xyz'):
+                    ret[f'{field.name}_{axis}'] = vector[:, i]
+                ret[f'{field.name}_abs'] = norms[field.name]
+                if field.normalized:
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        unit = vector / norms[field.name][:, None]
+                    for i, axis in enumerate('xyz'):
+                        ret[f'{field.name}_norm_{axis}'] = unit[:, i]
+
+        if start_time is not None:
+            ret['Time'] += (start_time - ret['Time'].iloc[0])
+
+        ret.index = ret['Time']
+        return ret
+
+
+# N5 log: header and RTC, extended output adds the gravity and direction vectors
+N5_LOG_FIELDS = [
+    LogField('DeviceID', TEXT, 1),
+    # Col 3: Accelerometer header (3 bytes), Cycle index is the full header
+    LogField('Cycle', HEX, 3),
+    LogField('acc_mode', HEX, 3, digits=(0, 2)),
+    LogField('sample_index', HEX, 3, digits=(2, 4)),
+    LogField('trumi_state', HEX, 3, digits=(4, None)),
+    # Col 4: RTC
+    LogField('RTC_stamp', HEX, 4),
+    LogField('RTC_time', RTC_TIME, 4),
+    # Col 5-9: Speed, distance and acceleration
+    LogField('Vel', INT, 5),
+    LogField('Dist', INT, 6),
+    LogField('Acc', VECTOR, 7),
+    # Col 10-15: Extended output
+    LogField('Grav', VECTOR, 10, min_columns=11),
+    LogField('Dir', VECTOR, 13, normalized=True, min_columns=11),
+]
+
+# TRUMI log: N5 log with the extended TRUMI state (col 18)
+TRUMI_LOG_FIELDS = N5_LOG_FIELDS + [
+    LogField('trumi_state_ext', TEXT, 18, min_columns=19),
+]
+
+# Raw columns read as strings: timestamp, device ID, header and RTC (hex)
+LOG_TEXT_COLUMNS = [0, 1, 2, 3, 4]
+# Raw columns read as strings: timestamp, device ID, header, RTC (hex) and extended TRUMI fields
+TRUMI_TEXT_COLUMNS = [0, 1, 2, 3, 4, 16, 17, 18]
+
+N5_LOG_SCHEMA = LogSchema(N5_LOG_FIELDS, LOG_TEXT_COLUMNS)
+TRUMI_LOG_SCHEMA = LogSchema(TRUMI_LOG_FIELDS, TRUMI_TEXT_COLUMNS)
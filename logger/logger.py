@@ -7,9 +7,12 @@ connected through a cable to loggable device using its COM port
 import threading
 import serial
 import time
-from datetime import datetime
 import logging
 
+from NSTAX.logger.raw_capture import RawCaptureWriter
+from NSTAX.logger.time_index import SparseTimeIndexWriter
+from NSTAX.logger.timebase import now_ns, ns_to_datetime
+
 class Logger:
     """Generic logger for serial devices.
 
@@ -23,12 +26,15 @@ class Logger:
     :type auto_start: bool, optional
     :param file_path: folder to store recorded logs, defaults to "."
     :type file_path: str, optional
+    :param raw_capture: store the raw bytes with a line index instead of decoded text lines, defaults to False
+    :type raw_capture: bool, optional
     """
 
-    def __init__(self, name, port="", log_timestamps=True, auto_start=True, file_path="."):
+    def __init__(self, name, port="", log_timestamps=True, auto_start=True, file_path=".", raw_capture=False):
         self.name = name
         self.port = port
-        self.data_filename = f'{file_path}\\{name}_serial_data.csv'
+        self.raw_capture = raw_capture
+        self.data_filename = self._get_logfile_name(file_path)
         self.log_timestamps = log_timestamps
         self.auto_start = auto_start
         self.log_folder = file_path
@@ -63,8 +69,26 @@ class Logger:
     def _connect_serial(self):
         """Connect to the serial COM port and log data."""
         ser = serial.Serial(self.port, 115200, timeout=1)
+        if self.raw_capture:
+            err_str = self._capture_raw(ser)
+        else:
+            err_str = self._capture_text(ser)
+        self.logger.info(f"Closing COM port: {self.port} ,Status: {err_str}")
+        if err_str != "LOG_COMPLETE":
+            return -1
+        ser.close()
+        return 0
+
+    def _capture_text(self, ser):
+        """Log decoded, stripped text lines.
+
+        Timestamped logs get a sparse time index (see time_index) for seeking
+        into time ranges later on.
+        """
         err_str = "LOG_COMPLETE"
-        with open(self.data_filename, mode='w', newline='') as file:
+        time_index = SparseTimeIndexWriter(self.data_filename) if self.log_timestamps else None
+        offset = 0
+        with open(self.data_filename, mode='wb') as file:
             while self.in_measurement:
                 try:
                     data = ser.readline().decode().strip()
@@ -73,21 +97,44 @@ class Logger:
                     break
                 if data:
                     if self.log_timestamps:
-                        timestamp_utc = datetime.utcnow().strftime('[%Y-%m-%d %H:%M:%S.%f]')
-                        row_to_write = f"{timestamp_utc} {data}\n"
+                        timestamp_ns = now_ns()
+                        timestamp_utc = ns_to_datetime(timestamp_ns).strftime('[%Y-%m-%d %H:%M:%S.%f]')
+                        row_to_write = f"{timestamp_utc} {data}\n".encode()
+                        time_index.add(timestamp_ns, offset)
                     else:
-                        row_to_write = f"{data}\n"
+                        row_to_write = f"{data}\n".encode()
                     file.write(row_to_write)
-        self.logger.info(f"Closing COM port: {self.port} ,Status: {err_str}")
-        if err_str != "LOG_COMPLETE":
-            return -1
-        ser.close()
-        return 0
+                    offset += len(row_to_write)
+        if time_index:
+            time_index.close()
+        return err_str
+
+    def _capture_raw(self, ser):
+        """Log raw bytes untouched, indexing line offsets and arrival times.
+
+        Lines are decoded only when read back with RawCaptureReader.
+        """
+        err_str = "LOG_COMPLETE"
+        with RawCaptureWriter(self.data_filename) as writer:
+            while self.in_measurement:
+                try:
+                    chunk = ser.read(ser.in_waiting or 1)
+                except serial.SerialException:
+                    err_str = "PORT_ERROR"
+                    break
+                if chunk:
+                    writer.write(chunk)
+        return err_str
+
+    def _get_logfile_name(self, path):
+        if self.raw_capture:
+            return f'{path}\\{self.name}_serial_data.bin'
+        return f'{path}\\{self.name}_serial_data.csv'
 
     def _set_logfile_path(self, path):
         """Set a custom path to save the generated log."""
         self.log_folder = path
-        self.data_filename = f'{path}\\{self.name}_serial_data.csv'
+        self.data_filename = self._get_logfile_name(path)
 
     def get_device_port(self):
         """Get the COM port of the connected device."""
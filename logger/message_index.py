@@ -0,0 +1,121 @@
+"""Index of decoded backend messages.
+
+Purpose of this module is to run several checks over one list of backend
+messages (e.g. a get_messages result) without scanning and unpacking the
+whole list per check. The index reads the type and the timestamp of each
+message once: messages are bucketed by type for constant-time lookups, and
+sorted by timestamp for range queries by bisection.
+"""
+
+
+import bisect
+import datetime
+
+from NSTAX.logger.time_index import to_ns
+
+
+MESSAGE_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+
+def message_type(message):
+    """Get the decoded message type of a backend message, e.g. "KEEP_ALIVE_EVENT", None if it has none."""
+    try:
+        return message["decodedMsg"]["messageType"]
+    except (KeyError, TypeError):
+        return None
+
+
+def message_time_ns(message):
+    """Get the decoded message date of a backend message in ns since epoch, None if it has none."""
+    try:
+        return to_ns(datetime.datetime.strptime(message["decodedMsg"]["messageDate"], MESSAGE_DATE_FORMAT))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class MessageIndex:
+    """Backend messages indexed by type and timestamp.
+
+    :param messages: Backend messages, e.g. as returned by get_messages
+    :type messages: list
+    :param type_of: Gets the type of a message, defaults to message_type
+    :type type_of: callable, optional
+    :param time_of: Gets the timestamp of a message in ns (or None), defaults to message_time_ns
+    :type time_of: callable, optional
+    """
+    def __init__(self, messages, type_of=message_type, time_of=message_time_ns):
+        self.messages = list(messages)
+        self._by_type = {}
+        timed = []
+        types = []
+        for position, message in enumerate(self.messages):
+            type_ = type_of(message)
+            types.append(type_)
+            self._by_type.setdefault(type_, []).append(message)
+            timestamp_ns = time_of(message)
+            if timestamp_ns is not None:
+                timed.append((timestamp_ns, position))
+        timed.sort()
+        self._times_ns = [timestamp_ns for timestamp_ns, _ in timed]
+        self._by_time = [self.messages[position] for _, position in timed]
+        self._types_by_time = [types[position] for _, position in timed]
+
+    @classmethod
+    def of(cls, messages):
+        """Get the index of messages, messages already indexed are returned as they are."""
+        return messages if isinstance(messages, cls) else cls(messages)
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def types(self):
+        """Get the number of messages per type.
+
+        :rtype: dict
+        """
+        return {type_: len(messages) for type_, messages in self._by_type.items()}
+
+    def of_type(self, type_):
+        """Get the messages of a type, in the order given.
+
+        :rtype: list
+        """
+        return self._by_type.get(type_, [])
+
+    def first(self, type_, predicate=None):
+        """Get the first message of a type (in the order given) that matches a predicate.
+
+        :param type_: Message type
+        :type type_: str
+        :param predicate: Further check on the message, defaults to None (any message of the type)
+        :type predicate: callable, optional
+
+        :return: The message, None if there is none
+        :rtype: dict or None
+        """
+        for message in self.of_type(type_):
+            if predicate is None or predicate(message):
+                return message
+        return None
+
+    def between(self, start, end, type_=None):
+        """Get the messages with timestamps within [start, end], oldest first.
+
+        :param start: Start, in ns, as datetime or ISO string (naive = UTC)
+        :type start: int, datetime.datetime or str
+        :param end: End, same formats as start
+        :type end: int, datetime.datetime or str
+        :param type_: Only messages of this type, defaults to None (all types)
+        :type type_: str, optional
+
+        :rtype: list
+        """
+        low = bisect.bisect_left(self._times_ns, to_ns(start))
+        high = bisect.bisect_right(self._times_ns, to_ns(end))
+        if type_ is None:
+            return self._by_time[low:high]
+        return [message for message, message_type_ in zip(self._by_time[low:high], self._types_by_time[low:high])
+                if message_type_ == type_]
@@ -0,0 +1,173 @@
+"""Local persistent store of platform data frames.
+
+Purpose of this module is to keep the data frames downloaded from the
+Sensolus backend in a local SQLite database, so overlapping time windows are
+not downloaded again. Frames are indexed by (device, receive time, backend
+sequence number). Per device the completely synced time ranges are
+recorded (overlapping and adjacent ranges merged): queries within them are
+answered from the local index, only the parts of a window outside of them
+are fetched from the backend.
+
+A synced range never ends closer than SYNC_MARGIN to the current time, the
+backend may still be receiving frames of the last moments.
+"""
+
+
+import json
+import sqlite3
+import logging
+import threading
+import datetime
+
+from NSTAX.logger.time_index import to_ns
+
+
+SYNC_MARGIN = datetime.timedelta(minutes=2)
+BACKEND_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+logger = logging.getLogger('NSTA.{}'.format(__name__))
+
+
+def frame_receive_time_ns(frame):
+    """Get the backend receive time of a data frame in ns since epoch, None if it has none."""
+    try:
+        return to_ns(datetime.datetime.strptime(frame["firstReceiveTime"], BACKEND_TIME_FORMAT))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def frame_key(frame):
+    """Get the identity of a data frame: (backend sequence number, receive time).
+
+    Frames without them are identified by their whole content.
+    """
+    seq_nbr = frame.get("backendSeqNbr") if isinstance(frame, dict) else None
+    receive_time = frame.get("firstReceiveTime") if isinstance(frame, dict) else None
+    if seq_nbr is None and receive_time is None:
+        return json.dumps(frame, sort_keys=True, default=str)
+    return (seq_nbr, receive_time)
+
+
+class MessageStore:
+    """SQLite store of platform data frames, safe to share between threads.
+
+    :param path: Path of the database file, created if missing
+    :type path: str
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS frames ("
+                "device_id TEXT NOT NULL, receive_time_ns INTEGER NOT NULL, seq_nbr INTEGER NOT NULL, "
+                "frame TEXT NOT NULL, PRIMARY KEY (device_id, receive_time_ns, seq_nbr))")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sync_ranges ("
+                "device_id TEXT NOT NULL, synced_from_ns INTEGER NOT NULL, synced_until_ns INTEGER NOT NULL, "
+                "PRIMARY KEY (device_id, synced_from_ns))")
+            # Stores of the single range per device layout
+            if self._connection.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sync_cursors'").fetchone():
+                self._connection.execute("INSERT OR IGNORE INTO sync_ranges SELECT device_id, synced_from_ns, synced_until_ns FROM sync_cursors")
+                self._connection.execute("DROP TABLE sync_cursors")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+    def synced_ranges(self, device_id):
+        """Get the completely synced time ranges of a device, disjoint and oldest first.
+
+        :return: List of (from, until) ranges in ns since epoch, empty if nothing is synced
+        :rtype: list of tuple
+        """
+        with self._lock:
+            return self._synced_ranges(device_id)
+
+    def _synced_ranges(self, device_id):
+        rows = self._connection.execute(
+            "SELECT synced_from_ns, synced_until_ns FROM sync_ranges WHERE device_id = ? ORDER BY synced_from_ns",
+            (str(device_id),)).fetchall()
+        return [tuple(row) for row in rows]
+
+    def missing_ranges(self, device_id, start_ns, end_ns):
+        """Get the parts of a time range that are not synced yet.
+
+        :return: List of (from, until) ranges in ns since epoch, oldest first
+        :rtype: list of tuple
+        """
+        ranges = []
+        for synced_from_ns, synced_until_ns in self.synced_ranges(device_id):
+            if synced_until_ns < start_ns:
+                continue
+            if synced_from_ns > end_ns:
+                break
+            if start_ns < synced_from_ns:
+                ranges.append((start_ns, synced_from_ns))
+            start_ns = synced_until_ns
+            if start_ns >= end_ns:
+                return ranges
+        ranges.append((start_ns, end_ns))
+        return ranges
+
+    def add_frames(self, device_id, frames):
+        """Store data frames of a device, frames already stored are replaced.
+
+        :return: Number of frames stored, frames without receive time are skipped
+        :rtype: int
+        """
+        rows = []
+        for frame in frames:
+            receive_time_ns = frame_receive_time_ns(frame)
+            if receive_time_ns is None:
+                logger.warning("Skipping data frame without receive time of device: %s", device_id)
+                continue
+            rows.append((str(device_id), receive_time_ns, int(frame.get("backendSeqNbr") or 0), json.dumps(frame)))
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO frames VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def mark_synced(self, device_id, start_ns, end_ns):
+        """Record that all frames of a device within a time range are stored.
+
+        The range is merged with the synced ranges it overlaps or touches,
+        the other synced ranges are kept. The end is capped to SYNC_MARGIN
+        before now.
+        """
+        now_ns = to_ns(datetime.datetime.now(datetime.timezone.utc) - SYNC_MARGIN)
+        end_ns = min(end_ns, now_ns)
+        if end_ns <= start_ns:
+            return
+        with self._lock, self._connection:
+            for synced_from_ns, synced_until_ns in self._synced_ranges(device_id):
+                if start_ns <= synced_until_ns and end_ns >= synced_from_ns:
+                    start_ns = min(start_ns, synced_from_ns)
+                    end_ns = max(end_ns, synced_until_ns)
+                    self._connection.execute("DELETE FROM sync_ranges WHERE device_id = ? AND synced_from_ns = ?",
+                                             (str(device_id), synced_from_ns))
+            self._connection.execute("INSERT OR REPLACE INTO sync_ranges VALUES (?, ?, ?)",
+                                     (str(device_id), start_ns, end_ns))
+
+    def get_frames(self, device_id, start_ns, end_ns, max_n_frames=None):
+        """Get the stored data frames of a device within [start, end], newest first like the backend.
+
+        :param max_n_frames: Max. number of frames returned, defaults to None (all)
+        :type max_n_frames: int, optional
+
+        :return: List of data frames
+        :rtype: list
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT frame FROM frames WHERE device_id = ? AND receive_time_ns BETWEEN ? AND ? "
+                "ORDER BY receive_time_ns DESC, seq_nbr DESC LIMIT ?",
+                (str(device_id), start_ns, end_ns, -1 if max_n_frames is None else max_n_frames)).fetchall()
+        return [json.loads(row[0]) for row in rows]
@@ -0,0 +1,314 @@
+"""Streaming, vectorized parser for NMEA GPS logs.
+
+Purpose of this module is to parse RMC, GGA and GSA sentences of GPS
+receiver logs of any length and to align GPS fixes with device logs. The log
+is read in chunks (see log_conversion.iter_line_chunks), checksums are
+validated on a byte matrix, fields are split by the pandas C parser and
+coordinates, times and dates are converted on whole columns at once.
+
+Sentences are matched on their type only, any talker (GP, GN, GL, ...) is
+accepted. GSA sentences carry no time, they get the time of the preceding
+RMC or GGA sentence of the same epoch. GGA sentences carry no date, they get
+the date of the preceding RMC sentence.
+"""
+
+
+import logging
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+from NSTAX.logger.log_conversion import DEFAULT_CHUNK_BYTES, iter_line_chunks
+
+
+NMEA_SENTENCES = ('RMC', 'GGA', 'GSA')
+KNOTS_TO_KMH = 1.852
+_MAX_FIELDS = 21    # Longest supported sentence (GSA with system ID) plus margin
+
+# Hex digit value per ASCII code, other characters are invalid
+_HEX_INVALID = 255
+_HEX_LOOKUP = np.full(256, _HEX_INVALID, dtype=np.uint8)
+for _digit, _char in enumerate(b"0123456789abcdef"):
+    _HEX_LOOKUP[_char] = _digit
+    _HEX_LOOKUP[ord(chr(_char).upper())] = _digit
+
+logger = logging.getLogger('NSTA.{}'.format(__name__))
+
+
+def is_nmea_line(line, sentences=NMEA_SENTENCES):
+    """Check if a raw line is one of the given NMEA sentences."""
+    return line.startswith('$') and line[3:6] in sentences and line.count(',') < _MAX_FIELDS
+
+
+def checksum_ok(lines):
+    """Validate the checksums of NMEA sentences.
+
+    The XOR over all characters between '$' and '*' is computed for all
+    lines at once on a byte matrix.
+
+    :param lines: Raw sentences, e.g. "$GPGSA,A,3,04,05,,,,,,,,,,,2.5,1.3,2.1*39"
+    :type lines: list of str
+
+    :return: True for every line with a matching checksum
+    :rtype: numpy.ndarray of bool
+    """
+    if not lines:
+        return np.empty(0, dtype=bool)
+    raw = np.array([line.strip().encode('ascii', 'ignore') for line in lines], dtype=bytes)
+    width = raw.dtype.itemsize
+    # Room for a missing checksum, so the digit lookups below stay in bounds
+    matrix = np.zeros((len(raw), width + 2), dtype=np.uint8)
+    matrix[:, :width] = raw.view(np.uint8).reshape(len(raw), width)
+    is_star = matrix == ord('*')
+    has_star = is_star.any(axis=1)
+    star = np.where(has_star, is_star.argmax(axis=1), width)
+    columns = np.arange(matrix.shape[1])
+    payload = np.where((columns >= 1) & (columns < star[:, None]), matrix, 0)
+    computed = np.bitwise_xor.reduce(payload, axis=1)
+    rows = np.arange(len(raw))
+    high = _HEX_LOOKUP[matrix[rows, star + 1]]
+    low = _HEX_LOOKUP[matrix[rows, star + 2]]
+    valid_digits = (high != _HEX_INVALID) & (low != _HEX_INVALID)
+    return has_star & valid_digits & (computed == (high.astype(np.uint16) * 16 + low))
+
+
+def nmea_to_degrees(values, hemispheres):
+    """Convert NMEA (d)ddmm.mmmm coordinates to signed decimal degrees.
+
+    :param values: Coordinates as in the sentence
+    :type values: pandas.Series
+    :param hemispheres: 'N', 'S', 'E' or 'W' per coordinate
+    :type hemispheres: pandas.Series
+
+    :return: Decimal degrees, negative in the southern and western hemispheres, NaN if empty
+    :rtype: numpy.ndarray
+    """
+    values = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+    degrees = np.floor(values / 100)
+    sign = np.where(np.isin(hemispheres.to_numpy(), ['S', 'W']), -1.0, 1.0)
+    return sign * (degrees + (values - degrees * 100) / 60)
+
+
+def nmea_time_of_day(values):
+    """Convert NMEA hhmmss.ss times to time since midnight.
+
+    :return: Time of day, NaT if empty
+    :rtype: pandas.Series of timedelta64
+    """
+    values = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+    hours = np.floor(values / 10000)
+    minutes = np.floor(values / 100) % 100
+    seconds = hours * 3600 + minutes * 60 + (values - hours * 10000 - minutes * 100)
+    # Round to us, fractional seconds have at most 3 digits in practice
+    return pd.Series(pd.to_timedelta(np.round(seconds * 1e6), unit='us'))
+
+
+def nmea_date(values):
+    """Convert NMEA ddmmyy dates (years 2000-2099).
+
+    :return: Dates at midnight, NaT if empty or invalid
+    :rtype: pandas.Series of datetime64
+    """
+    values = pd.to_numeric(values, errors='coerce')
+    return pd.to_datetime(pd.DataFrame({
+        'year': 2000 + values % 100,
+        'month': values // 100 % 100,
+        'day': values // 10000,
+    }), errors='coerce')
+
+
+def _read_fields(payloads):
+    """Split sentences (without checksum) into string fields with the C parser."""
+    frame = pd.read_csv(StringIO("\n".join(payloads)), header=None, names=range(_MAX_FIELDS), sep=',',
+                        dtype=str, keep_default_na=False, engine='c', on_bad_lines='skip')
+    return frame.reset_index(drop=True)
+
+
+def _parse_rmc(fields):
+    return pd.DataFrame({
+        'Status': fields[2],
+        'Latitude': nmea_to_degrees(fields[3], fields[4]),
+        'Longitude': nmea_to_degrees(fields[5], fields[6]),
+        'SpeedKnots': pd.to_numeric(fields[7], errors='coerce'),
+        'Speed': pd.to_numeric(fields[7], errors='coerce') * KNOTS_TO_KMH,
+        'Heading': pd.to_numeric(fields[8], errors='coerce'),
+        'Mode': fields[12],
+    })
+
+
+def _parse_gga(fields):
+    return pd.DataFrame({
+        'Latitude': nmea_to_degrees(fields[2], fields[3]),
+        'Longitude': nmea_to_degrees(fields[4], fields[5]),
+        'Quality': pd.to_numeric(fields[6], errors='coerce'),
+        'Satellites': pd.to_numeric(fields[7], errors='coerce'),
+        'HDOP': pd.to_numeric(fields[8], errors='coerce'),
+        'Altitude': pd.to_numeric(fields[9], errors='coerce'),
+        'GeoidSeparation': pd.to_numeric(fields[11], errors='coerce'),
+    })
+
+
+def _parse_gsa(fields):
+    return pd.DataFrame({
+        'FixMode': fields[1],
+        'FixType': pd.to_numeric(fields[2], errors='coerce'),
+        'SatellitesUsed': (fields.loc[:, 3:14] != '').sum(axis=1),
+        'PDOP': pd.to_numeric(fields[15], errors='coerce'),
+        'HDOP': pd.to_numeric(fields[16], errors='coerce'),
+        'VDOP': pd.to_numeric(fields[17], errors='coerce'),
+    })
+
+
+_PARSERS = {'RMC': _parse_rmc, 'GGA': _parse_gga, 'GSA': _parse_gsa}
+# Field holding the time of the sentence, GSA has none
+_TIME_FIELD = {'RMC': 1, 'GGA': 1}
+
+
+def iter_nmea_frames(nmea_path, sentences=NMEA_SENTENCES, date=None, validate_checksum=True,
+                     chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Parse an NMEA log chunk by chunk.
+
+    :param nmea_path: Path of the NMEA log
+    :type nmea_path: str
+    :param sentences: Sentence types to parse, defaults to NMEA_SENTENCES
+    :type sentences: tuple of str, optional
+    :param date: Date used for all sentences instead of the RMC dates (e.g. if the receiver date is wrong), defaults to None
+    :type date: datetime.date or datetime.datetime, optional
+    :param validate_checksum: Drop sentences with a missing or wrong checksum, defaults to True
+    :type validate_checksum: bool, optional
+    :param chunk_bytes: Number of bytes read per chunk, defaults to DEFAULT_CHUNK_BYTES
+    :type chunk_bytes: int, optional
+
+    :return: Generator of dicts mapping sentence types to DataFrames with a 'Time' column, in log order
+    :rtype: generator
+    """
+    sentences = tuple(sentences)
+    # RMC and GGA are always parsed, GSA times and GGA dates are taken from them
+    parsed_sentences = tuple(sorted(set(sentences) | set(_TIME_FIELD), key=NMEA_SENTENCES.index))
+    override_date = pd.Timestamp(date).normalize() if date is not None else None
+    last_time = pd.NaT
+    last_date = pd.NaT
+    n_invalid = 0
+    for lines in iter_line_chunks(nmea_path, chunk_bytes, line_filter=lambda line: is_nmea_line(line, parsed_sentences)):
+        if validate_checksum:
+            valid = checksum_ok(lines)
+            n_invalid += int((~valid).sum())
+            lines = [line for line, ok in zip(lines, valid) if ok]
+        if not lines:
+            continue
+        types = np.array([line[3:6] for line in lines])
+        payloads = np.array([line.partition('*')[0].strip() for line in lines], dtype=object)
+        # Time and date of every line, carried forward over sentences without them
+        times = pd.Series(pd.NaT, index=range(len(lines)), dtype='timedelta64[ns]')
+        dates = pd.Series(pd.NaT, index=range(len(lines)), dtype='datetime64[ns]')
+        frames = {}
+        for sentence in parsed_sentences:
+            positions = np.flatnonzero(types == sentence)
+            if not len(positions):
+                continue
+            fields = _read_fields(payloads[positions])
+            frame = _PARSERS[sentence](fields)
+            frame.index = positions
+            if sentence in _TIME_FIELD:
+                times.iloc[positions] = nmea_time_of_day(fields[_TIME_FIELD[sentence]]).to_numpy()
+            if sentence == 'RMC':
+                dates.iloc[positions] = nmea_date(fields[9]).to_numpy()
+            frames[sentence] = frame
+        times = times.ffill().fillna(last_time)
+        dates = dates.ffill().fillna(last_date)
+        last_time = times.iloc[-1]
+        last_date = dates.iloc[-1]
+        timestamps = (override_date if override_date is not None else dates) + times
+        chunk = {}
+        for sentence in sentences:
+            if sentence not in frames:
+                continue
+            frame = frames[sentence]
+            frame.insert(0, 'Time', timestamps.iloc[frame.index].to_numpy())
+            chunk[sentence] = frame.reset_index(drop=True)
+        if chunk:
+            yield chunk
+    if n_invalid:
+        logger.warning("Dropped %d NMEA sentences with a bad checksum: %s", n_invalid, nmea_path)
+
+
+def load_nmea(nmea_path, sentences=NMEA_SENTENCES, date=None, validate_checksum=True,
+              chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Parse an NMEA log (see iter_nmea_frames).
+
+    :return: Parsed sentences per type, indexed by Time (empty DataFrames for types not in the log)
+    :rtype: dict
+    """
+    chunks = {sentence: [] for sentence in sentences}
+    for chunk in iter_nmea_frames(nmea_path, sentences, date, validate_checksum, chunk_bytes):
+        for sentence, frame in chunk.items():
+            chunks[sentence].append(frame)
+    parsed = {}
+    for sentence, frames in chunks.items():
+        frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Time'])
+        frame.index = frame['Time']
+        parsed[sentence] = frame
+    return parsed
+
+
+def merge_fixes(parsed, tolerance=pd.Timedelta(milliseconds=500)):
+    """Combine the sentences of every epoch into one fix per RMC sentence.
+
+    GGA (altitude, satellites, HDOP) and GSA (fix type, DOPs) columns are
+    joined onto the RMC sentences by time.
+
+    :param parsed: Parsed sentences per type, as from load_nmea
+    :type parsed: dict
+    :param tolerance: Maximum time difference between sentences of one epoch, defaults to 500 ms
+    :type tolerance: pandas.Timedelta, optional
+
+    :return: One row per RMC sentence, indexed by Time
+    :rtype: pandas.DataFrame
+    """
+    fixes = parsed['RMC'].reset_index(drop=True).sort_values('Time', kind='stable')
+    fixes = fixes[fixes['Time'].notna()]
+    for sentence, columns in (('GGA', ['Quality', 'Satellites', 'HDOP', 'Altitude', 'GeoidSeparation']),
+                              ('GSA', ['FixType', 'SatellitesUsed', 'PDOP', 'VDOP'])):
+        frame = parsed.get(sentence)
+        if frame is None or frame.empty:
+            continue
+        frame = frame.reset_index(drop=True)
+        frame = frame.loc[frame['Time'].notna(), ['Time'] + columns].sort_values('Time', kind='stable')
+        # HDOP is in GGA and GSA, GGA is joined first and wins
+        frame = frame.drop(columns=[column for column in columns if column in fixes.columns])
+        fixes = pd.merge_asof(fixes, frame, on='Time', direction='nearest', tolerance=tolerance)
+    fixes.index = fixes['Time']
+    return fixes
+
+
+def join_gps(device_log, gps, time_column='Time', tolerance=pd.Timedelta(seconds=1), direction='nearest',
+             suffixes=('', '_gps')):
+    """Attach the nearest GPS fix to every row of a parsed device log.
+
+    :param device_log: Parsed device log, e.g. from ParsingUtils.parse_log
+    :type device_log: pandas.DataFrame
+    :param gps: GPS fixes, e.g. from merge_fixes or the RMC frame of load_nmea
+    :type gps: pandas.DataFrame
+    :param time_column: Time column of both tables, defaults to 'Time'
+    :type time_column: str, optional
+    :param tolerance: Maximum time between a row and its fix, rows without a fix get NaN, defaults to 1 s
+    :type tolerance: pandas.Timedelta, optional
+    :param direction: merge_asof direction ('backward', 'forward' or 'nearest'), defaults to 'nearest'
+    :type direction: str, optional
+    :param suffixes: Suffixes of columns present in both tables, defaults to ('', '_gps')
+    :type suffixes: tuple, optional
+
+    :return: Device log with the GPS columns and 'Time_gps' (time of the joined fix), indexed by time
+    :rtype: pandas.DataFrame
+    """
+    left = device_log.reset_index(drop=True).sort_values(time_column, kind='stable')
+    right = gps.reset_index(drop=True)
+    right = right[right[time_column].notna()].sort_values(time_column, kind='stable')
+    right['Time_gps'] = right[time_column]
+    # Both clocks are local time, but may differ in resolution
+    left[time_column] = left[time_column].astype('datetime64[ns]')
+    right[time_column] = right[time_column].astype('datetime64[ns]')
+    joined = pd.merge_asof(left, right, on=time_column, direction=direction, tolerance=tolerance, suffixes=suffixes)
+    joined.index = joined[time_column]
+    return joined
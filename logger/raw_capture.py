@@ -0,0 +1,245 @@
+"""Binary-safe raw capture of serial output with a lazy line index.
+
+Purpose of this module is to record serial data exactly as received from the
+DUT. Raw bytes are written untouched to disk while a compact side index keeps
+the start offset and arrival time of every line. Decoding and stripping only
+happen when lines are read back.
+
+Index file layout: consecutive pairs of native int64 values
+(line start offset in bytes, arrival timestamp in ns).
+"""
+
+
+import os
+import mmap
+from array import array
+from datetime import datetime, timezone
+
+import numpy as np
+
+from NSTAX.logger.time_index import to_ns
+from NSTAX.logger.timebase import now_ns
+
+
+INDEX_SUFFIX = ".idx"
+
+
+class RawCaptureWriter:
+    """Writer for raw serial captures.
+
+    :param file_path: Path of the raw capture file, the index is stored next to it with INDEX_SUFFIX
+    :type file_path: str
+    :param flush_lines: Number of index entries buffered before writing them to disk, defaults to 4096
+    :type flush_lines: int, optional
+    """
+    def __init__(self, file_path, flush_lines=4096):
+        self.file_path = file_path
+        self.index_path = file_path + INDEX_SUFFIX
+        self.flush_lines = flush_lines
+        self.n_lines = 0
+        self._data_file = open(file_path, "wb")
+        self._index_file = open(self.index_path, "wb")
+        self._index = array("q")
+        self._offset = 0
+        self._at_line_start = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, chunk, timestamp_ns=None):
+        """Append a raw chunk and index the lines starting in it.
+
+        :param chunk: Bytes as read from the port
+        :type chunk: bytes
+        :param timestamp_ns: Arrival time of the chunk in ns, defaults to the current time of the shared timebase
+        :type timestamp_ns: int, optional
+        """
+        if not chunk:
+            return
+        if timestamp_ns is None:
+            timestamp_ns = now_ns()
+        self._data_file.write(chunk)
+        index = self._index
+        if self._at_line_start:
+            index.append(self._offset)
+            index.append(timestamp_ns)
+        last = len(chunk) - 1
+        pos = chunk.find(b"\n")
+        while -1 < pos < last:
+            index.append(self._offset + pos + 1)
+            index.append(timestamp_ns)
+            pos = chunk.find(b"\n", pos + 1)
+        self._at_line_start = pos == last
+        self._offset += len(chunk)
+        if len(index) >= 2 * self.flush_lines:
+            self._flush_index()
+
+    def flush(self):
+        """Flush data and pending index entries to disk."""
+        self._flush_index()
+        self._data_file.flush()
+        self._index_file.flush()
+
+    def close(self):
+        """Flush and close the capture files."""
+        if self._data_file.closed:
+            return
+        self.flush()
+        self._data_file.close()
+        self._index_file.close()
+
+    def _flush_index(self):
+        self.n_lines += len(self._index) // 2
+        self._index.tofile(self._index_file)
+        del self._index[:]
+
+
+class RawCaptureReader:
+    """Lazy reader for captures written by RawCaptureWriter.
+
+    Lines are decoded (UTF-8, invalid bytes replaced) and stripped only when
+    accessed.
+
+    :param file_path: Path of the raw capture file
+    :type file_path: str
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.index_path = file_path + INDEX_SUFFIX
+        self._data_file = open(file_path, "rb")
+        self._size = os.path.getsize(file_path)
+        self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ) if self._size else b""
+        if os.path.getsize(self.index_path):
+            index = np.memmap(self.index_path, dtype=np.int64, mode="r").reshape(-1, 2)
+        else:
+            index = np.empty((0, 2), dtype=np.int64)
+        self.offsets = index[:, 0]
+        self.timestamps_ns = index[:, 1]
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.line(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Capture line index out of range")
+        return self.line(index)
+
+    def __iter__(self):
+        return self.iter_lines()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def raw_line(self, index):
+        """Get the undecoded bytes of a line, including its line terminator.
+
+        :param index: Line number
+        :type index: int
+
+        :return: Raw line
+        :rtype: bytes
+        """
+        start = int(self.offsets[index])
+        stop = int(self.offsets[index + 1]) if index + 1 < len(self.offsets) else self._size
+        return self._data[start:stop]
+
+    def line(self, index, decode=True):
+        """Get a line, decoded and stripped as the text logger would write it.
+
+        :param index: Line number
+        :type index: int
+        :param decode: Decode and strip the line, otherwise only the line terminator is removed, defaults to True
+        :type decode: bool, optional
+
+        :return: Line content
+        :rtype: str or bytes
+        """
+        raw = self.raw_line(index)
+        if decode:
+            return raw.decode("utf-8", errors="replace").strip()
+        return raw.rstrip(b"\r\n")
+
+    def timestamp(self, index):
+        """Get the arrival time of a line.
+
+        :param index: Line number
+        :type index: int
+
+        :return: Arrival timestamp in ns
+        :rtype: int
+        """
+        return int(self.timestamps_ns[index])
+
+    def iter_lines(self, start=0, stop=None, decode=True):
+        """Iterate over (timestamp_ns, line) pairs.
+
+        :param start: First line number, defaults to 0
+        :type start: int, optional
+        :param stop: Line number to stop before, defaults to the end of the capture
+        :type stop: int, optional
+        :param decode: Decode and strip the lines, defaults to True
+        :type decode: bool, optional
+
+        :return: Generator of (timestamp_ns, line) tuples
+        :rtype: generator
+        """
+        if stop is None:
+            stop = len(self)
+        for i in range(start, stop):
+            yield int(self.timestamps_ns[i]), self.line(i, decode=decode)
+
+    def iter_range(self, start=None, end=None, decode=True):
+        """Iterate over the lines that arrived within [start, end].
+
+        The dense line index is binary searched, so only lines in range are read.
+
+        :param start: Range start, defaults to the beginning of the capture
+        :type start: int (ns), datetime.datetime or str, optional
+        :param end: Range end (inclusive), defaults to the end of the capture
+        :type end: int (ns), datetime.datetime or str, optional
+        :param decode: Decode and strip the lines, defaults to True
+        :type decode: bool, optional
+
+        :return: Generator of (timestamp_ns, line) tuples
+        :rtype: generator
+        """
+        first = 0 if start is None else int(np.searchsorted(self.timestamps_ns, to_ns(start), side="left"))
+        stop = len(self) if end is None else int(np.searchsorted(self.timestamps_ns, to_ns(end), side="right"))
+        return self.iter_lines(first, stop, decode=decode)
+
+    def export_text(self, output_path, log_timestamps=True):
+        """Write the capture in the text format of the serial Logger.
+
+        Empty lines are skipped, timestamps are written as UTC.
+
+        :param output_path: Target text file
+        :type output_path: str
+        :param log_timestamps: Prefix lines with their arrival time, defaults to True
+        :type log_timestamps: bool, optional
+        """
+        with open(output_path, mode='w', newline='') as file:
+            for timestamp_ns, data in self.iter_lines():
+                if not data:
+                    continue
+                if log_timestamps:
+                    timestamp_utc = datetime.fromtimestamp(timestamp_ns / 1e9, tz=timezone.utc).strftime('[%Y-%m-%d %H:%M:%S.%f]')
+                    file.write(f"{timestamp_utc} {data}\n")
+                else:
+                    file.write(f"{data}\n")
+
+    def close(self):
+        """Release the mapped capture files."""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data_file.close()
+        self.offsets = self.timestamps_ns = np.empty(0, dtype=np.int64)
@@ -0,0 +1,165 @@
+"""Vectorized state transition engine for converted device logs.
+
+Purpose of this module is to turn a per-sample state column (e.g. the TRUMI
+state) into run-length encoded state intervals and a compact transitions
+table. Everything is computed on NumPy arrays, no per-row Python calls, so
+analyses stay fast on logs with millions of samples.
+"""
+
+
+import numpy as np
+import pandas as pd
+
+
+def run_starts(states):
+    """Get the positions where a new run of equal states starts.
+
+    :param states: State per sample
+    :type states: array-like
+
+    :return: Positions of the first sample of every run
+    :rtype: numpy.ndarray
+    """
+    states = np.asarray(states)
+    if not len(states):
+        return np.empty(0, dtype=np.int64)
+    change = np.empty(len(states), dtype=bool)
+    change[0] = True
+    # NaN never equals NaN, every NaN sample is a run of its own
+    np.not_equal(states[1:], states[:-1], out=change[1:])
+    return np.flatnonzero(change)
+
+
+def state_runs(df, state_column='trumi_state', time_column='Time'):
+    """Collapse consecutive samples with the same state into intervals.
+
+    :param df: Converted log, sorted by time
+    :type df: pandas.DataFrame
+    :param state_column: Column holding the state, defaults to 'trumi_state'
+    :type state_column: str, optional
+    :param time_column: Column holding the sample time, defaults to 'Time'
+    :type time_column: str, optional
+
+    :return: One row per run: state, start_index, end_index (positions of first and last sample),
+        n_samples, start_time, end_time (last sample) and dwell (until the next run starts,
+        the last run until its last sample)
+    :rtype: pandas.DataFrame
+    """
+    states = df[state_column].to_numpy()
+    times = df[time_column].to_numpy()
+    starts = run_starts(states)
+    ends = np.append(starts[1:], len(states)) - 1
+    next_start_times = times[np.append(starts[1:], len(states) - 1)] if len(starts) else times[:0]
+    return pd.DataFrame({
+        'state': states[starts],
+        'start_index': starts,
+        'end_index': ends,
+        'n_samples': ends - starts + 1,
+        'start_time': times[starts],
+        'end_time': times[ends],
+        'dwell': next_start_times - times[starts],
+    })
+
+
+def state_transitions(df, state_column='trumi_state', time_column='Time'):
+    """Get every change of state as a compact transitions table.
+
+    :param df: Converted log, sorted by time
+    :type df: pandas.DataFrame
+    :param state_column: Column holding the state, defaults to 'trumi_state'
+    :type state_column: str, optional
+    :param time_column: Column holding the sample time, defaults to 'Time'
+    :type time_column: str, optional
+
+    :return: One row per change: index (position of the first sample in the new state), time, from_state, to_state
+    :rtype: pandas.DataFrame
+    """
+    states = df[state_column].to_numpy()
+    starts = run_starts(states)[1:]
+    return pd.DataFrame({
+        'index': starts,
+        'time': df[time_column].to_numpy()[starts],
+        'from_state': states[starts - 1],
+        'to_state': states[starts],
+    })
+
+
+def select_transitions(transitions, from_state, to_state):
+    """Get the transitions between two states.
+
+    :param transitions: Transitions table from state_transitions
+    :type transitions: pandas.DataFrame
+    :param from_state: State before the change
+    :type from_state: float
+    :param to_state: State after the change
+    :type to_state: float
+
+    :return: Matching rows of the transitions table
+    :rtype: pandas.DataFrame
+    """
+    return transitions[(transitions['from_state'] == from_state) & (transitions['to_state'] == to_state)]
+
+
+def count_transitions(transitions, from_state, to_state):
+    """Count the transitions between two states.
+
+    :return: Number of transitions
+    :rtype: int
+    """
+    return int(len(select_transitions(transitions, from_state, to_state)))
+
+
+def dwell_time_per_state(runs):
+    """Get the total dwell time per state.
+
+    :param runs: Runs table from state_runs
+    :type runs: pandas.DataFrame
+
+    :return: Summed dwell time indexed by state
+    :rtype: pandas.Series
+    """
+    return runs.groupby('state')['dwell'].sum()
+
+
+def event_detections(events, runs, detected_states, device_column='device'):
+    """Join an event timeline against the state timelines of any number of devices.
+
+    An event is detected by a device if the device is in one of the detected
+    states when the event starts, or enters one before the event ends. Both
+    lookups are a single merge_asof over all devices, the cost does not grow
+    with the number of events per device.
+
+    :param events: One row per event, with 'start_time' and 'end_time' (NaT for open-ended events)
+    :type events: pandas.DataFrame
+    :param runs: Runs tables from state_runs of all devices, concatenated, with a device column
+    :type runs: pandas.DataFrame
+    :param detected_states: States that count as detection of an event
+    :type detected_states: list
+    :param device_column: Column holding the device name, defaults to 'device'
+    :type device_column: str, optional
+
+    :return: One row per event and device: event (position in events), the event columns, device,
+        state_at_start, detected, detection_time and latency (NaT if missed)
+    :rtype: pandas.DataFrame
+    """
+    timeline = events.reset_index(drop=True).rename_axis('event').reset_index()
+    devices = pd.DataFrame({device_column: runs[device_column].unique()})
+    pairs = timeline.merge(devices, how='cross').sort_values('start_time', kind='stable')
+    runs = runs.sort_values('start_time', kind='stable')
+    # State of every device when the event starts
+    states = runs[[device_column, 'start_time', 'state']].rename(
+        columns={'start_time': 'state_since', 'state': 'state_at_start'})
+    joined = pd.merge_asof(pairs, states, left_on='start_time', right_on='state_since',
+                           by=device_column, direction='backward')
+    # First entry into a detected state at or after the event start
+    entries = runs.loc[runs['state'].isin(detected_states), [device_column, 'start_time']].rename(
+        columns={'start_time': 'entry_time'})
+    joined = pd.merge_asof(joined, entries, left_on='start_time', right_on='entry_time',
+                           by=device_column, direction='forward')
+    detection_time = joined['entry_time'].mask(joined['state_at_start'].isin(detected_states), joined['start_time'])
+    detected = detection_time.notna() & (joined['end_time'].isna() | (detection_time <= joined['end_time']))
+    joined['detected'] = detected
+    joined['detection_time'] = detection_time.where(detected)
+    joined['latency'] = joined['detection_time'] - joined['start_time']
+    joined = joined.drop(columns=['state_since', 'entry_time'])
+    return joined.sort_values(['event', device_column], kind='stable').reset_index(drop=True)
@@ -0,0 +1,228 @@
+"""Sparse time index for serial text logs.
+
+Purpose of this module is to extract a time slice of a multi-GB serial log
+without reading it from the start. While a log is written, every few KB a
+(timestamp, byte offset) pair of the current line is stored in a side file.
+Readers binary search that index, seek close to the requested start and only
+parse the lines of the requested range.
+
+Index file layout: consecutive pairs of native int64 values. The first pair
+is a header (log size in bytes, log modification time in ns) taken when the
+index was completed, the following pairs are the entries (line timestamp in
+ns since epoch UTC, line start offset in bytes). An index whose header does
+not match the log any more (appended to or rewritten) is rebuilt by the
+reader.
+"""
+
+
+import os
+from datetime import datetime, timezone, timedelta
+from array import array
+
+import numpy as np
+
+
+TIME_INDEX_SUFFIX = ".tidx"
+PARTIAL_SUFFIX = ".part"    # Index being written, renamed to the index once complete
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def datetime_to_ns(dt):
+    """Convert a datetime to ns since epoch, naive datetimes are taken as UTC.
+
+    :param dt: Timestamp
+    :type dt: datetime.datetime
+
+    :return: Timestamp in ns
+    :rtype: int
+    """
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - EPOCH) // timedelta(microseconds=1) * 1000
+
+
+def to_ns(timestamp):
+    """Normalize int ns, datetime or ISO string timestamps to ns since epoch.
+
+    :param timestamp: Timestamp, strings and naive datetimes are taken as UTC
+    :type timestamp: int, datetime.datetime or str
+
+    :return: Timestamp in ns
+    :rtype: int
+    """
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if isinstance(timestamp, datetime):
+        return datetime_to_ns(timestamp)
+    return int(timestamp)
+
+
+def parse_line_timestamp(line):
+    """Get the timestamp of a logger line in the format "[%Y-%m-%d %H:%M:%S.%f] data".
+
+    :param line: Raw log line
+    :type line: bytes
+
+    :return: Timestamp in ns, None if the line carries no timestamp
+    :rtype: int or None
+    """
+    end = line.find(b"]")
+    if not line.startswith(b"[") or end < 0:
+        return None
+    try:
+        return datetime_to_ns(datetime.fromisoformat(line[1:end].decode("ascii")))
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class SparseTimeIndexWriter:
+    """Builds the sparse time index while a log is being written.
+
+    The index is written to a partial file and only replaces the index of the
+    log on close, with the size and modification time of the log then, so
+    close it after the log.
+
+    :param log_path: Path of the indexed log, the index is stored next to it with TIME_INDEX_SUFFIX
+    :type log_path: str
+    :param stride_bytes: Min. distance in bytes between two index entries, defaults to 64 KiB
+    :type stride_bytes: int, optional
+    """
+    def __init__(self, log_path, stride_bytes=64 * 1024):
+        self.log_path = log_path
+        self.index_path = log_path + TIME_INDEX_SUFFIX
+        self.stride_bytes = stride_bytes
+        self._index_file = open(self.index_path + PARTIAL_SUFFIX, "wb")
+        # Header placeholder, written on close
+        array("q", (-1, -1)).tofile(self._index_file)
+        self._next_offset = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, timestamp_ns, offset):
+        """Report a line start, only every stride_bytes a line gets indexed.
+
+        :param timestamp_ns: Timestamp of the line in ns since epoch
+        :type timestamp_ns: int
+        :param offset: Byte offset of the line start in the log
+        :type offset: int
+        """
+        if offset >= self._next_offset:
+            array("q", (timestamp_ns, offset)).tofile(self._index_file)
+            self._next_offset = offset + self.stride_bytes
+
+    def close(self):
+        """Complete the index: write the header and replace the index of the log."""
+        if self._index_file.closed:
+            return
+        log_stat = os.stat(self.log_path)
+        self._index_file.seek(0)
+        array("q", (log_stat.st_size, log_stat.st_mtime_ns)).tofile(self._index_file)
+        self._index_file.close()
+        os.replace(self.index_path + PARTIAL_SUFFIX, self.index_path)
+
+
+def build_time_index(log_path, stride_bytes=64 * 1024):
+    """Build and store the sparse time index of an existing log in one pass.
+
+    :param log_path: Path of a timestamped text log
+    :type log_path: str
+    :param stride_bytes: Min. distance in bytes between two index entries, defaults to 64 KiB
+    :type stride_bytes: int, optional
+
+    :return: Path of the created index
+    :rtype: str
+    """
+    with open(log_path, "rb") as log_file, SparseTimeIndexWriter(log_path, stride_bytes) as writer:
+        offset = 0
+        for line in log_file:
+            if offset >= writer._next_offset:
+                timestamp_ns = parse_line_timestamp(line)
+                if timestamp_ns is not None:
+                    writer.add(timestamp_ns, offset)
+            offset += len(line)
+    return writer.index_path
+
+
+class TimeIndexedLogReader:
+    """Time range reader for timestamped text logs.
+
+    The sparse index is created on first use if the log does not have one,
+    and rebuilt if the log changed since it was completed.
+
+    :param log_path: Path of a timestamped text log
+    :type log_path: str
+    """
+    def __init__(self, log_path):
+        self.log_path = log_path
+        self.index_path = log_path + TIME_INDEX_SUFFIX
+        index = self._load_index()
+        if index is None:
+            build_time_index(log_path)
+            # Taken as built even if the log is still growing
+            index = self._load_index(validate=False)
+        self.timestamps_ns = index[:, 0]
+        self.offsets = index[:, 1]
+
+    def _load_index(self, validate=True):
+        """Get the index entries, None if there is no index or (validate) it does not match the log."""
+        if not os.path.exists(self.index_path):
+            return None
+        index = np.fromfile(self.index_path, dtype=np.int64)
+        if len(index) < 2 or len(index) % 2:
+            return None
+        index = index.reshape(-1, 2)
+        if validate:
+            log_stat = os.stat(self.log_path)
+            if (int(index[0, 0]), int(index[0, 1])) != (log_stat.st_size, log_stat.st_mtime_ns):
+                return None
+        return index[1:]
+
+    def iter_range(self, start=None, end=None, decode=True):
+        """Iterate over the lines within [start, end].
+
+        :param start: Range start, defaults to the beginning of the log
+        :type start: int (ns), datetime.datetime or str, optional
+        :param end: Range end (inclusive), defaults to the end of the log
+        :type end: int (ns), datetime.datetime or str, optional
+        :param decode: Decode lines to str, defaults to True
+        :type decode: bool, optional
+
+        :return: Generator of (timestamp_ns, line) tuples, lines without line terminator
+        :rtype: generator
+        """
+        start_ns = to_ns(start) if start is not None else None
+        end_ns = to_ns(end) if end is not None else None
+        seek_to = 0
+        if start_ns is not None and len(self.offsets):
+            # Last indexed line before the range start, earlier lines cannot be in range
+            pos = max(int(np.searchsorted(self.timestamps_ns, start_ns, side="left")) - 1, 0)
+            seek_to = int(self.offsets[pos])
+        with open(self.log_path, "rb") as log_file:
+            log_file.seek(seek_to)
+            for line in log_file:
+                timestamp_ns = parse_line_timestamp(line)
+                if timestamp_ns is None:
+                    continue
+                if start_ns is not None and timestamp_ns < start_ns:
+                    continue
+                if end_ns is not None and timestamp_ns > end_ns:
+                    break
+                line = line.rstrip(b"\r\n")
+                yield timestamp_ns, line.decode("utf-8", errors="replace") if decode else line
+
+    def read_range(self, start=None, end=None):
+        """Get the lines within [start, end] as one text block.
+
+        :param start: Range start, defaults to the beginning of the log
+        :type start: int (ns), datetime.datetime or str, optional
+        :param end: Range end (inclusive), defaults to the end of the log
+        :type end: int (ns), datetime.datetime or str, optional
+
+        :return: Lines joined by newlines
+        :rtype: str
+        """
+        return "\n".join(line for _, line in self.iter_range(start, end))
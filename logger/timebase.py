@@ -0,0 +1,192 @@
+"""Shared timebase for all capture sources.
+
+Purpose of this module is to give serial logs, current traces, accelerometer
+readings and test steps one common clock. Timestamps are integer ns since
+epoch UTC, derived from a monotonic high resolution counter and a UTC anchor
+taken once per process. They are cheap to produce, never jump with system
+clock adjustments and can be joined directly (e.g. pandas.merge_asof) without
+any string parsing.
+
+The anchor (UTC and counter value at process start) is stored with the test
+results, so timestamps can always be related back to the counter.
+"""
+
+
+import os
+import json
+import time
+import socket
+import threading
+from array import array
+from datetime import datetime, timezone, timedelta
+
+import numpy as np
+
+
+ANCHOR_FILENAME = "timebase_anchor.json"
+SAMPLE_TIMESTAMPS_SUFFIX = ".ts"
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class Timebase:
+    """Monotonic ns clock anchored to UTC.
+
+    time.perf_counter_ns is used as counter, it has sub-us resolution on Linux
+    and Windows and is not affected by system clock changes.
+    """
+    def __init__(self):
+        # Take the UTC anchor in between two counter reads to halve the uncertainty
+        counter_before = time.perf_counter_ns()
+        utc_ns = time.time_ns()
+        counter_after = time.perf_counter_ns()
+        self.anchor_counter_ns = (counter_before + counter_after) // 2
+        self.anchor_utc_ns = utc_ns
+
+    def now_ns(self):
+        """Get the current time.
+
+        :return: Timestamp in ns since epoch UTC
+        :rtype: int
+        """
+        return self.anchor_utc_ns + time.perf_counter_ns() - self.anchor_counter_ns
+
+    def counter_to_ns(self, counter_ns):
+        """Convert a raw time.perf_counter_ns value of this process to the timebase.
+
+        :param counter_ns: Counter value
+        :type counter_ns: int
+
+        :return: Timestamp in ns since epoch UTC
+        :rtype: int
+        """
+        return self.anchor_utc_ns + counter_ns - self.anchor_counter_ns
+
+    def anchor(self):
+        """Get the anchor record of this timebase.
+
+        :return: Anchor with UTC time, counter value, drift against the system clock and origin
+        :rtype: dict
+        """
+        return {
+            "anchor_utc_ns": self.anchor_utc_ns,
+            "anchor_counter_ns": self.anchor_counter_ns,
+            "anchor_utc": ns_to_datetime(self.anchor_utc_ns).isoformat(),
+            "system_clock_offset_ns": time.time_ns() - self.now_ns(),
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+        }
+
+    def write_anchor(self, folder):
+        """Store the anchor record in a results folder.
+
+        :param folder: Target folder
+        :type folder: str
+
+        :return: Path of the written anchor file
+        :rtype: str
+        """
+        anchor_path = os.path.join(folder, ANCHOR_FILENAME)
+        with open(anchor_path, "w") as file:
+            json.dump(self.anchor(), file, indent=2)
+        return anchor_path
+
+
+_timebase = Timebase()
+
+
+def get_timebase():
+    """Get the process-wide timebase."""
+    return _timebase
+
+
+def now_ns():
+    """Get the current time of the process-wide timebase.
+
+    :return: Timestamp in ns since epoch UTC
+    :rtype: int
+    """
+    return _timebase.anchor_utc_ns + time.perf_counter_ns() - _timebase.anchor_counter_ns
+
+
+def ns_to_datetime(timestamp_ns, local=False):
+    """Convert a timebase timestamp to a datetime (us resolution).
+
+    :param timestamp_ns: Timestamp in ns since epoch UTC
+    :type timestamp_ns: int
+    :param local: Return naive local time instead of aware UTC, defaults to False
+    :type local: bool, optional
+
+    :return: Timestamp
+    :rtype: datetime.datetime
+    """
+    dt = EPOCH + timedelta(microseconds=timestamp_ns // 1000)
+    if local:
+        return dt.astimezone().replace(tzinfo=None)
+    return dt
+
+
+class SampleTimestampWriter:
+    """Side file mapping sample numbers of a capture to timebase timestamps.
+
+    For sources that deliver samples in batches (e.g. current traces), only
+    the first sample number and the arrival time of every batch are stored.
+
+    File layout: consecutive pairs of native int64 values (sample number, timestamp in ns).
+
+    :param data_path: Path of the capture, the timestamps are stored next to it with SAMPLE_TIMESTAMPS_SUFFIX
+    :type data_path: str
+    """
+    def __init__(self, data_path):
+        self.path = data_path + SAMPLE_TIMESTAMPS_SUFFIX
+        self._file = open(self.path, "wb")
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, sample_number, timestamp_ns=None):
+        """Record the timestamp of a sample.
+
+        :param sample_number: Sample (row) number in the capture
+        :type sample_number: int
+        :param timestamp_ns: Timestamp, defaults to now
+        :type timestamp_ns: int, optional
+        """
+        if timestamp_ns is None:
+            timestamp_ns = now_ns()
+        with self._lock:
+            array("q", (sample_number, timestamp_ns)).tofile(self._file)
+
+    def close(self):
+        """Close the side file."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def load_sample_timestamps(data_path, n_samples):
+    """Get a timestamp for every sample, interpolated between the recorded ones.
+
+    Samples after the last recorded one get its timestamp.
+
+    :param data_path: Path of the capture written together with a SampleTimestampWriter
+    :type data_path: str
+    :param n_samples: Number of samples in the capture
+    :type n_samples: int
+
+    :return: Timestamps in ns since epoch UTC
+    :rtype: numpy.ndarray of int64
+    """
+    records = np.fromfile(data_path + SAMPLE_TIMESTAMPS_SUFFIX, dtype=np.int64).reshape(-1, 2)
+    if not len(records):
+        raise ValueError("Error in sample timestamps !", data_path, "No timestamps recorded")
+    samples = np.arange(n_samples)
+    if len(records) == 1:
+        return np.full(n_samples, records[0, 1], dtype=np.int64)
+    # Interpolate relative to the first timestamp, float64 cannot hold epoch ns exactly
+    base = records[0, 1]
+    relative = np.interp(samples, records[:, 0], records[:, 1] - base)
+    return base + relative.astype(np.int64)
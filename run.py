@@ -25,6 +25,9 @@ from NSTAX.reports.result_suite import ResultSuite
 from NSTAX.reports.report_engine import ReportEngine
 from NSTAX.QT.QTestIntegration import QTestIntegration
 from NSTAX.Qmetry.QmetryIntegration import QmetryIntegration
+from NSTAX.logger.timebase import get_timebase
+from NSTAX.logger.event_journal import open_journal, close_journal, emit_event, RUN_START, RUN_END, TEST_START, TEST_END
+from NSTAX.interface.session_pool import close_session_pools
 import NSTA
 
 
@@ -120,6 +123,11 @@ class TestRun:
         # Create result folder
         if not os.path.exists(self.log_folder):
             os.makedirs(self.log_folder)
+        # Store the timebase anchor, all capture timestamps of this run refer to it
+        get_timebase().write_anchor(self.log_folder)
+        # Structured events of the run (steps, equipment actions, DUT commands)
+        open_journal(self.log_folder)
+        emit_event(RUN_START, log_folder=self.log_folder)
         # Create autologger
         autolog_abs_path = os.path.join(self.log_folder, self.autolog_file)
         self.logger = logging.getLogger("NSTA")
@@ -162,7 +170,8 @@ class TestRun:
                     if is_logging_enabled:
                         logger_port = logger_params["log_port"]
                         logger_timestamps_en = logger_params["log_timestamps"]
-                        device_logger = Logger(device_name, logger_port, logger_timestamps_en)
+                        logger_raw_capture_en = logger_params.get("raw_capture", False)
+                        device_logger = Logger(device_name, logger_port, logger_timestamps_en, raw_capture=logger_raw_capture_en)
                         self.data_loggers.append(device_logger)
                         self.logger.info(f"DATA LOGGING ENABLED for: {device_name}")
                         # TODO: remove elses?
@@ -345,44 +354,57 @@ class TestRun:
             self.logger.error("Error during Qmetry result publishing: %s", str(e))
             print("Error during Qmetry result publishing: %s. Check autolog.txt. Skipping publishing...", str(e))
 
+    def _release_resources(self):
+        """Release the resources shared by the test cases of a run."""
+        # Web sessions are shared by the devices of all test cases
+        close_session_pools()
+        # Flush the last events of the run
+        close_journal()
+
     def run_tests(self):
         """Run test cases."""
         # Create dependencies
         self.logger.info("Creating test dependencies")
         self._create_dependencies()
-        # Run tests
-        for test_instance in self.test_suite.test_instances:
-            TS = test_instance.TS
-            self.logger.info("=================== Starting test case: %s ===================", TS.name)
-            self.setup(TS)
-            try:
-                test_instance.start_time = datetime.now().strftime("%Y%m%d %H:%M:%S.%f")[:-3]
-                TS.initialize()
-                TS.teststeps()
-                TS.evaluate()
-                test_instance.end_time = datetime.now().strftime("%Y%m%d %H:%M:%S.%f")[:-3]
-                test_instance.test_result.result = TS.get_test_result()
-                test_instance.test_result.result_per_step = TS.get_result_per_step()
-                test_instance.test_result.suite_name = self.test_suite.suite_name
-                test_instance.test_result.build_version = self.test_suite.build_version
-                if self.qt_integration:
-                    self.logger.info("Publish Result to qTest")
-                    self.qtest_publish(test_instance)
-                TS.wrapup()
-                self.logger.info("Ending test case: %s", TS.name)
-            except KeyboardInterrupt:
-                self.logger.error("Test execution interrupted by user (KeyboardInterrupt).")
-                print("Test execution interrupted by user. Exiting...")
-                test_instance.end_time = datetime.now().strftime("%Y%m%d %H:%M:%S.%f")[:-3]
-            except Exception as e:
-                self.logger.error("Error during test case execution: %s", str(e))
-                print("Error during test case execution: %s. Check autolog.txt", str(e))
-                test_instance.end_time = datetime.now().strftime("%Y%m%d %H:%M:%S.%f")[:-3]
-            self.teardown(TS)
-            self.logger.info("Test Result: %s", test_instance.test_result.result)
-        if self.qmetry_integration:
-            self.logger.info("Publish Result to Qmetry")
-            self.qmetry_publish(self.test_suite)
+        try:
+            # Run tests
+            for test_instance in self.test_suite.test_instances:
+                TS = test_instance.TS
+                self.logger.info("=================== Starting test case: %s ===================", TS.name)
+                self.setup(TS)
+                emit_event(TEST_START, test=TS.name)
+                try:
+                    test_instance.start_time = datetime.now().strftime("%Y%m%d %H:%M:%S.%f")[:-3]
+                    TS.initialize()
+                    TS.teststeps()
+                    TS.evaluate()
+                    test_instance.end_time = datetime.now().strftime("%Y%m%d %H:%M:%S.%f")[:-3]
+                    test_instance.test_result.result = TS.get_test_result()
+                    test_instance.test_result.result_per_step = TS.get_result_per_step()
+                    test_instance.test_result.suite_name = self.test_suite.suite_name
+                    test_instance.test_result.build_version = self.test_suite.build_version
+                    if self.qt_integration:
+                        self.logger.info("Publish Result to qTest")
+                        self.qtest_publish(test_instance)
+                    TS.wrapup()
+                    self.logger.info("Ending test case: %s", TS.name)
+                except KeyboardInterrupt:
+                    self.logger.error("Test execution interrupted by user (KeyboardInterrupt).")
+                    print("Test execution interrupted by user. Exiting...")
+                    test_instance.end_time = datetime.now().strftime("%Y%m%d %H:%M:%S.%f")[:-3]
+                except Exception as e:
+                    self.logger.error("Error during test case execution: %s", str(e))
+                    print("Error during test case execution: %s. Check autolog.txt", str(e))
+                    test_instance.end_time = datetime.now().strftime("%Y%m%d %H:%M:%S.%f")[:-3]
+                self.teardown(TS)
+                emit_event(TEST_END, test=TS.name, result=TS.result_classifier.get_result_string(test_instance.test_result.result))
+                self.logger.info("Test Result: %s", test_instance.test_result.result)
+            if self.qmetry_integration:
+                self.logger.info("Publish Result to Qmetry")
+                self.qmetry_publish(self.test_suite)
+            emit_event(RUN_END)
+        finally:
+            self._release_resources()
         # Create result data structure
         result_suite = ResultSuite(self.test_suite)
         test_result_raw = result_suite.get_raw_result()
@@ -419,26 +441,32 @@ class TestRun:
         # Create dependencies
         self.logger.info("Creating test dependencies")
         self._create_dependencies()
-        # Run tests
-        for test_instance in self.test_suite.test_instances:
-            TS = test_instance.TS
-            self.logger.info("=================== Starting test case: %s ===================", TS.name)
-            # self.setup(TS)
-            test_instance.start_time = datetime.datetime.now().strftime("%Y%m%d %H:%M:%S.%f")[:-3]
-            TS.initialize()
-            TS.teststeps()
-            TS.evaluate()
-            test_instance.end_time = datetime.datetime.now().strftime("%Y%m%d %H:%M:%S.%f")[:-3]
-            test_instance.test_result.result = TS.get_test_result()
-            test_instance.test_result.result_per_step = TS.get_result_per_step()
-            test_instance.test_result.result_output = TS.get_result_output()
-            if self.qt_integration:
-                self.logger.info("Publish Result to qTest")
-                self.qtest_publish(test_instance)
-            TS.wrapup()
-            self.logger.info("Ending test case: %s", TS.name)
-            # self.teardown(TS)
-            self.logger.info("Test Result: %s", test_instance.test_result.result)
+        try:
+            # Run tests
+            for test_instance in self.test_suite.test_instances:
+                TS = test_instance.TS
+                self.logger.info("=================== Starting test case: %s ===================", TS.name)
+                # self.setup(TS)
+                emit_event(TEST_START, test=TS.name)
+                test_instance.start_time = datetime.datetime.now().strftime("%Y%m%d %H:%M:%S.%f")[:-3]
+                TS.initialize()
+                TS.teststeps()
+                TS.evaluate()
+                test_instance.end_time = datetime.datetime.now().strftime("%Y%m%d %H:%M:%S.%f")[:-3]
+                test_instance.test_result.result = TS.get_test_result()
+                test_instance.test_result.result_per_step = TS.get_result_per_step()
+                test_instance.test_result.result_output = TS.get_result_output()
+                if self.qt_integration:
+                    self.logger.info("Publish Result to qTest")
+                    self.qtest_publish(test_instance)
+                TS.wrapup()
+                self.logger.info("Ending test case: %s", TS.name)
+                # self.teardown(TS)
+                emit_event(TEST_END, test=TS.name, result=TS.result_classifier.get_result_string(test_instance.test_result.result))
+                self.logger.info("Test Result: %s", test_instance.test_result.result)
+            emit_event(RUN_END)
+        finally:
+            self._release_resources()
         # Create result data structure
         result_suite = ResultSuite(self.test_suite)
         test_result_raw = result_suite.get_raw_result()
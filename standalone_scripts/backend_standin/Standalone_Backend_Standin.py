@@ -0,0 +1,380 @@
+"""Local HTTP stand-in for the Sensolus and Sigfox backends (no cloud access required).
+
+This standalone script:
+    1. Serves the backend endpoints used by SensolusWebInterface, PlatformDevice and SigfoxInterface
+       from a local ThreadingHTTPServer
+    2. Takes its data from recorded fixtures (JSON) or generates synthetic devices, frames and messages
+    3. Adds configurable latency and jitter per request
+    4. Caps page sizes and pages Sigfox messages through paging.next cursors
+    5. Injects 429 answers (randomly and/or above a request rate) with Retry-After, and optionally expires logins
+    6. Reports the number of requests per endpoint and the injected errors
+
+Makes it possible to load test pagination, session pooling, caching and
+concurrency of the backend access offline and reproducibly.
+
+Served endpoints:
+    Sensolus (teststation config stickntrack: url: http://127.0.0.1:<port>, auth_path: /rest/authentication/login):
+        POST   /rest/authentication/login/<username>
+        GET    /rest/sigfoxdevices/<device_id>/sigfoxMessages?start=&limit=&from_date=&to_date=
+        POST   /rest/sigfoxdevices/filter/search
+        GET    /rest/device_setting_queue/<device_id>
+        POST   /rest/device_setting_queue
+        DELETE /rest/device_setting_queue/<setting_id>
+        POST   /rest/bulk_device_operations/TRACKER
+    Sigfox (teststation config sigfox: url: http://127.0.0.1:<port>/v2):
+        GET    /v2/devices/<sigfox_id>
+        GET    /v2/devices/<sigfox_id>/messages?limit=&since=&before=
+        GET    /v2/coverages/global/predictions
+
+Fixture file format (see --save-fixtures):
+    {"frames": {"<device_id>": [frame, ...]}, "sigfox_messages": {"<sigfox_id>": [message, ...]}}
+
+Example:
+    python Standalone_Backend_Standin.py --port 8080 --devices 100 --frames 500 --latency 0.05 --jitter 0.05 --page-size 100 --error-rate 0.01
+"""
+
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, urlencode
+
+
+BACKEND_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+SIGFOX_MAX_LIMIT = 100      # Max. messages per Sigfox page
+AUTH_PATH = "/rest/authentication/login"
+
+
+def generate_fixtures(n_devices=10, n_frames=200, interval_s=600, end_time=None, seed=0):
+    """Generate synthetic platform frames and Sigfox messages.
+
+    :param n_devices: Number of devices, defaults to 10
+    :type n_devices: int, optional
+    :param n_frames: Number of frames and messages per device, defaults to 200
+    :type n_frames: int, optional
+    :param interval_s: Time between two frames of a device in seconds, defaults to 600
+    :type interval_s: int, optional
+    :param end_time: Time of the newest frame, defaults to now (UTC)
+    :type end_time: datetime.datetime, optional
+    :param seed: Random seed, defaults to 0
+    :type seed: int, optional
+
+    :return: Fixtures, see the module docstring
+    :rtype: dict
+    """
+    rand = random.Random(seed)
+    end_time = (end_time or datetime.now(timezone.utc)).replace(microsecond=0)
+    message_types = ("KEEP_ALIVE_EVENT", "LOCATION_UPDATE", "NBIOT_DIAGNOSTICS", "BOOT_EVENT")
+    operators = (("26201", "DE", "Telekom", "Telekom Deutschland GmbH"), ("26202", "DE", "Vodafone", "Vodafone D2 GmbH"),
+                 ("20404", "NL", "Vodafone", "Vodafone Libertel B.V."))
+    fixtures = {"frames": {}, "sigfox_messages": {}}
+    for device_no in range(n_devices):
+        device_id = str(100000 + device_no)
+        sigfox_id = f"{0x2000000 + device_no:X}"
+        frames = []
+        messages = []
+        for frame_no in range(n_frames):
+            frame_time = end_time - timedelta(seconds=interval_s * (n_frames - 1 - frame_no) + rand.randint(0, interval_s // 2))
+            timestamp = frame_time.strftime(BACKEND_TIME_FORMAT)
+            message_type = rand.choice(message_types)
+            decoded = {"messageType": message_type, "messageDate": timestamp}
+            if message_type == "KEEP_ALIVE_EVENT":
+                decoded["event"] = rand.choice(("PERIODIC", "ACTIVATION"))
+            elif message_type == "LOCATION_UPDATE":
+                decoded["state"] = rand.choice(("START", "STOP"))
+            plmn, country_code, brand, operator = rand.choice(operators)
+            network = {"decodedMsg": {
+                "data": {"ecl": rand.choice((0, 0, 0, 1, 2)), "operator": plmn, "sc_band": 20,
+                         "sc_tx_pwr": rand.randint(-10, 23), "rsrp": rand.randint(-125, -70), "rsrq": rand.randint(-20, -3)},
+                "messageType": "NBIOT_DIAGNOSTICS",
+                "operatorInfo": {"countryCode": country_code, "brand": brand, "operator": operator}}}
+            if message_type == "NBIOT_DIAGNOSTICS":
+                # Diagnostic messages carry the network data, like the platform decodes them
+                decoded["data"] = dict(network["decodedMsg"]["data"])
+            frames.append({"backendSeqNbr": frame_no, "firstReceiveTime": timestamp,
+                           "data": [{"decodedMsg": decoded}], "networks": [network]})
+            messages.append({"device": {"id": sigfox_id}, "time": int(frame_time.timestamp() * 1000),
+                             "data": f"{rand.getrandbits(96):024x}", "seqNumber": frame_no})
+        # Newest first, like the backends
+        fixtures["frames"][device_id] = frames[::-1]
+        fixtures["sigfox_messages"][sigfox_id] = messages[::-1]
+    return fixtures
+
+
+class BackendStandin:
+    """Local stand-in server for the Sensolus and Sigfox backends.
+
+    :param fixtures: Frames and Sigfox messages served, see the module docstring
+    :type fixtures: dict
+    :param host: Interface to listen on, defaults to "127.0.0.1"
+    :type host: str, optional
+    :param port: Port to listen on, defaults to 0 (any free port)
+    :type port: int, optional
+    :param latency_s: Delay of every answer in seconds, defaults to 0
+    :type latency_s: float, optional
+    :param jitter_s: Max. random delay added to latency_s, defaults to 0
+    :type jitter_s: float, optional
+    :param page_size: Max. number of frames per page, larger limits are cut, defaults to None (no cap)
+    :type page_size: int, optional
+    :param error_rate: Probability of answering a request with 429, defaults to 0
+    :type error_rate: float, optional
+    :param rate_limit: Requests per second above which requests are answered with 429, defaults to None (no limit)
+    :type rate_limit: float, optional
+    :param retry_after_s: Retry-After of the 429 answers in seconds, defaults to 1
+    :type retry_after_s: float, optional
+    :param session_ttl_s: Time after which a login expires (401), defaults to None (never)
+    :type session_ttl_s: float, optional
+    :param seed: Random seed of the latency and error injection, defaults to 0
+    :type seed: int, optional
+    """
+    def __init__(self, fixtures, host="127.0.0.1", port=0, latency_s=0, jitter_s=0, page_size=None, error_rate=0,
+                 rate_limit=None, retry_after_s=1, session_ttl_s=None, seed=0):
+        self.frames = fixtures.get("frames", {})
+        self.sigfox_messages = fixtures.get("sigfox_messages", {})
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.retry_after_s = retry_after_s
+        self.session_ttl_s = session_ttl_s
+        self.stats = Counter()
+        self.setting_queue = {}
+        self._random = random.Random(seed)
+        self._tokens = {}
+        self._recent_requests = deque()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        """Base URL of the server."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                standin._handle(self, "GET")
+
+            def do_POST(self):
+                standin._handle(self, "POST")
+
+            def do_DELETE(self):
+                standin._handle(self, "DELETE")
+
+            def do_HEAD(self):
+                standin._handle(self, "HEAD")
+
+        return Handler
+
+    def _send(self, handler, status, body=None, headers=None):
+        payload = b"" if body is None else json.dumps(body).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            handler.send_header(key, value)
+        handler.end_headers()
+        if handler.command != "HEAD":
+            handler.wfile.write(payload)
+
+    def _inject_error(self):
+        """Check whether to answer 429: at random or above the rate limit."""
+        with self._lock:
+            now = time.monotonic()
+            self._recent_requests.append(now)
+            while self._recent_requests and self._recent_requests[0] < now - 1:
+                self._recent_requests.popleft()
+            if self.rate_limit is not None and len(self._recent_requests) > self.rate_limit:
+                return True
+            return self._random.random() < self.error_rate
+
+    def _logged_in(self, handler):
+        token = handler.headers.get("X-Csrf-Token")
+        with self._lock:
+            issued = self._tokens.get(token)
+        if issued is None:
+            return False
+        return self.session_ttl_s is None or time.monotonic() - issued < self.session_ttl_s
+
+    def _handle(self, handler, method):
+        parsed = urlparse(handler.path)
+        path = parsed.path.rstrip("/")
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        with self._lock:
+            delay = self.latency_s + self._random.uniform(0, self.jitter_s)
+        time.sleep(delay)
+        endpoint = re.sub(r"/[0-9A-Fa-f]{5,}(?=/|$)", "/<id>", path) or "/"
+        with self._lock:
+            self.stats[f"{method} {endpoint}"] += 1
+        if method == "HEAD":
+            return self._send(handler, 200)
+        if self._inject_error():
+            with self._lock:
+                self.stats["429 injected"] += 1
+            return self._send(handler, 429, {"message": "Too many requests"}, {"Retry-After": f"{self.retry_after_s:g}"})
+        if path.startswith("/v2/"):
+            return self._handle_sigfox(handler, path[3:], query)
+        if method == "POST" and path.startswith(AUTH_PATH + "/"):
+            token = f"{random.getrandbits(64):016x}"
+            with self._lock:
+                self._tokens[token] = time.monotonic()
+            return self._send(handler, 200, {"csrfToken": token})
+        if not self._logged_in(handler):
+            with self._lock:
+                self.stats["401 login expired"] += 1
+            return self._send(handler, 401, {"message": "Not logged in"})
+        return self._handle_sensolus(handler, method, path, query, body)
+
+    def _handle_sensolus(self, handler, method, path, query, body):
+        match = re.fullmatch(r"/rest/sigfoxdevices/([^/]+)/sigfoxMessages", path)
+        if method == "GET" and match:
+            frames = self.frames.get(match.group(1), [])
+            from_date = datetime.fromisoformat(query["from_date"]) if "from_date" in query else None
+            to_date = datetime.fromisoformat(query["to_date"]) if "to_date" in query else None
+            if from_date or to_date:
+                frames = [frame for frame in frames if
+                          (from_date is None or datetime.strptime(frame["firstReceiveTime"], BACKEND_TIME_FORMAT) >= from_date) and
+                          (to_date is None or datetime.strptime(frame["firstReceiveTime"], BACKEND_TIME_FORMAT) <= to_date)]
+            start = int(query.get("start", 0))
+            limit = int(query.get("limit", len(frames)))
+            if self.page_size is not None:
+                limit = min(limit, self.page_size)
+            return self._send(handler, 200, {"data": frames[start:start + limit], "total": len(frames)})
+        if method == "POST" and path == "/rest/sigfoxdevices/filter/search":
+            max_results = json.loads(body or b"{}").get("maxResults", len(self.frames))
+            devices = [{"id": int(device_id) if device_id.isdigit() else device_id, "serial": device_id}
+                       for device_id in list(self.frames)[:max_results]]
+            return self._send(handler, 200, {"data": devices, "total": len(self.frames)})
+        match = re.fullmatch(r"/rest/device_setting_queue/([^/]+)", path)
+        if method == "GET" and match:
+            with self._lock:
+                settings = [setting for setting in self.setting_queue.values() if str(setting["deviceId"]) == match.group(1)]
+            return self._send(handler, 200, settings)
+        if method == "DELETE" and match:
+            with self._lock:
+                self.setting_queue.pop(match.group(1), None)
+            return self._send(handler, 200)
+        if method == "POST" and path == "/rest/device_setting_queue":
+            setting = json.loads(body or b"{}")
+            with self._lock:
+                setting_id = str(len(self.setting_queue) + 1)
+                self.setting_queue[setting_id] = dict(setting, id=setting_id, pushedAt=None)
+            return self._send(handler, 200, {"id": setting_id})
+        if method == "POST" and path == "/rest/bulk_device_operations/TRACKER":
+            return self._send(handler, 200, {"status": "QUEUED"})
+        return self._send(handler, 404, {"message": f"Unknown endpoint: {method} {path}"})
+
+    def _handle_sigfox(self, handler, path, query):
+        match = re.fullmatch(r"/devices/([^/]+)/messages", path)
+        if match:
+            sigfox_id = match.group(1)
+            limit = min(int(query.get("limit", SIGFOX_MAX_LIMIT)), SIGFOX_MAX_LIMIT)
+            since = int(query["since"]) if "since" in query else None
+            before = int(query["before"]) if "before" in query else None
+            messages = [message for message in self.sigfox_messages.get(sigfox_id, [])
+                        if (since is None or message["time"] >= since) and (before is None or message["time"] < before)]
+            page = messages[:limit]
+            response = {"data": page}
+            if len(messages) > limit:
+                # The cursor continues before the oldest message of this page
+                next_query = {"limit": limit, "before": page[-1]["time"]}
+                if since is not None:
+                    next_query["since"] = since
+                response["paging"] = {"next": f"{self.url}/v2/devices/{sigfox_id}/messages?{urlencode(next_query)}"}
+            return self._send(handler, 200, response)
+        match = re.fullmatch(r"/devices/([^/]+)", path)
+        if match:
+            if match.group(1) not in self.sigfox_messages:
+                return self._send(handler, 404, {"message": "Device not found"})
+            return self._send(handler, 200, {"id": match.group(1), "name": match.group(1)})
+        if path == "/coverages/global/predictions":
+            return self._send(handler, 200, {"locationCovered": True, "margins": [50, 40, 30]})
+        return self._send(handler, 404, {"message": f"Unknown endpoint: GET /v2{path}"})
+
+
+def print_stats(stats):
+    for key, count in sorted(stats.items()):
+        print(f"{count}\t{key}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Sensolus and Sigfox backends")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--fixtures", help="Recorded fixtures to serve (JSON, default: synthetic data)")
+    parser.add_argument("--save-fixtures", help="Store the served fixtures in this JSON file")
+    parser.add_argument("--devices", type=int, default=10, help="Number of synthetic devices")
+    parser.add_argument("--frames", type=int, default=200, help="Number of synthetic frames/messages per device")
+    parser.add_argument("--interval", type=int, default=600, help="Time between synthetic frames in seconds")
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay of every answer in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Max. random delay added to the latency in seconds")
+    parser.add_argument("--page-size", type=int, help="Max. number of frames per page (default: no cap)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a 429 answer")
+    parser.add_argument("--rate-limit", type=float, help="Requests per second above which 429 is answered")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of 429 answers in seconds")
+    parser.add_argument("--session-ttl", type=float, help="Seconds after which a login expires (401)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args(argv)
+
+    if args.fixtures:
+        with open(args.fixtures) as file:
+            fixtures = json.load(file)
+    else:
+        fixtures = generate_fixtures(args.devices, args.frames, args.interval, seed=args.seed)
+    if args.save_fixtures:
+        with open(args.save_fixtures, "w") as file:
+            json.dump(fixtures, file)
+
+    standin = BackendStandin(fixtures, host=args.host, port=args.port, latency_s=args.latency, jitter_s=args.jitter,
+                             page_size=args.page_size, error_rate=args.error_rate, rate_limit=args.rate_limit,
+                             retry_after_s=args.retry_after, session_ttl_s=args.session_ttl, seed=args.seed)
+    print(f"Serving {len(standin.frames)} platform devices and {len(standin.sigfox_messages)} Sigfox devices on {standin.url}")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.server.server_close()
+        print_stats(standin.stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,13 +9,16 @@ This standalone script:
 Makes use of the following features of the NSTA framework:
     1. SensolusWebInterface: For accessing the platform
     2. PlatformDevice: To get device specific messages
-    3. ReportEngine: Makes use of jinja2 HTML reporting
+    3. AsyncClient: Fetches the devices' messages concurrently
+    4. ReportEngine: Makes use of jinja2 HTML reporting
 """
 
 
 from NSTAX.interface.sensolus_web_interface import SensolusWebInterface
 from NSTAX.devices.platform_device import PlatformDevice
+from NSTAX.interface.async_client import AsyncClient
 from NSTAX.reports.report_engine import ReportEngine
+from NSTAX.logger.message_store import MessageStore
 
 
 class NBIOTECLStatsOverContract:
@@ -36,29 +39,31 @@ class NBIOTECLStatsOverContract:
     :type max_n_devices: int, optional
     :param max_n_messages: Max. number of messages returned, defaults to 500
     :type max_n_messages: int, optional
+    :param message_store: Local frame store shared by all devices, repeated runs only download new frames, defaults to None
+    :type message_store: MessageStore, optional
     """
-    def __init__(self, org_id, start_time_utc, end_time_utc, max_n_devices=1000, max_n_messages=500):
+    def __init__(self, org_id, start_time_utc, end_time_utc, max_n_devices=1000, max_n_messages=500, message_store=None):
         self.version = 0.1
         self.org_id = org_id
         self.start_time_utc = start_time_utc
         self.end_time_utc = end_time_utc
         self.max_n_devices = max_n_devices
         self.max_n_messages = max_n_messages
+        self.message_store = message_store
         self.cell_provider_stats = {}
         self._run_steps()
         self._post_process()
 
-    def _process_device_data(self, device_id):
-        device_instance = PlatformDevice(device_id)
-        # Connect to the device instance
-        device_instance.connect()
-        # Get cell provider
-        cell_provider = device_instance.get_cellular_provider()
+    def _fetch_device_data(self, device_instance):
+        # Runs concurrently for all devices, requests of a device are sequential
         # Get backend messages
-        backend_messages = device_instance.get_messages(start_time_utc=self.start_time_utc, end_time_utc=self.end_time_utc, max_n_messages=self.max_n_messages)
+        backend_messages = device_instance.get_messages(start_time_utc=self.start_time_utc, end_time_utc=self.end_time_utc, max_n_messages=self.max_n_messages, max_workers=1)
+        # Get cell provider, last one reported within the diagnostic period
+        cell_provider = device_instance.get_cellular_provider(start_time_utc=self.start_time_utc, end_time_utc=self.end_time_utc)
+        return cell_provider, backend_messages
+
+    def _process_device_data(self, cell_provider, backend_messages):
         print (len(backend_messages))
-        # Disconnect from the device instance
-        device_instance.disconnect()
         # Compile diagnostic messages with ECL data
         diag_messages = []
         for message_ in backend_messages:
@@ -114,10 +119,22 @@ class NBIOTECLStatsOverContract:
         # Close connection
         SWI.disconnect()
         device_list = response_dict["data"]
-        # Update with device info
+        # Connect to the device instances, they share the logged-in backend sessions
+        device_instances = []
         for device_ in device_list:
             device_id_ = device_['id']
-            self._process_device_data(device_id_)
+            device_instance = PlatformDevice(device_id_, device_id=device_id_, message_store=self.message_store)
+            device_instance.connect()
+            device_instances.append(device_instance)
+        # Get device data, many devices at a time
+        with AsyncClient() as client:
+            device_data = client.run(client.map_devices(self._fetch_device_data, device_instances))
+        # Disconnect from the device instances
+        for device_instance in device_instances:
+            device_instance.disconnect()
+        # Update with device info
+        for cell_provider, backend_messages in device_data:
+            self._process_device_data(cell_provider, backend_messages)
 
     def _post_process(self):
         # Postprocess overall data
@@ -131,6 +148,9 @@ class NBIOTECLStatsOverContract:
                 "DECODER_ERROR": 0
             }
             n_readouts = detailed_stats_["number_of_diag_messages"]
+            if not n_readouts:
+                # No diagnostic messages from this provider's devices
+                continue
             for level_, ctr_ in detailed_stats_["ecl_stats"].items():
                 self.cell_provider_stats[provider_]["ecl_stats_in_percentage"][level_] = round((100 * ctr_ / n_readouts), 2)
 
@@ -166,7 +186,8 @@ if __name__ == "__main__":
     END_TIME_UTC = "2024-01-17T00:00:00"
     MAX_N_DEVICES = 10
     MAX_N_MESSAGES = 500
-    test_script = NBIOTECLStatsOverContract(ORG_ID, START_TIME_UTC, END_TIME_UTC, MAX_N_DEVICES, MAX_N_MESSAGES)
+    MESSAGE_STORE = MessageStore("platform_frames.sqlite")
+    test_script = NBIOTECLStatsOverContract(ORG_ID, START_TIME_UTC, END_TIME_UTC, MAX_N_DEVICES, MAX_N_MESSAGES, MESSAGE_STORE)
     # print ("Stat: ", test_script.return_stats())
     # Generate HTML Report
     TEMPLATE_DIRECTORY = "C:/UserData/dev/NSTA/standalone_scripts/netstat_org"
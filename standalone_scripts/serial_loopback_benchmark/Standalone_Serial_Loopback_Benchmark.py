@@ -0,0 +1,497 @@
+"""Serial loopback benchmark on Linux pseudo-terminals (no hardware required).
+
+This standalone script:
+    1. Opens a pty pair, the slave end acts as the DUT serial port
+    2. Replays recorded DUT output (or synthetic lines) into the master end at a configurable rate,
+       optionally in bursts and mixed with binary noise
+    3. Drives the real serial classes on the slave end and collects what they captured
+    4. Reports throughput, latency from write to capture, CPU use and dropped bytes/lines
+    5. Optionally stores the results as JSON and compares them against a baseline to guard against regressions
+
+Makes use of the following features of the NSTA framework:
+    1. RS232Interface: Data stream reader
+    2. SerialDevice: Data stream reader through the device layer
+    3. Logger: Text logger and raw capture logger
+
+Every replayed line is prefixed with an 8 digit sequence number, captured
+lines are matched back to the sent ones through it. Lines are sent with a
+non-blocking write, bytes that do not fit the pty buffer are counted as
+overrun (what a real UART would lose while the reader is not keeping up).
+
+Example:
+    python Standalone_Serial_Loopback_Benchmark.py --rate 200000 --duration 10 --noise 0.01 --json result.json
+"""
+
+
+import os
+import re
+import sys
+import tty
+import json
+import time
+import random
+import shutil
+import tempfile
+import threading
+import argparse
+from datetime import datetime
+
+from NSTAX.interface.rs232_interface import RS232Interface
+from NSTAX.devices.serial_device import SerialDevice
+from NSTAX.logger.logger import Logger
+from NSTAX.logger.raw_capture import RawCaptureReader
+from NSTAX.logger.time_index import parse_line_timestamp
+
+
+SCENARIOS = ("rs232_stream", "serial_device", "logger_text", "logger_raw")
+SEQ_PATTERN = re.compile(rb"(\d{8}) ")
+# Synthetic line shaped like the DUT debug output
+SYNTHETIC_LINE = "!N5TEST,{ts:08x},01,{x},{y},{z},0,1,2,3,4,5,6,7,8,9,10,11,12,13"
+
+
+class PtyLoopback:
+    """Pseudo-terminal pair, the slave end is used like a serial port.
+
+    :param nonblocking: Do not block writes when the pty buffer is full, defaults to True
+    :type nonblocking: bool, optional
+    """
+    def __init__(self, nonblocking=True):
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.master_fd)
+        tty.setraw(self.slave_fd)
+        os.set_blocking(self.master_fd, not nonblocking)
+        self.port = os.ttyname(self.slave_fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, data):
+        """Write data towards the slave end.
+
+        :param data: Data to send
+        :type data: bytes
+
+        :return: Number of bytes accepted by the pty
+        :rtype: int
+        """
+        try:
+            return os.write(self.master_fd, data)
+        except BlockingIOError:
+            return 0
+
+    def close(self):
+        """Close both ends of the pty."""
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class ReplaySource:
+    """Line source replaying a recorded DUT log or synthetic lines.
+
+    :param record_path: Recorded DUT output, replayed in a loop (logger timestamps are removed), defaults to synthetic lines
+    :type record_path: str, optional
+    :param rate: Average send rate in bytes/s, defaults to 11520 (115200 baud)
+    :type rate: int, optional
+    :param burst_s: Length of a send burst in seconds, 0 sends continuously, defaults to 0
+    :type burst_s: float, optional
+    :param idle_s: Pause between bursts in seconds, defaults to 0
+    :type idle_s: float, optional
+    :param noise: Probability of a binary noise line between two lines, defaults to 0
+    :type noise: float, optional
+    :param chunk_size: Max. number of bytes written at once, defaults to 256
+    :type chunk_size: int, optional
+    :param seed: Random seed for reproducible noise, defaults to 0
+    :type seed: int, optional
+    """
+    def __init__(self, record_path=None, rate=11520, burst_s=0, idle_s=0, noise=0.0, chunk_size=256, seed=0):
+        self.rate = rate
+        self.burst_s = burst_s
+        self.idle_s = idle_s
+        self.noise = noise
+        self.chunk_size = chunk_size
+        self.random = random.Random(seed)
+        self.records = self._load_records(record_path) if record_path else None
+
+    @staticmethod
+    def _load_records(record_path):
+        records = []
+        with open(record_path, "rb") as file:
+            for line in file:
+                line = line.rstrip(b"\r\n")
+                if parse_line_timestamp(line) is not None:
+                    line = line[line.find(b"]") + 1:].lstrip()
+                if line:
+                    records.append(line)
+        if not records:
+            raise ValueError("Error in replay source !", record_path, "No lines to replay")
+        return records
+
+    def payload(self, seq):
+        """Get the payload of line number seq, without sequence prefix and line terminator."""
+        if self.records:
+            return self.records[seq % len(self.records)]
+        rnd = self.random
+        return SYNTHETIC_LINE.format(ts=seq, x=rnd.randint(-1024, 1024), y=rnd.randint(-1024, 1024), z=rnd.randint(-1024, 1024)).encode()
+
+    def noise_line(self):
+        """Get a line of random bytes, terminated by the only line feed it contains."""
+        n = self.random.randint(8, 64)
+        return bytes(self.random.choice(range(256)) for _ in range(n)).replace(b"\n", b"\x00") + b"\r\n"
+
+    def is_idle(self, elapsed):
+        """Check if the source is in the pause of a burst pattern."""
+        if not self.burst_s or not self.idle_s:
+            return False
+        return elapsed % (self.burst_s + self.idle_s) >= self.burst_s
+
+
+class Feeder(threading.Thread):
+    """Thread writing a ReplaySource into the master end of a PtyLoopback.
+
+    :param loopback: Target pty pair
+    :type loopback: PtyLoopback
+    :param source: Line source
+    :type source: ReplaySource
+    :param duration: Send duration in seconds
+    :type duration: float
+    """
+    def __init__(self, loopback, source, duration):
+        super().__init__(daemon=True)
+        self.loopback = loopback
+        self.source = source
+        self.duration = duration
+        self.sent_at = {}           # seq -> time.time_ns() before writing, only for fully written lines
+        self.payload_bytes = {}     # seq -> length of the payload as the text readers store it
+        self.sent_bytes = 0
+        self.noise_bytes = 0
+        self.overrun_bytes = 0
+        self.cpu_s = 0.0            # CPU time of the feeder itself, excluded from the reader CPU use
+
+    def run(self):
+        cpu_start = time.thread_time()
+        source = self.source
+        start = time.perf_counter()
+        budget_start = start
+        budget_bytes = 0
+        seq = 0
+        while True:
+            now = time.perf_counter()
+            elapsed = now - start
+            if elapsed >= self.duration:
+                break
+            if source.is_idle(elapsed):
+                time.sleep(0.001)
+                budget_start, budget_bytes = time.perf_counter(), 0
+                continue
+            if source.noise and source.random.random() < source.noise:
+                line = source.noise_line()
+                self.noise_bytes += len(line)
+                self._write(line)
+            else:
+                payload = b"%08d " % seq + source.payload(seq)
+                line = payload + b"\r\n"
+                sent_at = time.time_ns()
+                if self._write(line) == len(line):
+                    self.sent_at[seq] = sent_at
+                    self.payload_bytes[seq] = len(payload)
+                seq += 1
+            # Pace to the configured rate
+            budget_bytes += len(line)
+            delay = budget_start + budget_bytes / source.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self.cpu_s = time.thread_time() - cpu_start
+
+    def _write(self, line):
+        written = 0
+        for pos in range(0, len(line), self.source.chunk_size):
+            chunk = line[pos:pos + self.source.chunk_size]
+            n = self.loopback.write(chunk)
+            written += n
+            self.sent_bytes += n
+            if n < len(chunk):
+                self.overrun_bytes += len(line) - written
+                break
+        return written
+
+
+def split_capture_line(line, timestamps_utc=True):
+    """Split a captured text line "[timestamp] payload" into (timestamp_ns, payload).
+
+    :param line: Captured line
+    :type line: bytes
+    :param timestamps_utc: Timestamps are UTC, otherwise local time, defaults to True
+    :type timestamps_utc: bool, optional
+
+    :return: Capture timestamp in ns (None if missing) and payload
+    :rtype: tuple
+    """
+    if timestamps_utc:
+        timestamp_ns = parse_line_timestamp(line)
+    else:
+        timestamp_ns = None
+        end = line.find(b"]")
+        if line.startswith(b"[") and end > 0:
+            try:
+                timestamp_ns = int(datetime.fromisoformat(line[1:end].decode("ascii")).timestamp() * 1e9)
+            except (ValueError, UnicodeDecodeError):
+                pass
+    if timestamp_ns is not None:
+        line = line[line.find(b"]") + 1:].lstrip()
+    return timestamp_ns, line
+
+
+def _stream_lines(data):
+    """Get the lines of a data stream returned by RS232Interface."""
+    if data is None:
+        return []
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if isinstance(data, bytes):
+        return data.split(b"\n")
+    return [line.encode("utf-8") if isinstance(line, str) else line for line in data.iter_lines()]
+
+
+class StreamScenario:
+    """RS232Interface data stream thread, timestamps are taken in local time."""
+    timestamps_utc = False
+
+    def __init__(self, port, work_dir, wait_time):
+        self.reader = RS232Interface(port=port, interface_wait_time=wait_time, timeout=1)
+
+    def start(self):
+        self.reader.connect()
+        self.reader.read_data_stream_start(timestamp_en=True)
+
+    def stop(self):
+        data = self.reader.read_data_stream_stop()
+        self.reader.disconnect()
+        return [split_capture_line(line, self.timestamps_utc) for line in _stream_lines(data)]
+
+
+class SerialDeviceScenario(StreamScenario):
+    """SerialDevice data stream, same reader as StreamScenario behind the device layer."""
+    def __init__(self, port, work_dir, wait_time):
+        self.reader = SerialDevice("LoopbackDevice", port, serial_timeout_s=wait_time, timeout=1)
+
+    def start(self):
+        self.reader.connect()
+        self.reader.read_serial_data_start(timestamp_en=True)
+
+    def stop(self):
+        self.reader.read_serial_data_stop()
+        data = self.reader.get_serial_data()
+        self.reader.disconnect()
+        return [split_capture_line(line, self.timestamps_utc) for line in _stream_lines(data)]
+
+
+class LoggerScenario:
+    """Logger writing a timestamped text log (or a raw capture) to disk."""
+    raw_capture = False
+
+    def __init__(self, port, work_dir, wait_time):
+        self.logger = Logger("LoopbackDevice", port, log_timestamps=True, auto_start=False, file_path=work_dir, raw_capture=self.raw_capture)
+        # Logger builds Windows style paths, set a portable one
+        suffix = ".bin" if self.raw_capture else ".csv"
+        self.logger.data_filename = os.path.join(work_dir, f"LoopbackDevice_serial_data{suffix}")
+
+    def start(self):
+        self.logger.start_logger()
+
+    def stop(self):
+        self.logger.stop_logger()
+        with open(self.logger.data_filename, "rb") as file:
+            return [split_capture_line(line.rstrip(b"\r\n")) for line in file]
+
+
+class RawLoggerScenario(LoggerScenario):
+    """Logger in raw capture mode, arrival times come from the line index."""
+    raw_capture = True
+
+    def stop(self):
+        self.logger.stop_logger()
+        with RawCaptureReader(self.logger.data_filename) as reader:
+            return [(timestamp_ns, line.strip()) for timestamp_ns, line in reader.iter_lines(decode=False)]
+
+
+SCENARIO_CLASSES = {
+    "rs232_stream": StreamScenario,
+    "serial_device": SerialDeviceScenario,
+    "logger_text": LoggerScenario,
+    "logger_raw": RawLoggerScenario,
+}
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def run_scenario(name, source, duration, drain_s=1.0, wait_time=0.1, settle_s=0.5):
+    """Replay a source through a pty into one of the serial readers and measure it.
+
+    :param name: Scenario name, one of SCENARIOS
+    :type name: str
+    :param source: Line source
+    :type source: ReplaySource
+    :param duration: Send duration in seconds
+    :type duration: float
+    :param drain_s: Time given to the reader after the last write, defaults to 1.0
+    :type drain_s: float, optional
+    :param wait_time: interface_wait_time / serial_timeout_s of the stream readers, defaults to 0.1
+    :type wait_time: float, optional
+    :param settle_s: Time given to the reader to open the port before sending (opening flushes the input), defaults to 0.5
+    :type settle_s: float, optional
+
+    :return: Benchmark results
+    :rtype: dict
+    """
+    work_dir = tempfile.mkdtemp(prefix="nsta_loopback_")
+    try:
+        with PtyLoopback() as loopback:
+            scenario = SCENARIO_CLASSES[name](loopback.port, work_dir, wait_time)
+            feeder = Feeder(loopback, source, duration)
+            scenario.start()
+            time.sleep(settle_s)
+            cpu_start = time.process_time()
+            wall_start = time.perf_counter()
+            feeder.start()
+            feeder.join()
+            time.sleep(drain_s)
+            captured = scenario.stop()
+            wall_s = time.perf_counter() - wall_start
+            cpu_s = time.process_time() - cpu_start - feeder.cpu_s
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    seen = set()
+    latencies_ms = []
+    captured_bytes = 0
+    corrupted = 0
+    last_capture_ns = None
+    for timestamp_ns, payload in captured:
+        match = SEQ_PATTERN.match(payload)
+        if not match:
+            continue
+        seq = int(match.group(1))
+        if seq not in feeder.sent_at or seq in seen:
+            continue
+        if len(payload) != feeder.payload_bytes[seq]:
+            corrupted += 1
+            continue
+        seen.add(seq)
+        captured_bytes += len(payload) + 1
+        if timestamp_ns is not None:
+            latencies_ms.append((timestamp_ns - feeder.sent_at[seq]) / 1e6)
+            last_capture_ns = max(last_capture_ns or timestamp_ns, timestamp_ns)
+    sent_lines = len(feeder.sent_at)
+    # Throughput over first send to last capture, stopping the readers is not part of it
+    if last_capture_ns is not None and feeder.sent_at:
+        span_s = max((last_capture_ns - min(feeder.sent_at.values())) / 1e9, 1e-3)
+    else:
+        span_s = wall_s
+    sent_payload_bytes = sum(n + 1 for n in feeder.payload_bytes.values())
+    return {
+        "scenario": name,
+        "duration_s": round(wall_s, 3),
+        "sent_bytes": feeder.sent_bytes,
+        "noise_bytes": feeder.noise_bytes,
+        "overrun_bytes": feeder.overrun_bytes,
+        "sent_lines": sent_lines,
+        "captured_lines": len(seen),
+        "corrupted_lines": corrupted,
+        "dropped_lines": sent_lines - len(seen),
+        "dropped_bytes": sent_payload_bytes - captured_bytes + feeder.overrun_bytes,
+        "throughput_Bps": round(captured_bytes / span_s, 1),
+        "latency_ms_p50": _percentile(latencies_ms, 50),
+        "latency_ms_p95": _percentile(latencies_ms, 95),
+        "latency_ms_max": max(latencies_ms) if latencies_ms else None,
+        "cpu_percent": round(100 * cpu_s / wall_s, 1),
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Find regressions against a previous run.
+
+    :param results: Results of this run
+    :type results: list of dict
+    :param baseline: Results of the reference run
+    :type baseline: list of dict
+    :param tolerance: Allowed relative deviation, e.g. 0.2 for 20%
+    :type tolerance: float
+
+    :return: Regression descriptions, empty if none
+    :rtype: list of str
+    """
+    regressions = []
+    reference = {entry["scenario"]: entry for entry in baseline}
+    for result in results:
+        ref = reference.get(result["scenario"])
+        if ref is None:
+            continue
+        if result["throughput_Bps"] < ref["throughput_Bps"] * (1 - tolerance):
+            regressions.append(f"{result['scenario']}: throughput {result['throughput_Bps']} < {ref['throughput_Bps']} B/s")
+        if result["dropped_lines"] > ref["dropped_lines"] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: dropped lines {result['dropped_lines']} > {ref['dropped_lines']}")
+        for key in ("latency_ms_p95", "cpu_percent"):
+            if result[key] is not None and ref[key] is not None and result[key] > ref[key] * (1 + tolerance):
+                regressions.append(f"{result['scenario']}: {key} {result[key]} > {ref[key]}")
+    return regressions
+
+
+def print_results(results):
+    columns = ("scenario", "throughput_Bps", "sent_lines", "captured_lines", "dropped_lines", "dropped_bytes",
+               "overrun_bytes", "latency_ms_p50", "latency_ms_p95", "cpu_percent")
+    print("\t".join(columns))
+    for result in results:
+        print("\t".join(str(result[column]) for column in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serial loopback benchmark on Linux pseudo-terminals")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Scenario to run, repeatable (default: all)")
+    parser.add_argument("--record", help="Recorded DUT log to replay (default: synthetic lines)")
+    parser.add_argument("--rate", type=int, default=11520, help="Send rate in bytes/s (default: 11520, 115200 baud)")
+    parser.add_argument("--duration", type=float, default=5.0, help="Send duration in seconds per scenario")
+    parser.add_argument("--burst", type=float, default=0.0, help="Burst length in seconds (default: continuous)")
+    parser.add_argument("--idle", type=float, default=0.0, help="Pause between bursts in seconds")
+    parser.add_argument("--noise", type=float, default=0.0, help="Probability of a binary noise line between lines")
+    parser.add_argument("--wait-time", type=float, default=0.1, help="interface_wait_time of the stream readers")
+    parser.add_argument("--drain", type=float, default=1.0, help="Time given to readers after the last write")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--json", help="Store the results in this JSON file")
+    parser.add_argument("--baseline", help="Compare against the results of a previous --json run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative deviation from the baseline")
+    args = parser.parse_args(argv)
+
+    if not sys.platform.startswith("linux"):
+        parser.error("pty loopback requires Linux")
+
+    results = []
+    for name in args.scenario or SCENARIOS:
+        source = ReplaySource(args.record, rate=args.rate, burst_s=args.burst, idle_s=args.idle, noise=args.noise, seed=args.seed)
+        results.append(run_scenario(name, source, args.duration, drain_s=args.drain, wait_time=args.wait_time))
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare_to_baseline(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
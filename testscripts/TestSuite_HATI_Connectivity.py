@@ -1,6 +1,7 @@
 """Test Suite for HATI Cell ID Geolocation Feature."""
 
 from NSTAX.testscripts.test_script import TestScript
+from NSTAX.logger.message_index import MessageIndex
 
 from time import sleep
 from datetime import datetime, timezone, timedelta
@@ -77,10 +78,11 @@ class HATI_Connectivity_Utils():
         """Checks if a activation messages are present in a list of messages
 
         :param messages: list of messages
-        :type messages: list
+        :type messages: list or MessageIndex
         :return: True (if activation msg is present)/False (if not present) + activation Message/None
         :rtype: bool, dict
         """
+        messages = MessageIndex.of(messages)
         boot_true, boot_msg = self._check_boot_message(messages)
         keepalive_true, keepalive_msg = self._check_keepalive_message(messages)
         if keepalive_true:
@@ -93,10 +95,11 @@ class HATI_Connectivity_Utils():
         """Checks if a location messages are present in a list of messages
 
         :param messages: list of messages
-        :type messages: list
+        :type messages: list or MessageIndex
         :return: True (if location msg is present)/False (if not present) + location Message/None
         :rtype: bool, dict
         """
+        messages = MessageIndex.of(messages)
         start_true, start_msg = self._check_start_message(messages)
         stop_true, stop_msg = self._check_stop_message(messages)
         keepalive_true, keepalive_msg = self._check_keepalive_message(messages)
@@ -110,77 +113,56 @@ class HATI_Connectivity_Utils():
         """Checks if a periodic messages are present in a list of messages
 
         :param messages: list of messages
-        :type messages: list
+        :type messages: list or MessageIndex
         :return: True (if periodic msg is present)/False (if not present) + periodic Message/None
         :rtype: bool, dict
         """
-        for msg in messages:
-            message_type = msg["decodedMsg"]["messageType"]
-            if message_type == "KEEP_ALIVE_EVENT":
-                event_type = msg["decodedMsg"]["event"]
-                if event_type == "PERIODIC":
-                    return True, msg
-        return False, None
+        msg = MessageIndex.of(messages).first("KEEP_ALIVE_EVENT", lambda msg: msg["decodedMsg"]["event"] == "PERIODIC")
+        return msg is not None, msg
 
     def _check_boot_message(self, messages):
         """Checks if a boot message is present in a list of messages
 
         :param messages: list of messages
-        :type messages: list
+        :type messages: list or MessageIndex
         :return: True (if boot msg is present)/False (if not present) + boot Message/None
         :rtype: bool, dict
         """
-        for msg in messages:
-            message_type = msg["decodedMsg"]["messageType"]
-            if message_type == "BOOT_EVENT":
-                return True, msg
-        return False, None
+        msg = MessageIndex.of(messages).first("BOOT_EVENT")
+        return msg is not None, msg
 
     def _check_keepalive_message(self, messages):
         """Checks if a keepalive message is present in a list of messages
 
         :param messages: list of messages
-        :type messages: list
+        :type messages: list or MessageIndex
         :return: True (if keepalive msg is present)/False (if not present) + keepalive Message/None
         :rtype: bool, dict
         """
-        for msg in messages:
-            message_type = msg["decodedMsg"]["messageType"]
-            if message_type == "KEEP_ALIVE_EVENT":
-                return True, msg
-        return False, None
+        msg = MessageIndex.of(messages).first("KEEP_ALIVE_EVENT")
+        return msg is not None, msg
 
     def _check_start_message(self, messages):
         """Checks if a stop message is present in a list of messages
 
         :param messages: list of messages
-        :type messages: list
+        :type messages: list or MessageIndex
         :return: True (if keepalive msg is present)/False (if not present) + keepalive Message/None
         :rtype: bool, dict
         """
-        for msg in messages:
-            message_type = msg["decodedMsg"]["messageType"]
-            if message_type == "LOCATION_UPDATE":
-                location_state = msg["decodedMsg"]["state"]
-                if location_state == "START":
-                    return True, msg
-        return False, None
+        msg = MessageIndex.of(messages).first("LOCATION_UPDATE", lambda msg: msg["decodedMsg"]["state"] == "START")
+        return msg is not None, msg
 
     def _check_stop_message(self, messages):
         """Checks if a stop message is present in a list of messages
 
         :param messages: list of messages
-        :type messages: list
+        :type messages: list or MessageIndex
         :return: True (if keepalive msg is present)/False (if not present) + keepalive Message/None
         :rtype: bool, dict
         """
-        for msg in messages:
-            message_type = msg["decodedMsg"]["messageType"]
-            if message_type == "LOCATION_UPDATE":
-                location_state = msg["decodedMsg"]["state"]
-                if location_state == "STOP":
-                    return True, msg
-        return False, None
+        msg = MessageIndex.of(messages).first("LOCATION_UPDATE", lambda msg: msg["decodedMsg"]["state"] == "STOP")
+        return msg is not None, msg
 
     def _check_ecl_level(self, message, set_ecl_level):
         """Checks if the ecl level assigned to the network message is correct
@@ -253,21 +235,23 @@ class HATI_Connectivity_Utils():
             return True, timestamps
         return False, timestamps
     
-    def _check_location_timestamps(self, start_message, stop_message, timestamp_wait_buffer):
+    def _check_location_timestamps(self, start_message, stop_message, timestamp_wait_buffer, reference_time=None):
         """
         Checks if the timestamps of the start and stop location messages are valid.
 
         Validates that:
             - Both timestamps are in the past compared to the current UTC time.
             - The start timestamp is less than or equal to the stop timestamp.
-            - Both timestamps are at least `timestamp_wait_buffer` minutes in the past.
+            - Both timestamps are at least `timestamp_wait_buffer` minutes before `reference_time`.
 
         :param start_message: The message containing the start timestamp.
         :type start_message: dict
         :param stop_message: The message containing the stop timestamp.
         :type stop_message: dict
-        :param timestamp_wait_buffer: Minimum number of minutes the timestamps should be in the past.
+        :param timestamp_wait_buffer: Minimum number of minutes the timestamps should be before reference_time.
         :type timestamp_wait_buffer: int
+        :param reference_time: Time the wait buffer is counted back from, defaults to the current UTC time
+        :type reference_time: datetime, optional
         :return: Tuple of (True, timestamps) if valid, otherwise (False, timestamps).
         :rtype: tuple(bool, dict)
         """
@@ -280,6 +264,8 @@ class HATI_Connectivity_Utils():
         # Get current UTC time in the same format
         now_dt = datetime.now(timezone.utc)
         now_str = now_dt.strftime("%Y-%m-%dT%H:%M:%S%z")
+        if reference_time is None:
+            reference_time = now_dt
 
         # Example comparison: check if stop_dt is before now
         timestamps = {
@@ -291,8 +277,8 @@ class HATI_Connectivity_Utils():
         min_delta = timestamp_wait_buffer * 60  # 10 minutes in seconds
         if (
             start_dt <= stop_dt <= now_dt and
-            (now_dt - start_dt).total_seconds() >= min_delta and
-            (now_dt - stop_dt).total_seconds() >= min_delta
+            (reference_time - start_dt).total_seconds() >= min_delta and
+            (reference_time - stop_dt).total_seconds() >= min_delta
         ):
             return True, timestamps
         return False, timestamps
@@ -574,10 +560,10 @@ class HATI_Connectivity_Activation_Base(TestScript):
 
         # --- Step 3: Check Activation Message --- #
         self.step_start(step_no=3, step_description=f"Check Activation message on Station:{STATION_LABEL} after {WAIT_TIME+CIOT_TIMEOUT} minutes", expected_result=f"Activation messages received successfully in the backend")
-        sleep((WAIT_TIME+2)*60)
-        sleep(CIOT_TIMEOUT*60)
+        # Wait until the keep alive message completes the activation
+        self.DUT.wait_for_message(lambda message: utils._check_keepalive_message([message])[0], deadline=(WAIT_TIME+2+CIOT_TIMEOUT)*60, start_time_utc=start_time_utc)
         end_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
-        backend_messages_t = self.DUT.get_messages(start_time_utc=start_time_utc, end_time_utc=end_time_utc)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=start_time_utc, end_time_utc=end_time_utc))
         messages_received, boot_msg, activation_msg = utils._check_activation_messages(backend_messages_t)
         if messages_received:
             self.logger.info("Activation messages received successfully")
@@ -680,10 +666,10 @@ class HATI_Connectivity_Location_Base(TestScript):
 
         # --- Step 3: Check Location Message --- #
         self.step_start(step_no=3, step_description=f"Check Location message on Device after {WAIT_TIME+CIOT_TIMEOUT} minutes", expected_result=f"Location START and STOP messages received successfully in the backend")
-        sleep((WAIT_TIME+2)*60)
-        sleep(CIOT_TIMEOUT*60)
+        # Wait until the STOP message ends the location sequence
+        self.DUT.wait_for_message(lambda message: utils._check_stop_message([message])[0], deadline=(WAIT_TIME+2+CIOT_TIMEOUT)*60, start_time_utc=start_time_utc)
         end_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
-        backend_messages_t = self.DUT.get_messages(start_time_utc=start_time_utc, end_time_utc=end_time_utc)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=start_time_utc, end_time_utc=end_time_utc))
         messages_received, start_msg, stop_msg, keepalive_msg = utils._check_location_messages(backend_messages_t)
         if messages_received:
             self.logger.info("Location messages received successfully")
@@ -691,7 +677,9 @@ class HATI_Connectivity_Location_Base(TestScript):
 
             # --- Step 4: Check Location timestamps --- #
             self.step_start(step_no=4, step_description="Check Location timestamps", expected_result="Location timestamps are valid")
-            timestamps_valid, timestamps = utils._check_location_timestamps(start_msg, stop_msg, timestamp_wait_buffer=(CIOT_TIMEOUT/2))
+            # The wait ends on the STOP message, count the buffer back from the end of the full wait time instead
+            reference_time = datetime.strptime(start_time_utc, "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc) + timedelta(minutes=WAIT_TIME+2+CIOT_TIMEOUT)
+            timestamps_valid, timestamps = utils._check_location_timestamps(start_msg, stop_msg, timestamp_wait_buffer=(CIOT_TIMEOUT/2), reference_time=reference_time)
             if timestamps_valid:
                 self.logger.info(f"Location timestamps are valid: \nTest_Start_Time: {start_time_utc}\nStart_Msg: {timestamps['start']}\nStop_Msg: {timestamps['stop']}\nTest_End_time: {timestamps['now']}")
                 self.step_end(actual_result=f"Location timestamps are valid: <ul><li>Test_Start_Time: {start_time_utc}</li><li>Start_Msg: {timestamps['start']}</li><li>Stop_Msg: {timestamps['stop']}</li><li>Test_End_time: {timestamps['now']}</li></ul>", step_verdict="PASSED")
@@ -765,10 +753,9 @@ class HATI_Connectivity_Periodic_Base(TestScript):
         # --- Step 2: Check Periodic Message --- #
         self.step_start(step_no=2, step_description=f"Check Periodic message on Device after {WAIT_TIME+CIOT_TIMEOUT} minutes", expected_result=f"Periodic message received successfully in the backend")
         start_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
-        sleep((WAIT_TIME+2)*60)
-        sleep(CIOT_TIMEOUT*60)
+        self.DUT.wait_for_message(lambda message: utils._check_periodic_message([message])[0], deadline=(WAIT_TIME+2+CIOT_TIMEOUT)*60, start_time_utc=start_time_utc)
         end_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
-        backend_messages_t = self.DUT.get_messages(start_time_utc=start_time_utc, end_time_utc=end_time_utc)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=start_time_utc, end_time_utc=end_time_utc))
         messages_received, periodic_msg = utils._check_periodic_message(backend_messages_t)
         if messages_received:
             timestamps_valid, timestamps = utils._check_periodic_timestamps(periodic_msg)
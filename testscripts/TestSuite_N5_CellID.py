@@ -216,11 +216,9 @@ class N5_CellID_Cell_Attach(TestScript):
         start_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
         response = self.DUT.push_downlink_payload("b007814000000005","KA_5min")
         if response:
-            self.logger.info("Waiting for 10 mins to receive next WiFi message.")
-            sleep((10+2)*60)
-            end_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
-            backend_messages_t = self.DUT.get_frames(start_time_utc=start_time_utc, end_time_utc=end_time_utc)
-            message_received, wifi_msg = N5_CellID_Utils._check_wifi_message(backend_messages_t)
+            self.logger.info("Waiting up to 12 mins to receive next WiFi message.")
+            wifi_msg = self.DUT.wait_for_frame(lambda frame: N5_CellID_Utils._check_wifi_message([frame])[0], deadline=(10+2)*60, start_time_utc=start_time_utc)
+            message_received = wifi_msg is not None
             
             if message_received:
                 # Step 1: Retrieve cell number and set 2 cells to inactive state
@@ -343,11 +341,9 @@ class N5_CellID_Cell_Attach_TRUMI(TestScript):
         shaker.start_shaking(SHAKE_SPEED)
         sleep((SHAKE_TIME)*60)
         shaker.stop()
-        self.logger.info(f"Waiting for {WAIT_TIME} min to receive TRUMI-STOP message")
-        sleep((WAIT_TIME+2)*60)
-        end_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
-        backend_messages_t = self.DUT.get_frames(start_time_utc=start_time_utc, end_time_utc=end_time_utc)
-        message_received, wifi_msg = N5_CellID_Utils._check_trumi_message(backend_messages_t)
+        self.logger.info(f"Waiting up to {WAIT_TIME+2} min to receive TRUMI-STOP message")
+        wifi_msg = self.DUT.wait_for_frame(lambda frame: N5_CellID_Utils._check_trumi_message([frame])[0], deadline=(WAIT_TIME+2)*60, start_time_utc=start_time_utc)
+        message_received = wifi_msg is not None
         if message_received:
             actual_result = f"Received location message successfully."
             step_verdict = self.result_classifier.PASSED
@@ -417,11 +413,9 @@ class N5_CellID_Low_Service(TestScript):
         start_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
         response = self.DUT.push_downlink_payload("b007814000000005","KA_5min")
         if response:
-            self.logger.info("Waiting for 10 mins to receive next WiFi message.")
-            sleep((10+2)*60)
-            end_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
-            backend_messages_t = self.DUT.get_frames(start_time_utc=start_time_utc, end_time_utc=end_time_utc)
-            message_received, wifi_msg = N5_CellID_Utils._check_wifi_message(backend_messages_t)
+            self.logger.info("Waiting up to 12 mins to receive next WiFi message.")
+            wifi_msg = self.DUT.wait_for_frame(lambda frame: N5_CellID_Utils._check_wifi_message([frame])[0], deadline=(10+2)*60, start_time_utc=start_time_utc)
+            message_received = wifi_msg is not None
             
             if message_received:
                 n = 0
@@ -522,11 +516,9 @@ class N5_CellID_Reconnection_Cell_Switch(TestScript):
         start_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
         response = self.DUT.push_downlink_payload("b007814000000005","KA_5min")
         if response:
-            self.logger.info("Waiting for 10 mins to receive next WiFi message.")
-            sleep((10+2)*60)
-            end_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
-            backend_messages_t = self.DUT.get_frames(start_time_utc=start_time_utc, end_time_utc=end_time_utc)
-            message_received, wifi_msg = N5_CellID_Utils._check_wifi_message(backend_messages_t)
+            self.logger.info("Waiting up to 12 mins to receive next WiFi message.")
+            wifi_msg = self.DUT.wait_for_frame(lambda frame: N5_CellID_Utils._check_wifi_message([frame])[0], deadline=(10+2)*60, start_time_utc=start_time_utc)
+            message_received = wifi_msg is not None
             
             if message_received:
                 # Step 1: Retrieve cell number and set 2 cells to inactive state
@@ -545,6 +537,7 @@ class N5_CellID_Reconnection_Cell_Switch(TestScript):
                 step_description = "Wait for specified time and get latest messages from backend"
                 expected_result = "Received location message successfully."
                 self.logger.info("Step %d: %s",2,step_description)
+                cell1_id_num = None
                 start_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
                 sleep((WAIT_TIME+1)*60)
                 end_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
@@ -595,10 +588,15 @@ class N5_CellID_Reconnection_Cell_Switch(TestScript):
                 expected_result = "Received location message successfully."
                 self.logger.info("Step %d: %s",5,step_description)
                 start_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
-                sleep((WAIT_TIME+1)*60)
-                end_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
-                backend_messages_t = self.DUT.get_frames(start_time_utc=start_time_utc, end_time_utc=end_time_utc)
-                message_received, wifi_msg = N5_CellID_Utils._check_wifi_message(backend_messages_t)
+                # Wait for a frame from another cell than Cell 1, the DUT may still send from Cell 1 before it re-registers
+                valid_locs = callbox.get_valid_cell_id_locations()
+                wifi_msg = self.DUT.wait_for_frame(lambda frame: N5_CellID_Utils._check_wifi_message([frame])[0] and N5_CellID_Utils._check_cell_id(frame, valid_locs)[1] != cell1_id_num, deadline=(WAIT_TIME+1)*60, start_time_utc=start_time_utc)
+                message_received = wifi_msg is not None
+                if not message_received:
+                    # No switch, evaluate the newest frame of the window
+                    end_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+                    backend_messages_t = self.DUT.get_frames(start_time_utc=start_time_utc, end_time_utc=end_time_utc)
+                    message_received, wifi_msg = N5_CellID_Utils._check_wifi_message(backend_messages_t)
                 if message_received:
                     actual_result = f"Received location message successfully."
                     step_verdict = self.result_classifier.PASSED
@@ -692,11 +690,9 @@ class N5_CellID_Cell_Attach_Custom(TestScript):
         start_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
         response = self.DUT.push_downlink_payload("b007814000000005","KA_5min")
         if response:
-            self.logger.info("Waiting for 10 mins to receive next WiFi message.")
-            sleep((10+2)*60)
-            end_time_utc = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
-            backend_messages_t = self.DUT.get_frames(start_time_utc=start_time_utc, end_time_utc=end_time_utc)
-            message_received, wifi_msg = N5_CellID_Utils._check_wifi_message(backend_messages_t)
+            self.logger.info("Waiting up to 12 mins to receive next WiFi message.")
+            wifi_msg = self.DUT.wait_for_frame(lambda frame: N5_CellID_Utils._check_wifi_message([frame])[0], deadline=(10+2)*60, start_time_utc=start_time_utc)
+            message_received = wifi_msg is not None
             
             if message_received:
                 # Step 1: Retrieve cell number and set 2 cells to inactive state
@@ -5,6 +5,11 @@ import time
 import datetime
 
 from NSTAX.testscripts.test_script import TestScript
+from NSTAX.logger.message_index import MessageIndex
+
+
+ORIENTATION_REPORT_TIMEOUT_S = 300
+ORIENTATION_SETTLE_S = 150          # Wait after the expected report, one reporting interval (2 min) and a margin
 
 
 class OrientationDetectionBaseScript(TestScript):
@@ -27,13 +32,31 @@ class OrientationDetectionBaseScript(TestScript):
             current_orientation = None
         return current_orientation
 
-    def _if_orientation_status_message(self, payload):
-        """Check if the current message returns orientation status"""
+    def _get_function(self, payload):
+        """Get the function reported by the current message"""
         try:
-            is_od_status = payload["decodedMsg"]["payload"]["functionHeader"]["function"] == "ORIENTATION_DETECTION"
+            function = payload["decodedMsg"]["payload"]["functionHeader"]["function"]
         except KeyError as e_:
-            is_od_status = False
-        return is_od_status
+            function = None
+        return function
+
+    def _if_orientation_status_message(self, payload):
+        """Check if the current message returns orientation status"""
+        return self._get_function(payload) == "ORIENTATION_DETECTION"
+
+    def _wait_for_orientation(self, start_time_utc, orientation, timeout_s=ORIENTATION_REPORT_TIMEOUT_S, settle_s=ORIENTATION_SETTLE_S):
+        """Wait until an orientation status message with the given state arrives, at most timeout_s.
+
+        The state is then given settle_s (still within timeout_s) to report
+        again, so the newest report in the window shows a device flipping back.
+        """
+        wait_start = time.monotonic()
+        message = self.DUT.wait_for_message(
+            lambda message: self._if_orientation_status_message(message) and self._get_orientation(message) == orientation,
+            deadline=timeout_s, start_time_utc=start_time_utc)
+        if message is not None:
+            time.sleep(max(0, min(settle_s, timeout_s - (time.monotonic() - wait_start))))
+        return message
 
     def _get_current_ts_utc(self):
         current_timestamp_utc = datetime.datetime.strftime(datetime.datetime.utcnow(), "%Y-%m-%dT%H:%M:%S")
@@ -62,8 +85,8 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnfolded(OrientationDetectionBaseScript
         t1 = self._get_current_ts_utc()
         self.logger.info("Step 1: %s", step_description)
         self.EQUIPMENT.set_position_raw((500, 500, 500, 275, 500, 500))     # 35 degrees
-        # Wait 5 minutes
-        time.sleep(300)
+        # Wait up to 5 minutes for the USED report
+        self._wait_for_orientation(t1, "USED")
         self.save_step(1, step_description, expected_result, actual_result, self.result_classifier.PASSED)
 
         # Step 2: Read Status Messages. State: USED
@@ -73,15 +96,9 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnfolded(OrientationDetectionBaseScript
         self.logger.info("Step 2: %s", step_description)
         t2 = self._get_current_ts_utc()
         # GET backend messages
-        backend_messages_t = self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50)
-        backend_messages = []
-        for message_ in backend_messages_t:
-            # Catch only orientation detection status specific messages
-            if self._if_orientation_status_message(message_):
-                backend_messages.append(message_)
-            else:
-                continue
-            backend_messages.append(message_)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50), type_of=self._get_function)
+        # Catch only orientation detection status specific messages
+        backend_messages = backend_messages_t.of_type("ORIENTATION_DETECTION")
         if len(backend_messages) < 1:
             actual_result = "No Orientation Detection Status message received"
             self.save_step(2, step_description, expected_result, actual_result, self.result_classifier.FAILED)
@@ -101,8 +118,8 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnfolded(OrientationDetectionBaseScript
         t1 = self._get_current_ts_utc()
         self.logger.info("Step 3: %s", step_description)
         self.EQUIPMENT.set_position_raw((500, 500, 500, 35, 500, 500))     # 340 degrees
-        # Wait 5 minutes
-        time.sleep(300)
+        # Wait up to 5 minutes for the UNKNOWN report
+        self._wait_for_orientation(t1, "UNKNOWN")
         self.save_step(3, step_description, expected_result, actual_result, self.result_classifier.PASSED)
 
         # Step 4: Read Status Messages. State: UNKNOWN
@@ -112,15 +129,9 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnfolded(OrientationDetectionBaseScript
         self.logger.info("Step 4: %s", step_description)
         t2 = self._get_current_ts_utc()
         # GET backend messages
-        backend_messages_t = self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50)
-        backend_messages = []
-        for message_ in backend_messages_t:
-            # Catch only orientation detection status specific messages
-            if self._if_orientation_status_message(message_):
-                backend_messages.append(message_)
-            else:
-                continue
-            backend_messages.append(message_)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50), type_of=self._get_function)
+        # Catch only orientation detection status specific messages
+        backend_messages = backend_messages_t.of_type("ORIENTATION_DETECTION")
         if len(backend_messages) < 1:
             actual_result = "No Orientation Detection Status message received"
             self.save_step(4, step_description, expected_result, actual_result, self.result_classifier.FAILED)
@@ -140,8 +151,8 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnfolded(OrientationDetectionBaseScript
         t1 = self._get_current_ts_utc()
         self.logger.info("Step 5: %s", step_description)
         self.EQUIPMENT.set_position_raw((500, 500, 500, 135, 500, 500))     # 0 degrees
-        # Wait 5 minutes
-        time.sleep(300)
+        # Wait up to 5 minutes for the USED report
+        self._wait_for_orientation(t1, "USED")
         self.save_step(5, step_description, expected_result, actual_result, self.result_classifier.PASSED)
 
         # Step 6: Read Status Messages. State: USED
@@ -151,15 +162,9 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnfolded(OrientationDetectionBaseScript
         self.logger.info("Step 6: %s", step_description)
         t2 = self._get_current_ts_utc()
         # GET backend messages
-        backend_messages_t = self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50)
-        backend_messages = []
-        for message_ in backend_messages_t:
-            # Catch only orientation detection status specific messages
-            if self._if_orientation_status_message(message_):
-                backend_messages.append(message_)
-            else:
-                continue
-            backend_messages.append(message_)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50), type_of=self._get_function)
+        # Catch only orientation detection status specific messages
+        backend_messages = backend_messages_t.of_type("ORIENTATION_DETECTION")
         if len(backend_messages) < 1:
             actual_result = "No Orientation Detection Status message received"
             self.save_step(6, step_description, expected_result, actual_result, self.result_classifier.FAILED)
@@ -190,15 +195,9 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnfolded(OrientationDetectionBaseScript
         self.logger.info("Step 8: %s", step_description)
         t2 = self._get_current_ts_utc()
         # GET backend messages
-        backend_messages_t = self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50)
-        backend_messages = []
-        for message_ in backend_messages_t:
-            # Catch only orientation detection status specific messages
-            if self._if_orientation_status_message(message_):
-                backend_messages.append(message_)
-            else:
-                continue
-            backend_messages.append(message_)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50), type_of=self._get_function)
+        # Catch only orientation detection status specific messages
+        backend_messages = backend_messages_t.of_type("ORIENTATION_DETECTION")
         if len(backend_messages) != 0:
             actual_result = "Orientation Detection Status message received"
             self.save_step(8, step_description, expected_result, actual_result, self.result_classifier.FAILED)
@@ -214,8 +213,8 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnfolded(OrientationDetectionBaseScript
         t1 = self._get_current_ts_utc()
         self.logger.info("Step 9: %s", step_description)
         self.EQUIPMENT.set_position_raw((500, 500, 500, 360, 500, 500))     # 55 degrees
-        # Wait 5 minutes
-        time.sleep(300)
+        # Wait up to 5 minutes for the UNUSED report
+        self._wait_for_orientation(t1, "UNUSED")
         self.save_step(9, step_description, expected_result, actual_result, self.result_classifier.PASSED)
 
         # Step 10: Read Status Messages. State: UNUSED
@@ -225,15 +224,9 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnfolded(OrientationDetectionBaseScript
         self.logger.info("Step 10: %s", step_description)
         t2 = self._get_current_ts_utc()
         # GET backend messages
-        backend_messages_t = self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50)
-        backend_messages = []
-        for message_ in backend_messages_t:
-            # Catch only orientation detection status specific messages
-            if self._if_orientation_status_message(message_):
-                backend_messages.append(message_)
-            else:
-                continue
-            backend_messages.append(message_)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50), type_of=self._get_function)
+        # Catch only orientation detection status specific messages
+        backend_messages = backend_messages_t.of_type("ORIENTATION_DETECTION")
         if len(backend_messages) < 1:
             actual_result = "No Orientation Detection Status message received"
             self.save_step(10, step_description, expected_result, actual_result, self.result_classifier.FAILED)
@@ -270,8 +263,8 @@ class AOD_ROSA_PF_RotationAngleThresholdsFolded(OrientationDetectionBaseScript):
         t1 = self._get_current_ts_utc()
         self.logger.info("Step 1: %s", step_description)
         self.EQUIPMENT.set_position_raw((500, 500, 500, 360, 500, 500))     # 55 degrees
-        # Wait 5 minutes
-        time.sleep(300)
+        # Wait up to 5 minutes for the UNUSED report
+        self._wait_for_orientation(t1, "UNUSED")
         self.save_step(1, step_description, expected_result, actual_result, self.result_classifier.PASSED)
 
         # Step 2: Read Status Messages. State: UNUSED or Blank
@@ -281,15 +274,9 @@ class AOD_ROSA_PF_RotationAngleThresholdsFolded(OrientationDetectionBaseScript):
         self.logger.info("Step 2: %s", step_description)
         t2 = self._get_current_ts_utc()
         # GET backend messages
-        backend_messages_t = self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50)
-        backend_messages = []
-        for message_ in backend_messages_t:
-            # Catch only orientation detection status specific messages
-            if self._if_orientation_status_message(message_):
-                backend_messages.append(message_)
-            else:
-                continue
-            backend_messages.append(message_)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50), type_of=self._get_function)
+        # Catch only orientation detection status specific messages
+        backend_messages = backend_messages_t.of_type("ORIENTATION_DETECTION")
         if len(backend_messages) < 1:
             current_orientation = None
             actual_result = "No Status message received"
@@ -308,8 +295,8 @@ class AOD_ROSA_PF_RotationAngleThresholdsFolded(OrientationDetectionBaseScript):
         t1 = self._get_current_ts_utc()
         self.logger.info("Step 3: %s", step_description)
         self.EQUIPMENT.set_position_raw((500, 500, 500, 275, 500, 500))     # 35 degrees
-        # Wait 5 minutes
-        time.sleep(300)
+        # Wait up to 5 minutes for the USED report
+        self._wait_for_orientation(t1, "USED")
         self.save_step(3, step_description, expected_result, actual_result, self.result_classifier.PASSED)
 
         # Step 4: Read Status Messages. State: USED
@@ -319,15 +306,9 @@ class AOD_ROSA_PF_RotationAngleThresholdsFolded(OrientationDetectionBaseScript):
         self.logger.info("Step 4: %s", step_description)
         t2 = self._get_current_ts_utc()
         # GET backend messages
-        backend_messages_t = self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50)
-        backend_messages = []
-        for message_ in backend_messages_t:
-            # Catch only orientation detection status specific messages
-            if self._if_orientation_status_message(message_):
-                backend_messages.append(message_)
-            else:
-                continue
-            backend_messages.append(message_)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50), type_of=self._get_function)
+        # Catch only orientation detection status specific messages
+        backend_messages = backend_messages_t.of_type("ORIENTATION_DETECTION")
         if len(backend_messages) < 1:
             actual_result = "No Orientation Detection Status message received"
             self.save_step(4, step_description, expected_result, actual_result, self.result_classifier.FAILED)
@@ -347,8 +328,8 @@ class AOD_ROSA_PF_RotationAngleThresholdsFolded(OrientationDetectionBaseScript):
         t1 = self._get_current_ts_utc()
         self.logger.info("Step 5: %s", step_description)
         self.EQUIPMENT.set_position_raw((500, 500, 500, 360, 500, 500))     # 55 degrees
-        # Wait 5 minutes
-        time.sleep(300)
+        # Wait up to 5 minutes for the UNUSED report
+        self._wait_for_orientation(t1, "UNUSED")
         self.save_step(5, step_description, expected_result, actual_result, self.result_classifier.PASSED)
 
         # Step 6: Read Status Messages. State: UNUSED
@@ -358,15 +339,9 @@ class AOD_ROSA_PF_RotationAngleThresholdsFolded(OrientationDetectionBaseScript):
         self.logger.info("Step 6: %s", step_description)
         t2 = self._get_current_ts_utc()
         # GET backend messages
-        backend_messages_t = self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50)
-        backend_messages = []
-        for message_ in backend_messages_t:
-            # Catch only orientation detection status specific messages
-            if self._if_orientation_status_message(message_):
-                backend_messages.append(message_)
-            else:
-                continue
-            backend_messages.append(message_)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50), type_of=self._get_function)
+        # Catch only orientation detection status specific messages
+        backend_messages = backend_messages_t.of_type("ORIENTATION_DETECTION")
         if len(backend_messages) < 1:
             actual_result = "No Orientation Detection Status message received"
             self.save_step(6, step_description, expected_result, actual_result, self.result_classifier.FAILED)
@@ -397,15 +372,9 @@ class AOD_ROSA_PF_RotationAngleThresholdsFolded(OrientationDetectionBaseScript):
         self.logger.info("Step 8: %s", step_description)
         t2 = self._get_current_ts_utc()
         # GET backend messages
-        backend_messages_t = self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50)
-        backend_messages = []
-        for message_ in backend_messages_t:
-            # Catch only orientation detection status specific messages
-            if self._if_orientation_status_message(message_):
-                backend_messages.append(message_)
-            else:
-                continue
-            backend_messages.append(message_)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50), type_of=self._get_function)
+        # Catch only orientation detection status specific messages
+        backend_messages = backend_messages_t.of_type("ORIENTATION_DETECTION")
         if len(backend_messages) != 0:
             actual_result = "Orientation Detection Status message received"
             self.save_step(8, step_description, expected_result, actual_result, self.result_classifier.FAILED)
@@ -421,8 +390,8 @@ class AOD_ROSA_PF_RotationAngleThresholdsFolded(OrientationDetectionBaseScript):
         t1 = self._get_current_ts_utc()
         self.logger.info("Step 9: %s", step_description)
         self.EQUIPMENT.set_position_raw((500, 500, 500, 580, 500, 500))     # 110 degrees
-        # Wait 5 minutes
-        time.sleep(300)
+        # Wait up to 5 minutes for the UNKNOWN report
+        self._wait_for_orientation(t1, "UNKNOWN")
         self.save_step(9, step_description, expected_result, actual_result, self.result_classifier.PASSED)
 
         # Step 10: Read Status Messages. State: UNKNOWN
@@ -432,15 +401,9 @@ class AOD_ROSA_PF_RotationAngleThresholdsFolded(OrientationDetectionBaseScript):
         self.logger.info("Step 10: %s", step_description)
         t2 = self._get_current_ts_utc()
         # GET backend messages
-        backend_messages_t = self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50)
-        backend_messages = []
-        for message_ in backend_messages_t:
-            # Catch only orientation detection status specific messages
-            if self._if_orientation_status_message(message_):
-                backend_messages.append(message_)
-            else:
-                continue
-            backend_messages.append(message_)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50), type_of=self._get_function)
+        # Catch only orientation detection status specific messages
+        backend_messages = backend_messages_t.of_type("ORIENTATION_DETECTION")
         if len(backend_messages) < 1:
             actual_result = "No Orientation Detection Status message received"
             self.save_step(10, step_description, expected_result, actual_result, self.result_classifier.FAILED)
@@ -477,8 +440,8 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnknown(OrientationDetectionBaseScript)
         t1 = self._get_current_ts_utc()
         self.logger.info("Step 1: %s", step_description)
         self.EQUIPMENT.set_position_raw((500, 500, 500, 860, 500, 500))     # 180 degrees
-        # Wait 5 minutes
-        time.sleep(300)
+        # Wait up to 5 minutes for the UNKNOWN report
+        self._wait_for_orientation(t1, "UNKNOWN")
         self.save_step(1, step_description, expected_result, actual_result, self.result_classifier.PASSED)
 
         # Step 2: Read Status Messages. State: UNKNOWN
@@ -488,15 +451,9 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnknown(OrientationDetectionBaseScript)
         self.logger.info("Step 2: %s", step_description)
         t2 = self._get_current_ts_utc()
         # GET backend messages
-        backend_messages_t = self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50)
-        backend_messages = []
-        for message_ in backend_messages_t:
-            # Catch only orientation detection status specific messages
-            if self._if_orientation_status_message(message_):
-                backend_messages.append(message_)
-            else:
-                continue
-            backend_messages.append(message_)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50), type_of=self._get_function)
+        # Catch only orientation detection status specific messages
+        backend_messages = backend_messages_t.of_type("ORIENTATION_DETECTION")
         if len(backend_messages) < 1:
             actual_result = "No Orientation Detection Status message received"
             self.save_step(2, step_description, expected_result, actual_result, self.result_classifier.FAILED)
@@ -516,8 +473,8 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnknown(OrientationDetectionBaseScript)
         t1 = self._get_current_ts_utc()
         self.logger.info("Step 3: %s", step_description)
         self.EQUIPMENT.set_position_raw((500, 500, 500, 500, 500, 500))     # 90 degrees
-        # Wait 5 minutes
-        time.sleep(300)
+        # Wait up to 5 minutes for the UNUSED report
+        self._wait_for_orientation(t1, "UNUSED")
         self.save_step(3, step_description, expected_result, actual_result, self.result_classifier.PASSED)
 
         # Step 4: Read Status Messages. State: UNUSED
@@ -527,15 +484,9 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnknown(OrientationDetectionBaseScript)
         self.logger.info("Step 4: %s", step_description)
         t2 = self._get_current_ts_utc()
         # GET backend messages
-        backend_messages_t = self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50)
-        backend_messages = []
-        for message_ in backend_messages_t:
-            # Catch only orientation detection status specific messages
-            if self._if_orientation_status_message(message_):
-                backend_messages.append(message_)
-            else:
-                continue
-            backend_messages.append(message_)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50), type_of=self._get_function)
+        # Catch only orientation detection status specific messages
+        backend_messages = backend_messages_t.of_type("ORIENTATION_DETECTION")
         if len(backend_messages) < 1:
             actual_result = "No Orientation Detection Status message received"
             self.save_step(4, step_description, expected_result, actual_result, self.result_classifier.FAILED)
@@ -555,8 +506,8 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnknown(OrientationDetectionBaseScript)
         t1 = self._get_current_ts_utc()
         self.logger.info("Step 5: %s", step_description)
         self.EQUIPMENT.set_position_raw((500, 500, 500, 580, 500, 500))     # 110 degrees
-        # Wait 5 minutes
-        time.sleep(300)
+        # Wait up to 5 minutes for the UNKNOWN report
+        self._wait_for_orientation(t1, "UNKNOWN")
         self.save_step(5, step_description, expected_result, actual_result, self.result_classifier.PASSED)
 
         # Step 6: Read Status Messages. State: UNKNOWN
@@ -566,15 +517,9 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnknown(OrientationDetectionBaseScript)
         self.logger.info("Step 6: %s", step_description)
         t2 = self._get_current_ts_utc()
         # GET backend messages
-        backend_messages_t = self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50)
-        backend_messages = []
-        for message_ in backend_messages_t:
-            # Catch only orientation detection status specific messages
-            if self._if_orientation_status_message(message_):
-                backend_messages.append(message_)
-            else:
-                continue
-            backend_messages.append(message_)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50), type_of=self._get_function)
+        # Catch only orientation detection status specific messages
+        backend_messages = backend_messages_t.of_type("ORIENTATION_DETECTION")
         if len(backend_messages) < 1:
             actual_result = "No Orientation Detection Status message received"
             self.save_step(6, step_description, expected_result, actual_result, self.result_classifier.FAILED)
@@ -594,8 +539,8 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnknown(OrientationDetectionBaseScript)
         t1 = self._get_current_ts_utc()
         self.logger.info("Step 7: %s", step_description)
         self.EQUIPMENT.set_position_raw((500, 500, 500, 35, 500, 500))     # 340 degrees
-        # Wait 5 minutes
-        time.sleep(300)
+        # Wait up to 5 minutes for the UNKNOWN report
+        self._wait_for_orientation(t1, "UNKNOWN")
         self.save_step(7, step_description, expected_result, actual_result, self.result_classifier.PASSED)
 
         # Step 8: Read Status Messages. State: UNKNOWN
@@ -605,15 +550,9 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnknown(OrientationDetectionBaseScript)
         self.logger.info("Step 8: %s", step_description)
         t2 = self._get_current_ts_utc()
         # GET backend messages
-        backend_messages_t = self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50)
-        backend_messages = []
-        for message_ in backend_messages_t:
-            # Catch only orientation detection status specific messages
-            if self._if_orientation_status_message(message_):
-                backend_messages.append(message_)
-            else:
-                continue
-            backend_messages.append(message_)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50), type_of=self._get_function)
+        # Catch only orientation detection status specific messages
+        backend_messages = backend_messages_t.of_type("ORIENTATION_DETECTION")
         if len(backend_messages) < 1:
             actual_result = "No Orientation Detection Status message received"
             self.save_step(8, step_description, expected_result, actual_result, self.result_classifier.FAILED)
@@ -633,8 +572,8 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnknown(OrientationDetectionBaseScript)
         t1 = self._get_current_ts_utc()
         self.logger.info("Step 9: %s", step_description)
         self.EQUIPMENT.set_position_raw((500, 500, 500, 135, 500, 500))     # 0 degrees
-        # Wait 5 minutes
-        time.sleep(300)
+        # Wait up to 5 minutes for the USED report
+        self._wait_for_orientation(t1, "USED")
         self.save_step(9, step_description, expected_result, actual_result, self.result_classifier.PASSED)
 
         # Step 10: Read Status Messages. State: USED
@@ -644,15 +583,9 @@ class AOD_ROSA_PF_RotationAngleThresholdsUnknown(OrientationDetectionBaseScript)
         self.logger.info("Step 10: %s", step_description)
         t2 = self._get_current_ts_utc()
         # GET backend messages
-        backend_messages_t = self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50)
-        backend_messages = []
-        for message_ in backend_messages_t:
-            # Catch only orientation detection status specific messages
-            if self._if_orientation_status_message(message_):
-                backend_messages.append(message_)
-            else:
-                continue
-            backend_messages.append(message_)
+        backend_messages_t = MessageIndex(self.DUT.get_messages(start_time_utc=t1, end_time_utc = t2, max_n_messages=50), type_of=self._get_function)
+        # Catch only orientation detection status specific messages
+        backend_messages = backend_messages_t.of_type("ORIENTATION_DETECTION")
         if len(backend_messages) < 1:
             actual_result = "No Orientation Detection Status message received"
             self.save_step(10, step_description, expected_result, actual_result, self.result_classifier.FAILED)
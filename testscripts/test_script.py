@@ -9,6 +9,8 @@ Contents of this modules are not for instantiation.
 
 import logging
 
+from NSTAX.logger.event_journal import emit_event, STEP_START, STEP_END
+
 
 class ResultClassifier:
     """Test result classifier."""
@@ -114,6 +116,8 @@ class TestScript:
         self.result_step[step_index]["actual_result"] = actual_result
         self.result_step[step_index]["verdict"] = verdict
         self.logger.info("Step %s: Expected: %s, Actual: %s, Verdict: %s", step_index, expected_result, actual_result, verdict)
+        emit_event(STEP_END, test=self.name, step=step_index, description=step_description,
+                   actual_result=actual_result, verdict=self.result_classifier.get_result_string(verdict))
 
     def step_start(self, step_no, step_description, expected_result):
         """Log the start of a test step."""
@@ -123,15 +127,7 @@ class TestScript:
             "expected_result": expected_result
         }
         self.logger.info("Step %d: %s", step_no, step_description)
-
-    def step_start(self, step_no, step_description, expected_result):
-        """Log the start of a test step."""
-        self.current_step = {
-            "step_no": step_no,
-            "step_description": step_description,
-            "expected_result": expected_result
-        }
-        self.logger.info("Step %d: %s", step_no, step_description)
+        emit_event(STEP_START, test=self.name, step=step_no, description=step_description)
         
     def step_end(self, actual_result, step_verdict):
         """Log the end of a test step and save the results."""
@@ -2,17 +2,55 @@ import csv
 import numpy as np
 import pandas as pd
 from io import StringIO
-from datetime import datetime
+from datetime import datetime, timezone
 import os
 import csv
 import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+
+from NSTAX.logger.log_conversion import convert_log, iter_log_frames
+from NSTAX.logger.converted_log_cache import ConvertedLogCache, CACHE_DIRNAME
+from NSTAX.logger.event_journal import EventJournalReader, JOURNAL_FILENAME, EQUIPMENT_ACTION
+from NSTAX.logger.timebase import ns_to_datetime
+from NSTAX.logger.log_extractor import LogExtractor, parse_autolog_timestamp
+from NSTAX.logger.log_schema import TRUMI_LOG_SCHEMA, TRUMI_TEXT_COLUMNS
+from NSTAX.logger.state_transitions import state_runs, state_transitions, select_transitions, count_transitions, event_detections
+
+# Bump whenever the converted layout changes, invalidates cached conversions
+TRUMI_PARSER_VERSION = 1
+
+# Shaker start and stop lines of the autolog, found in a single pass
+AUTOLOG_SHAKE_EXTRACTOR = LogExtractor({
+    'shake_start': rb"Start Shaking at (?P<setting>.*)",
+    'shake_stop': rb"Stop Shaking",
+}, timestamp_parser=parse_autolog_timestamp)
+
+
+def is_trumi_log_line(line):
+    """Check if a raw log line is a TRUMI data line."""
+    return (line.find("!") >= 0) and (line.count(',') >= 9) and (line.find('|<') < 0)
+
+
+def _convert_csv_file_worker(cache_dir, folder_path, filename):
+    """Process pool entry point, private methods of the parser cannot be pickled."""
+    return TrumiLogParserUtils(cache_dir=cache_dir)._convert_csv_file(folder_path, filename)
 
 class TrumiLogParserUtils:
     """Utility class for parsing TRUMI log files.
+
+    Converted logs are cached (see ConvertedLogCache), unchanged logs are not
+    converted again on later runs.
+
+    :param cache_dir: Directory of the conversion cache, defaults to CACHE_DIRNAME inside each test case folder
+    :type cache_dir: str, optional
+    :param max_workers: Number of processes converting logs in parallel, 1 converts in-process, defaults to None (one per CPU)
+    :type max_workers: int, optional
     """
-    def __init__(self):
+    def __init__(self, cache_dir=None, max_workers=None):
         self.test_cases = None
         self.test_folder = None
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
 
     def _clean_device_name(self, filename):
         name = os.path.splitext(filename)[0]
@@ -28,142 +66,100 @@ class TrumiLogParserUtils:
         raise FileNotFoundError(f"Test folder not found: {base_path}/{folder_name}")
         
 
+    def _get_cache(self, folder_path):
+        return ConvertedLogCache(self.cache_dir or os.path.join(folder_path, CACHE_DIRNAME))
+
     def _convert_csv_files(self, folder_path):
-        for dir in os.listdir(folder_path):
-            if not dir.startswith("converted") and dir.endswith(".csv"):
-                csv_file_path = os.path.join(folder_path, dir)
-                self.__convert_logs_raw(csv_file_path, folder_path + '/converted_' + dir)
+        """Convert all raw logs of a folder, in parallel over max_workers processes.
+
+        :return: Paths of the converted logs, sorted by raw log name
+        :rtype: list
+        """
+        filenames = sorted(dir for dir in os.listdir(folder_path) if not dir.startswith("converted") and dir.endswith(".csv"))
+        max_workers = min(self.max_workers or os.cpu_count() or 1, len(filenames))
+        if max_workers <= 1:
+            return [self._convert_csv_file(folder_path, filename) for filename in filenames]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_convert_csv_file_worker, self.cache_dir, folder_path, filename) for filename in filenames]
+            # Collected in submission order, the result does not depend on scheduling
+            return [future.result() for future in futures]
+
+    def _convert_csv_file(self, folder_path, filename):
+        """Convert a raw log unless its conversion is cached.
+
+        :return: Path of the converted log
+        :rtype: str
+        """
+        cache = self._get_cache(folder_path)
+        csv_file_path = os.path.join(folder_path, filename)
+        converted_file_path = folder_path + '/converted_' + filename
+        if cache.contains(csv_file_path, TRUMI_PARSER_VERSION):
+            if not os.path.exists(converted_file_path):
+                cache.load(csv_file_path, TRUMI_PARSER_VERSION).to_csv(converted_file_path, index=False)
+            return converted_file_path
+        self.__convert_logs_raw(csv_file_path, converted_file_path)
+        cache.store(csv_file_path, TRUMI_PARSER_VERSION, self.__read_converted_csv(converted_file_path))
+        return converted_file_path
+
+    def _load_converted(self, folder_path, converted_filename):
+        """Load a converted log, from the conversion cache if its raw log is cached."""
+        raw_file_path = os.path.join(folder_path, converted_filename[len("converted_"):])
+        if os.path.exists(raw_file_path):
+            converted = self._get_cache(folder_path).load(raw_file_path, TRUMI_PARSER_VERSION)
+            if converted is not None:
+                return converted
+        return self.__read_converted_csv(os.path.join(folder_path, converted_filename))
+
+    def __read_converted_csv(self, filepath):
+        try:
+            return pd.read_csv(filepath, parse_dates=['Time'])
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame()
 
     def _plot_converted_files(self, folder_path, testcase_label):
         data = []
         labels = []
-        for dir in os.listdir(folder_path):
+        for dir in sorted(os.listdir(folder_path)):
             if dir.startswith("converted") and dir.endswith(".csv"):
-                converted_file_path = os.path.join(folder_path, dir)
-                data.append(self.__read_csv(converted_file_path))
+                data.append(self.__plot_rows(self._load_converted(folder_path, dir)))
                 labels.append('_'.join(dir.split('_')[1:]))
         self.__plot_multiple_data(data, labels, output_filepath=(folder_path + '/plot.png'), figure_title=testcase_label)
             
     def __convert_logs_raw(self, input_file_path, output_file_path):
-        rawdata = self.__load_log(input_file_path)
-        parsed_data = self.__parse_log(rawdata)
-        parsed_data.to_csv(output_file_path, index=False)
+        # Streamed chunk by chunk, memory use does not depend on the log size
+        convert_log(input_file_path, output_file_path, self.__parse_log,
+                    line_filter=is_trumi_log_line, text_columns=TRUMI_TEXT_COLUMNS)
 
     def __load_log(self, logFile):
         """Load the Trumi-related log data from a Lykaner or Skalli device."""
-        try:
-            with open(logFile, 'r',errors="ignore") as f:
-                text = "\n".join([line for line in f if ((line.find("!") >= 0) and
-                                (line.count(',') >= 9) and
-                                (line.find('|<') < 0))])
-            ds1 = pd.read_csv(StringIO(text), header=None, delimiter=',',
-                            index_col=False, on_bad_lines='skip',
-                            engine='c', low_memory=False)
-        except: # noqa E722
-            ds1 = pd.read_csv(logFile, header=None, delimiter=',',
-                            index_col=False, on_bad_lines='skip',
-                            engine='python')
-
-        ds1.dropna(inplace=True)
-        return ds1
-
+        frames = list(iter_log_frames(logFile, line_filter=is_trumi_log_line, text_columns=TRUMI_TEXT_COLUMNS))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames)
 
     def __parse_log(self, ds1, time_column=0, start_time=None):
-        """Parse the Trumi-related log data from a Lykaner or Skalli device."""
-        def extract_time_string(s):
-            return s[s.find('[')+1:s.find(']')]
-
-        ret = pd.DataFrame()
-
-        if time_column is not None:
-            ret['Time'] = pd.to_datetime(
-                ds1.loc[:, time_column].apply(extract_time_string))
-
-        # Col 1: Device ID
-        ret['DeviceID'] = ds1.loc[:, 1]
-
-        # Col 2: Cycle index
-        ret['Cycle'] = ds1.loc[:, 3].astype(str).apply(int, base=16)
-
-        # Col 3: Accelerometer header (3 bytes)
-        ret['acc_mode'] = ds1.loc[:, 3].astype(str).str[0:2].apply(int, base=16)
-        ret['sample_index'] = ds1.loc[:, 3].astype(str).str[2:4].apply(int, base=16)
-        ret['trumi_state'] = ds1.loc[:, 3].astype(str).str[4:].apply(int, base=16)
-
-        # Col 4: RTC
-        ret['RTC_stamp'] = ds1.loc[:, 4].apply(int, base=16)
-        ret['RTC_time'] = ret.loc[:, 'RTC_stamp'].apply(datetime.fromtimestamp)
-
-        if time_column is None:
-            ret['Time'] = ret['RTC_time']
-
-        #  Col 5: Speed
-        ret['Vel'] = ds1.loc[:, 5].astype(int)
-
-        # Col 6: Distance
-        ret['Dist'] = ds1.loc[:, 6].astype(int)
-
-        # Col 7-9: Acceleration
-        ret['Acc_x'] = ds1.loc[:, 7].astype(int)
-        ret['Acc_y'] = ds1.loc[:, 8].astype(int)
-        ret['Acc_z'] = ds1.loc[:, 9].astype(int)
-        ret['Acc_abs'] = np.linalg.norm(ret[['Acc_x', 'Acc_y', 'Acc_z']], axis=1)
-
-        # Extended output
-        if len(ds1.columns) > 10:
-            # Additionally in the extended log(you have extended one)
-            # there are gravity(xyz) vector and direction vector(xyz)
-            # at the end "-54,-982,14,0,0,0"
-            ret['Grav_x'] = ds1.loc[:, 10].astype(int)
-            ret['Grav_y'] = ds1.loc[:, 11].astype(int)
-            ret['Grav_z'] = ds1.loc[:, 12].astype(int)
-            ret['Grav_abs'] = np.linalg.norm(
-                ret[['Grav_x', 'Grav_y', 'Grav_z']], axis=1)
-
-            ret['Dir_x'] = ds1.loc[:, 13].astype(int)
-            ret['Dir_y'] = ds1.loc[:, 14].astype(int)
-            ret['Dir_z'] = ds1.loc[:, 15].astype(int)
-            ret['Dir_abs'] = np.linalg.norm(
-                ret[['Dir_x', 'Dir_y', 'Dir_z']], axis=1)
-
-            ret['Dir_norm_x'] = ret['Dir_x']/ret['Dir_abs']
-            ret['Dir_norm_y'] = ret['Dir_y']/ret['Dir_abs']
-            ret['Dir_norm_z'] = ret['Dir_z']/ret['Dir_abs']
-            
+        """Parse the Trumi-related log data from a Lykaner or Skalli device (see log_schema.TRUMI_LOG_SCHEMA)."""
+        ret = TRUMI_LOG_SCHEMA.parse(ds1, time_column=time_column, start_time=start_time)
+        if ret.empty:
+            return ret
+
         # ret['Trumi_Event'] = ds1.loc[:, 16].astype(str).str[0:2].apply(int, base=16)
         # ret['Trumi_Rate'] = ds1.loc[:, 16].astype(str).str[2:].apply(int, base=16)
         # ret['Trumi_Event_Ext'] = ds1.loc[:, 17].astype(str)
-        if len(ds1.columns) > 18:
-            ret['trumi_state_ext'] = ds1.loc[:, 18].astype(str)
-        
+
         # Create new trumi state column if 'trumi_state' is value 1 and 'trumi_state_ext' is value 1
         # Fix dtype warning by casting to float before assignment
         ret['trumi_state'] = ret['trumi_state'].astype(float)
         if 'trumi_state_ext' in ret.columns:
-            ret.loc[(ret['trumi_state'] == 1) & (ret['trumi_state_ext'] == '1'), 'trumi_state'] = 1.5
-
-        # ret.set_index('Time',inplace=True)
-        if start_time is not None:
-            ret['Time'] += (start_time-ret['Time'][0])
+            ret.loc[((ret['trumi_state'] == 1) & (ret['trumi_state_ext'] == '1')).to_numpy(), 'trumi_state'] = 1.5
+        return ret
 
-        ret.index = ret['Time']
-        return ret     
-    
     # PLOTTING FUNCTIONS
-    def __read_csv(self, filepath):
-        data = []
-        with open(filepath, 'r') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                timestamp = datetime.strptime(row['Time'], '%Y-%m-%d %H:%M:%S.%f')
-                trumi_state = float(row['trumi_state'])
-                vel = float(row['Vel'])
-                dist = float(row['Dist'])
-                acc_x = float(row['Acc_x'])
-                acc_y = float(row['Acc_y'])
-                acc_z = float(row['Acc_z'])
-                data.append((timestamp, trumi_state, vel, dist, acc_x, acc_y, acc_z))
-        return data
+    def __plot_rows(self, df):
+        if df.empty:
+            return []
+        columns = [df[name].astype(float) for name in ('trumi_state', 'Vel', 'Dist', 'Acc_x', 'Acc_y', 'Acc_z')]
+        return list(zip(df['Time'].tolist(), *columns))
 
     def __plot_multiple_data(self, data_sets, labels, output_filepath, figure_title='Figure', show_plot=False):
         plt.figure(figsize=(14, 12))
@@ -228,8 +224,8 @@ class TrumiLogParserUtils:
 class TrumiStateAnalysis(TrumiLogParserUtils):
     """Class for analyzing TRUMI state transition logs.
     """
-    def __init__(self, results_folder):
-        super().__init__()
+    def __init__(self, results_folder, max_workers=None):
+        super().__init__(max_workers=max_workers)
         self.test_cases = [
              'datalogs_TRUMI_State_Transition_TRUMI',
              'datalogs_TRUMI_State_Transition_RELOC',
@@ -306,15 +302,13 @@ class TrumiStateAnalysis(TrumiLogParserUtils):
             self.test_instances.append(test_instance)
 
     def check_transitions(self, folder_path):
-        converted_files = [f for f in os.listdir(folder_path) if f.startswith('converted') and f.endswith('.csv')]
+        converted_files = sorted(f for f in os.listdir(folder_path) if f.startswith('converted') and f.endswith('.csv'))
         if len(converted_files) < 2:
             raise ValueError("Not enough converted files found in the directory.")
-        data_path_1 = os.path.join(folder_path, converted_files[0])
-        data_path_2 = os.path.join(folder_path, converted_files[1])
         device1 = self._clean_device_name(converted_files[0])
         device2 = self._clean_device_name(converted_files[1])
-        df1 = pd.read_csv(data_path_1, parse_dates=['Time'])
-        df2 = pd.read_csv(data_path_2, parse_dates=['Time'])
+        df1 = self._load_converted(folder_path, converted_files[0])
+        df2 = self._load_converted(folder_path, converted_files[1])
         states1 = self.__calculate_state_transitions(df1)
         states2 = self.__calculate_state_transitions(df2)
         state_transitions = [states1, states2]
@@ -322,30 +316,8 @@ class TrumiStateAnalysis(TrumiLogParserUtils):
         return state_transitions, device_names
 
     def __calculate_state_transitions(self, df1):
-        # Collapse consecutive rows with the same trumi_state into intervals with start and end times
-        collapsed = []
-        prev_state = None
-        for idx, row in df1.iterrows():
-            curr_state = row['trumi_state']
-            if prev_state is None:
-                prev_state = curr_state
-            elif curr_state != prev_state:
-                collapsed.append({
-                    'trumi_state': prev_state
-                })
-            prev_state = curr_state
-        # Add the last interval
-        if prev_state is not None:
-            collapsed.append({
-            'trumi_state': prev_state
-            })
-        # Build an array of consecutive trumi_state values (no repeats)
-        consecutive_states = []
-        for interval in collapsed:
-            state = interval['trumi_state']
-            if not consecutive_states or consecutive_states[-1] != state:
-                consecutive_states.append(state)
-        return consecutive_states
+        # Consecutive trumi_state values (no repeats), one per run of equal states
+        return state_runs(df1)['state'].tolist()
 
 class TestCaseResult:
     def __init__(self, description, name, dut_info, result_output, version, result, result_step):
@@ -363,16 +335,32 @@ class AnalysisResult:
         self.test_instances = test_instances
 
 class TrumiBenchmarkAnalysis(TrumiLogParserUtils):
-    """Class for analyzing TRUMI benchmark logs.
+    """Class for analyzing TRUMI benchmark logs of any number of devices.
+
+    Every device is compared to the first one (by log name). If the autolog
+    of the run holds shake events, the detection latency and misses of every
+    device are computed from the shake timeline.
     """
-    def __init__(self, results_folder):
-        super().__init__()
+    # Device states counting as detection of a shake: TRUMI or RELOC
+    SHAKE_DETECTED_STATES = [2.0, 3.0]
+    STATISTICS_HEADERS = [
+        "Device", "Duration", "Time_in_trumi", "Time_in_reloc", "Time_in_sleep", "Num_Of_Trumi", "Num_Of_Reloc", "False_Triggers",
+        "Detected_Shakes", "Missed_Shakes", "Mean_Detection_Latency", "Max_Detection_Latency", "Reloc_Transitions", "Trumi_Transitions"
+    ]
+
+    def __init__(self, results_folder, max_workers=None):
+        super().__init__(max_workers=max_workers)
         self.test_cases = ['datalogs_TRUMI_Benchmark',]
         self.test_folder = results_folder
         self.test_instances = []
         
     def start_analysis(self):
         test_folder = self._find_test_folder(self.test_folder)
+        try:
+            shake_events = self.__load_shake_events(test_folder)
+        except FileNotFoundError as e:
+            print(f"{e}. Skipping shake detection statistics.")
+            shake_events = None
         for testcase in self.test_cases:
             folder_path = os.path.join(test_folder, testcase)
             if not os.path.exists(folder_path):
@@ -380,55 +368,42 @@ class TrumiBenchmarkAnalysis(TrumiLogParserUtils):
                 continue
             self._convert_csv_files(folder_path)
             self._plot_converted_files(folder_path, testcase_label=testcase)
-            self.calculate_trumi_statistics(folder_path, testcase)
-
-    def calculate_trumi_statistics(self, folder_path, testcase):
-        converted_files = [f for f in os.listdir(folder_path) if f.startswith('converted') and f.endswith('.csv')]
-        # Use the converted file names from the directory listing
-        if len(converted_files) < 2:
+            self.calculate_trumi_statistics(folder_path, testcase, shake_events)
+
+    def calculate_trumi_statistics(self, folder_path, testcase, shake_events=None):
+        devices = []
+        frames = []
+        for converted_file in sorted(f for f in os.listdir(folder_path) if f.startswith('converted') and f.endswith('.csv')):
+            df = self._load_converted(folder_path, converted_file)
+            # Converted summaries of earlier runs hold no samples
+            if df.empty:
+                continue
+            devices.append(self._clean_device_name(converted_file))
+            frames.append(df)
+        if len(frames) < 2:
             raise ValueError("Not enough converted files found in the directory.")
-        data_path_1 = os.path.join(folder_path, converted_files[0])
-        data_path_2 = os.path.join(folder_path, converted_files[1])
-        # Extract device names from the converted file names (without extension)
-        device1 = self._clean_device_name(converted_files[0])
-        device2 = self._clean_device_name(converted_files[1])
-        df1 = pd.read_csv(data_path_1, parse_dates=['Time'])
-        df2 = pd.read_csv(data_path_2, parse_dates=['Time'])
-        row1 = self.__process_data(df1, device1)
-        row2 = self.__process_data(df2, device2)
-        # Calculate the difference row (row2 - row1 for numeric columns)
-        diff_row = [f"Difference in variables", ""]  # Device and Duration columns
-        for v1, v2 in zip(row1[2:], row2[2:]):
-            if isinstance(v1, (int, float)) and isinstance(v2, (int, float)):
-                diff = v2 - v1
-            else:
-                try:
-                    diff = float(v2) - float(v1)
-                except Exception:
-                    diff = ""
-            diff_row.append(diff)
+        runs = [state_runs(df) for df in frames]
+        detections = {}
+        if shake_events is not None and not shake_events.empty:
+            all_runs = pd.concat([run.assign(device=device) for run, device in zip(runs, devices)], ignore_index=True)
+            detections = dict(tuple(event_detections(shake_events, all_runs, self.SHAKE_DETECTED_STATES).groupby('device')))
+        rows = [self.__process_data(df, device, detections.get(device)) for df, device in zip(frames, devices)]
+        # Calculate the difference rows (device - reference device for numeric columns)
+        diff_rows = [self.__difference_row(rows[0], row) for row in rows[1:]]
         summary_filename = f"{folder_path}/summary_{self.test_folder}.csv"
         # Write CSV summary
         with open(summary_filename, 'w', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow([
-            "Device", "Duration", "Time_in_trumi", "Time_in_reloc", "Time_in_sleep", "Num_Of_Trumi", "Num_Of_Reloc", "False_Triggers", "Reloc_Transitions", "Trumi_Transitions"
-            ])
-            writer.writerow(row1)
-            writer.writerow(row2)
-            writer.writerow(diff_row)
-
+            writer.writerow(self.STATISTICS_HEADERS)
+            writer.writerows(rows)
+            writer.writerows(diff_rows)
 
         # Prepare HTML summary and store as class variable
         # Only include all columns except the last two (i.e., exclude reloc_transitions and trumi_transitions)
-        headers = [
-            "Device", "Duration", "Time_in_trumi", "Time_in_reloc", "Time_in_sleep", "Num_Of_Trumi", "Num_Of_Reloc", "False_Triggers"
-        ]
-        # Remove last two columns from each row
-        rows = [row1[:-2], row2[:-2], diff_row[:-2]]
+        headers = self.STATISTICS_HEADERS[:-2]
         html_table = "<table class=\"result-output\" border='1'>\n<tr>{}</tr>\n".format(''.join(f"<th>{h}</th>" for h in headers))
-        for row in rows:
-            html_table += "<tr>{}</tr>\n".format(''.join(f"<td>{str(cell).replace(chr(10), '<br>')}</td>" for cell in row))
+        for row in rows + diff_rows:
+            html_table += "<tr>{}</tr>\n".format(''.join(f"<td>{str(cell).replace(chr(10), '<br>')}</td>" for cell in row[:-2]))
         html_table += "</table>\n"
         plot_html = f'''<img class="result-output" src="{os.path.join(testcase, "plot.png")}">'''
         # For each expected state, create a step with the description "Checking for the TRUMI(<state>) state"
@@ -450,64 +425,44 @@ class TrumiBenchmarkAnalysis(TrumiLogParserUtils):
         )
         self.test_instances.append(test_instance)
 
-    def __process_data(self, df, device):
+    def __difference_row(self, reference_row, row):
+        diff_row = [f"Difference in variables ({row[0]} - {reference_row[0]})", ""]  # Device and Duration columns
+        for v1, v2 in zip(reference_row[2:], row[2:]):
+            if isinstance(v1, (int, float)) and isinstance(v2, (int, float)):
+                diff = v2 - v1
+            else:
+                try:
+                    diff = float(v2) - float(v1)
+                except Exception:
+                    diff = ""
+            diff_row.append(diff)
+        return diff_row
+
+    def __process_data(self, df, device, detections=None):
         duration = df['Time'].iloc[-1] - df['Time'].iloc[0]
         time_in_trumi = round(df[df['trumi_state'] == 2]['Time'].diff().sum().total_seconds())
         time_in_reloc = round(df[df['trumi_state'] == 3]['Time'].diff().sum().total_seconds())
         time_in_sleep = round(df[df['trumi_state'].isin([1, 1.5])]['Time'].diff().sum().total_seconds())
 
-        transitions = []
-        for i in range(1, len(df)):
-            prev = df.iloc[i-1]['trumi_state']
-            curr = df.iloc[i]['trumi_state']
-            prev_state = (
-                "SLEEP" if prev == 1 else
-                "RELOC" if prev == 3 else
-                "TRUMI" if prev == 2 else
-                "LIGHT_SLEEP" if prev == 1.5 else
-                str(prev)
-            )
-            curr_state = (
-                "SLEEP" if curr == 1 else
-                "RELOC" if curr == 3 else
-                "TRUMI" if curr == 2 else
-                "LIGHT_SLEEP" if curr == 1.5 else
-                str(curr)
-            )
-            if (
-                (prev == 1 and curr == 2) or
-                (prev == 2 and curr == 1) or
-                (prev == 1 and curr == 2) or
-                (prev == 1.5 and curr == 2) or
-                (prev == 1.5 and curr == 1) or
-                (prev == 2 and curr == 3) or
-                (prev == 3 and curr == 1)
-            ):
-                transitions.append(f"{prev_state} {curr_state} {df.iloc[i]['Time']}")    
-        num_of_trumi = sum(
-            1 for i in range(1, len(df))
-            if (
-                (df.iloc[i-1]['trumi_state'] == 1 and df.iloc[i]['trumi_state'] == 2)
-            )
-        )
-        num_of_reloc = sum(
-            1 for i in range(1, len(df))
-            if (
-                (df.iloc[i-1]['trumi_state'] == 2 and df.iloc[i]['trumi_state'] == 3)
-            )
-        )
-        false_triggers = round((num_of_trumi - num_of_reloc) / num_of_trumi * 100, 2)
+        transitions = state_transitions(df)
+        num_of_trumi = count_transitions(transitions, 1, 2)
+        num_of_reloc = count_transitions(transitions, 2, 3)
+        false_triggers = round((num_of_trumi - num_of_reloc) / num_of_trumi * 100, 2) if num_of_trumi else 0.0
         # Find all transitions from TRUMI to RELOC and join them with newlines
         reloc_transitions = "\n".join(
-            f"TRUMI RELOC {df.iloc[i]['Time']}"
-            for i in range(1, len(df))
-            if df.iloc[i-1]['trumi_state'] == 2 and df.iloc[i]['trumi_state'] == 3
+            f"TRUMI RELOC {time}" for time in select_transitions(transitions, 2, 3)['time']
         )
         trumi_transitions = "\n".join(
-            f"SLEEP TRUMI {df.iloc[i]['Time']}"
-            for i in range(1, len(df))
-            if df.iloc[i-1]['trumi_state'] == 1 and df.iloc[i]['trumi_state'] == 2
+            f"SLEEP TRUMI {time}" for time in select_transitions(transitions, 1, 2)['time']
         )
+        # Shake detection, empty without shake events
+        detected_shakes = missed_shakes = mean_latency = max_latency = ""
+        if detections is not None:
+            detected_shakes = int(detections['detected'].sum())
+            missed_shakes = int(len(detections) - detected_shakes)
+            if detected_shakes:
+                mean_latency = round(detections['latency'].mean().total_seconds(), 3)
+                max_latency = round(detections['latency'].max().total_seconds(), 3)
         # Assign to row
         row = [
             device,
@@ -518,46 +473,79 @@ class TrumiBenchmarkAnalysis(TrumiLogParserUtils):
             num_of_trumi,
             num_of_reloc,
             false_triggers,
+            detected_shakes,
+            missed_shakes,
+            mean_latency,
+            max_latency,
             reloc_transitions,  # Add the reloc transitions as a new row element
             trumi_transitions,  # Add the trumi transitions as a new row element
         ]
         return row
         
-    def __load_autolog(self, test_folder_name, folder_path): 
-        folder_path = f'{folder_path}/{test_folder_name}'
-        autolog_path = os.path.join(folder_path, 'autolog.txt')
+    def __load_shake_events(self, test_folder):
+        """Get the shake events of a run, from its event journal or, for older runs, its autolog.
+
+        :return: One row per shake: start_time, end_time (NaT if the stop was not recorded), frequency, voltage, duration
+        :rtype: pandas.DataFrame
+        """
+        if os.path.exists(os.path.join(test_folder, JOURNAL_FILENAME)):
+            shake_events = self.__load_journal(test_folder)
+        else:
+            shake_events = self.__load_autolog(test_folder)
+        # Write shake events to CSV
+        shake_events.to_csv(os.path.join(test_folder, "shake_events.csv"), index=False)
+        return shake_events.sort_values('start_time', kind='stable').reset_index(drop=True)
+
+    def __load_journal(self, test_folder):
+        shakes = []
+        for event in EventJournalReader(test_folder).query(EQUIPMENT_ACTION):
+            if event.get("action") == "shake_start":
+                if "frequency_hz" in event:
+                    freq = f"{event['frequency_hz']}Hz"
+                else:
+                    freq = f"{event.get('rpm')}RPM"
+                voltage = f"{event['voltage_vpp']}Vpp" if "voltage_vpp" in event else ""
+                duration = str(event.get("duration_s", ""))
+                shakes.append([event["ts_ns"], None, freq, voltage, duration])
+            elif event.get("action") == "shake_stop" and shakes and shakes[-1][1] is None:
+                shakes[-1][1] = event["ts_ns"]
+        shake_events = pd.DataFrame(shakes, columns=['start_time', 'end_time', 'frequency', 'voltage', 'duration'])
+        for column in ('start_time', 'end_time'):
+            # Naive UTC, like the device log times
+            shake_events[column] = pd.to_datetime([pd.NaT if pd.isna(ts_ns) else ns_to_datetime(int(ts_ns))
+                                                   for ts_ns in shake_events[column]], utc=True).tz_localize(None).astype('datetime64[ns]')
+        return shake_events
+
+    def __load_autolog(self, test_folder):
+        autolog_path = os.path.join(test_folder, 'autolog.txt')
         if not os.path.exists(autolog_path):
-            raise FileNotFoundError(f"autolog.txt not found in {folder_path}")
-        with open(autolog_path, 'r') as f:
-            lines = f.readlines()
-        shake_times = []
-        for line in lines:
-            # Example line: "[2024-07-16 15:20:38.123] Start Shaking at 5Hz 0.2Vpp for 1800 seconds"
-            if "Start Shaking at" in line:
-                ts = line.split('|NSTA')[0].strip()
+            raise FileNotFoundError(f"Neither {JOURNAL_FILENAME} nor autolog.txt found in {test_folder}")
+        # Example line: "2024-07-16 15:20:38,123|NSTA.testscripts...|INFO|Start Shaking at 5Hz 0.2Vpp for 1800 seconds"
+        hits = AUTOLOG_SHAKE_EXTRACTOR.extract(autolog_path)
+        events = pd.concat([hits['shake_start'].assign(start=True), hits['shake_stop'].assign(start=False)]).sort_values('offset')
+        shakes = []
+        for ts_ns, start, setting in zip(events['timestamp_ns'], events['start'], events['setting']):
+            # Autolog times are naive local times, converted to naive UTC like the device log times
+            ts = pd.NaT if pd.isna(ts_ns) else pd.Timestamp(pd.Timestamp(int(ts_ns)).to_pydatetime().astimezone(timezone.utc).replace(tzinfo=None))
+            if start:
                 # Extract frequency, voltage, and duration using split
-                parts = line.split("Start Shaking at")[1].strip().split()
-                freq = parts[0]  # e.g., '5Hz'
-                voltage = parts[1]  # e.g., '0.2Vpp'
-                duration = parts[3]  # e.g., '1800'
-                shake_times.append((ts, "Start Shaking", freq, duration, voltage))
-            elif "Stop Shaking" in line:
-                ts = line.split('|NSTA')[0].strip()
-                shake_times.append((ts, "Stop Shaking", freq, duration, voltage))
-                
-        # Write shake events to CSV
-        shake_events_filename = f"shake_events_{test_folder_name}.csv"
-        with open(shake_events_filename, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(["Timestamp", "Event Type", "Frequency", "Duration", "Voltage"])
-            # Write Shake Started events with freq, duration, voltage
-            for ts, event_type, freq, duration, voltage in shake_times:
-                writer.writerow([ts, event_type, freq, duration, voltage])
+                parts = setting.split()
+                freq = parts[0] if parts else ""  # e.g., '5Hz'
+                voltage = parts[1] if len(parts) > 1 else ""  # e.g., '0.2Vpp'
+                duration = parts[3] if len(parts) > 3 else ""  # e.g., '1800'
+                shakes.append([ts, pd.NaT, freq, voltage, duration])
+            elif shakes and pd.isna(shakes[-1][1]):
+                shakes[-1][1] = ts
+        shake_events = pd.DataFrame(shakes, columns=['start_time', 'end_time', 'frequency', 'voltage', 'duration'])
+        for column in ('start_time', 'end_time'):
+            shake_events[column] = shake_events[column].astype('datetime64[ns]')
+        return shake_events
         
 class trumi_log_parser:
-    def __init__(self, results_folder, analysis_type):
+    def __init__(self, results_folder, analysis_type, max_workers=None):
         self.results_folder = results_folder
         self.analysis_type = analysis_type
+        self.max_workers = max_workers
         # State types
         self.state_type = type('StateType', (), {})  # Create a simple class for state types
         self.state_type.STATE_ONLY = 1
@@ -567,16 +555,16 @@ class trumi_log_parser:
 
     def run_script(self):
         if self.analysis_type == self.state_type.STATE_ONLY:
-            state_analysis = TrumiStateAnalysis(self.results_folder)
+            state_analysis = TrumiStateAnalysis(self.results_folder, self.max_workers)
             state_analysis.start_analysis()
             self.test_instances = state_analysis.test_instances
         elif self.analysis_type == self.state_type.BENCHMARK_ONLY:
-            benchmark_analysis = TrumiBenchmarkAnalysis(self.results_folder)
+            benchmark_analysis = TrumiBenchmarkAnalysis(self.results_folder, self.max_workers)
             benchmark_analysis.start_analysis()
             self.test_instances = benchmark_analysis.test_instances
         elif self.analysis_type == self.state_type.FULL_ANALYSIS:
-            state_analysis = TrumiStateAnalysis(self.results_folder)
-            benchmark_analysis = TrumiBenchmarkAnalysis(self.results_folder)
+            state_analysis = TrumiStateAnalysis(self.results_folder, self.max_workers)
+            benchmark_analysis = TrumiBenchmarkAnalysis(self.results_folder, self.max_workers)
             state_analysis.start_analysis()
             benchmark_analysis.start_analysis()
             self.test_instances = state_analysis.test_instances + benchmark_analysis.test_instances